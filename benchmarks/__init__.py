@@ -0,0 +1 @@
+"""ovh_exporter benchmarks (run as scripts, see README)."""
@@ -0,0 +1,123 @@
+"""Collector benchmark: collect throughput, peak memory and exposition size.
+
+Run from repository root:
+
+    python -m benchmarks.bench_collect -o results.json
+    python -m benchmarks.compare before.json results.json
+"""
+
+from __future__ import annotations
+
+import gc
+import gzip
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import click
+from prometheus_client import CollectorRegistry, generate_latest
+
+from benchmarks.scenarios import DEFAULT_SCENARIOS, SCENARIOS, build_store
+from ovh_exporter.collector import OvhCollector
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _best(func, repeat: int) -> float:
+    """Best duration of `repeat` calls (seconds)."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def run_scenario(name: str, repeat: int):
+    """Benchmark one scenario; returns a result dict."""
+    services, resources = SCENARIOS[name]
+    store, service_list = build_store(services, resources)
+    gc.collect()
+
+    def cold():
+        # new collector: usage payloads are processed
+        return list(OvhCollector(store, service_list).collect())
+
+    collector = OvhCollector(store, service_list)
+    families = list(collector.collect())
+    series = sum(len(family.samples) for family in families)
+    registry = CollectorRegistry()
+    registry.register(collector)
+    exposition = generate_latest(registry)
+
+    collect_cold = _best(cold, repeat)
+    collect_warm = _best(lambda: list(collector.collect()), repeat)
+    render = _best(lambda: generate_latest(registry), repeat)
+
+    # peak memory allocated by a cold collect and its rendering (snapshots excluded)
+    cold_registry = CollectorRegistry()
+    cold_registry.register(OvhCollector(store, service_list))
+    tracemalloc.start()
+    generate_latest(cold_registry)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "services": services,
+        "resources": resources,
+        "series": series,
+        "collect_cold_seconds": collect_cold,
+        "collect_warm_seconds": collect_warm,
+        "render_seconds": render,
+        "series_per_second": series / collect_cold if collect_cold else None,
+        "exposition_bytes": len(exposition),
+        "exposition_gzip_bytes": len(gzip.compress(exposition)),
+        "peak_memory_bytes": peak,
+    }
+
+
+@click.command()
+@click.option("-s", "--scenario", "scenarios", multiple=True, type=click.Choice(list(SCENARIOS)))
+@click.option("--all", "all_scenarios", is_flag=True, help="Run all scenarios (slow)")
+@click.option("-r", "--repeat", type=int, default=3, show_default=True)
+@click.option("-o", "--output", type=click.Path(dir_okay=False), help="JSON results file")
+def main(scenarios, all_scenarios, repeat, output):
+    """Benchmark OvhCollector.collect() on synthetic services."""
+    if all_scenarios:
+        scenarios = list(SCENARIOS)
+    results = []
+    for name in scenarios or DEFAULT_SCENARIOS:
+        result = run_scenario(name, repeat)
+        click.echo(
+            f"{name:>10}: {result['series']:>8} series, collect {result['collect_cold_seconds'] * 1000:9.1f}ms"
+            f" (warm {result['collect_warm_seconds'] * 1000:9.1f}ms), render {result['render_seconds'] * 1000:9.1f}ms,"
+            f" {result['exposition_bytes'] / 1e6:7.2f}MB ({result['exposition_gzip_bytes'] / 1e6:6.2f}MB gzip),"
+            f" peak {result['peak_memory_bytes'] / 1e6:7.1f}MB"
+        )
+        results.append(result)
+    if output:
+        report = {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "timestamp": time.time(),
+            "results": results,
+        }
+        with open(output, "w", encoding="utf-8") as fstream:
+            json.dump(report, fstream, indent=1)
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,96 @@
+"""JSON decoder benchmark: decode throughput of installed backends on OVH API payloads.
+
+Run from repository root, on a recording (see `ovh_exporter record`) or on
+synthetic payloads:
+
+    python -m benchmarks.bench_json -i recording.json
+    python -m benchmarks.bench_json --resources 1000
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import time
+
+import click
+
+from ovh_exporter import recording
+from ovh_exporter.json_backend import BACKENDS, decoder
+from ovh_exporter.json_projection import loads_projected, project
+from ovh_exporter.ovh_client import ENDPOINT_PROJECTIONS
+from ovh_exporter.synthetic import service_id, synthetic_payloads
+
+
+def _best(func, repeat: int) -> float:
+    """Best duration of `repeat` calls (seconds)."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def _bodies(recording_file: str | None, resources: int) -> dict[str, list[bytes]]:
+    """Encoded payloads by endpoint name."""
+    if recording_file:
+        services = recording.load(recording_file)["services"].values()
+    else:
+        services = [synthetic_payloads(service_id(0), resources, resources, resources, 0)]
+    bodies: dict[str, list[bytes]] = {}
+    for payloads in services:
+        for endpoint, payload in payloads.items():
+            bodies.setdefault(endpoint, []).append(json.dumps(payload).encode())
+    return bodies
+
+
+def _decode_all(loads, bodies: list[bytes]):
+    for body in bodies:
+        loads(body)
+
+
+def _project_all(projection, texts: list[str]):
+    for text in texts:
+        loads_projected(text, projection)
+
+
+def _decode_project_all(loads, projection, bodies: list[bytes]):
+    for body in bodies:
+        project(loads(body), projection)
+
+
+@click.command()
+@click.option("-i", "--recording", "recording_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--resources", type=int, default=1000, show_default=True, help="Synthetic resources (no recording)")
+@click.option("-r", "--repeat", type=int, default=5, show_default=True)
+def main(recording_file, resources, repeat):
+    """Compare JSON backends (and projected usage decoding) on API payloads."""
+    bodies = _bodies(recording_file, resources)
+    decoders = {}
+    for name in BACKENDS:
+        try:
+            decoders[name] = decoder(name)
+        except RuntimeError:
+            click.echo(f"{name} is not installed, skipped")
+    for endpoint, endpoint_bodies in bodies.items():
+        size = sum(len(body) for body in endpoint_bodies)
+        line = [f"{endpoint:>9} {size / 1e6:7.2f}MB:"]
+        for name, loads in decoders.items():
+            duration = _best(functools.partial(_decode_all, loads, endpoint_bodies), repeat)
+            line.append(f"{name} {duration * 1000:8.2f}ms ({size / 1e6 / duration:6.0f}MB/s)")
+        projection = ENDPOINT_PROJECTIONS.get(endpoint)
+        if projection is not None:
+            texts = [body.decode() for body in endpoint_bodies]
+            duration = _best(functools.partial(_project_all, projection, texts), repeat)
+            line.append(f"projected {duration * 1000:8.2f}ms ({size / 1e6 / duration:6.0f}MB/s)")
+            # fast backends decode whole payloads, then project them (see `ovh_client._decode`)
+            for name, loads in decoders.items():
+                if name != "json":
+                    duration = _best(functools.partial(_decode_project_all, loads, projection, endpoint_bodies), repeat)
+                    line.append(f"{name}+projected {duration * 1000:8.2f}ms ({size / 1e6 / duration:6.0f}MB/s)")
+        click.echo("  ".join(line))
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
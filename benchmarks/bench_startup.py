@@ -0,0 +1,69 @@
+"""Startup benchmark: CLI import and configuration loading durations.
+
+Each measure runs in a new interpreter (cold imports), as a command or a
+container start does. Run from repository root:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup -c config.yaml
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+# configuration with 100 services, loaded when no configuration is given
+SAMPLE_CONFIG = """
+ovh:
+  endpoint: ovh-eu
+  application_key: ak
+  application_secret: as
+  consumer_key: ck
+services:
+""" + "".join(f'- id: "{index:032x}"\n  labels:\n    env: bench\n' for index in range(100))
+
+SNIPPETS = {
+    "python": "pass",
+    "import cli": "import ovh_exporter.cli",
+    "cli --help": (
+        "import sys; from ovh_exporter.cli import main; sys.argv = ['ovh_exporter', '--help']\n"
+        "try:\n    main()\nexcept SystemExit:\n    pass"
+    ),
+    "load config": (
+        "import sys; from ovh_exporter.config import Config, expandvars, load_yaml, validate\n"
+        "config_dict = load_yaml(open(sys.argv[1])); validate(config_dict); expandvars(config_dict)\n"
+        "Config.load(config_dict)"
+    ),
+}
+
+
+def _duration(code: str, config: str) -> float:
+    """Wall-clock duration of a new interpreter running `code` (seconds)."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code, config], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("-c", "--config", type=click.Path(exists=True, dir_okay=False), help="Configuration file")
+@click.option("-r", "--repeat", type=int, default=10, show_default=True)
+def main(config, repeat):
+    """Median durations of CLI startup steps, in new interpreters."""
+    with tempfile.TemporaryDirectory() as directory:
+        if config is None:
+            config = os.path.join(directory, "config.yaml")
+            with open(config, "w", encoding="utf-8") as fstream:
+                fstream.write(SAMPLE_CONFIG)
+        for name, code in SNIPPETS.items():
+            durations = [_duration(code, config) for _ in range(repeat)]
+            click.echo(f"{name:>12}: {statistics.median(durations) * 1000:7.1f}ms (min {min(durations) * 1000:.1f}ms)")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,58 @@
+"""Compare two benchmark results files (see bench_collect.py and other benchmarks).
+
+Run from repository root:
+
+    python -m benchmarks.compare before.json after.json
+"""
+
+from __future__ import annotations
+
+import json
+
+import click
+
+# metrics where lower is better
+METRICS = (
+    "collect_cold_seconds",
+    "collect_warm_seconds",
+    "render_seconds",
+    "exposition_bytes",
+    "peak_memory_bytes",
+)
+
+
+def _load(path: str):
+    with open(path, encoding="utf-8") as fstream:
+        report = json.load(fstream)
+    return report, {result["scenario"]: result for result in report["results"]}
+
+
+@click.command()
+@click.argument("before", type=click.Path(exists=True, dir_okay=False))
+@click.argument("after", type=click.Path(exists=True, dir_okay=False))
+@click.option("-t", "--threshold", type=float, default=0.1, show_default=True, help="Regression ratio to report")
+def main(before, after, threshold):
+    """Print after/before ratios by scenario; exit status is 1 if a metric regressed above threshold."""
+    before_report, before_results = _load(before)
+    after_report, after_results = _load(after)
+    click.echo(f"{before_report.get('commit')} -> {after_report.get('commit')}")
+    regressions = 0
+    for scenario, result in after_results.items():
+        previous = before_results.get(scenario)
+        if previous is None:
+            continue
+        click.echo(scenario)
+        for metric in METRICS:
+            if metric not in result or not previous.get(metric):
+                continue
+            ratio = result[metric] / previous[metric]
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            click.echo(f"  {metric:>22}: {previous[metric]:>14.6g} -> {result[metric]:>14.6g}  x{ratio:.2f}{flag}")
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
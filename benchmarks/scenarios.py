@@ -0,0 +1,47 @@
+"""Benchmark scenarios: synthetic snapshots of many services."""
+
+from __future__ import annotations
+
+import time
+
+from ovh_exporter.config import Service
+from ovh_exporter.ovh_client import ENDPOINTS, OvhApiResponse
+from ovh_exporter.snapshot import Snapshot, SnapshotStore
+from ovh_exporter.synthetic import service_id, synthetic_payloads
+
+# name -> (services, instances, volumes and buckets by service)
+SCENARIOS = {
+    "1x10": (1, 10),
+    "1x1000": (1, 1000),
+    "1x10000": (1, 10000),
+    "10x1000": (10, 1000),
+    "100x10": (100, 10),
+    "100x100": (100, 100),
+    "1000x10": (1000, 10),
+    "1000x100": (1000, 100),
+}
+# scenarios run by default (quick enough to be run on each change)
+DEFAULT_SCENARIOS = ("1x10", "1x1000", "100x10", "1000x10")
+
+
+def response(payloads) -> OvhApiResponse:
+    """OvhApiResponse of payloads by endpoint name."""
+    now = time.time()
+    return OvhApiResponse(
+        **{attribute: payloads[name] for name, (attribute, _) in ENDPOINTS.items()},
+        fetched_at=dict.fromkeys(ENDPOINTS, now),
+    )
+
+
+def build_store(services: int, resources: int, seed: int = 0) -> tuple[SnapshotStore, list[Service]]:
+    """Store with a snapshot for each of `services` synthetic services.
+
+    Each service has `resources` instances, volumes and buckets."""
+    store = SnapshotStore()
+    service_list = []
+    for index in range(services):
+        project_id = service_id(index)
+        payloads = synthetic_payloads(project_id, resources, resources, resources, seed)
+        store.put(Snapshot(project_id, response(payloads), time.time(), 1.0))
+        service_list.append(Service(project_id, {"env": "bench"}))
+    return store, service_list
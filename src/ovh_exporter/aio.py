@@ -0,0 +1,294 @@
+"""Single-process asyncio server (`server --engine=async`, needs `aiohttp`, `async` extra).
+
+Metrics are served and services refreshed from one event loop: OVH API calls
+are made by `AsyncOvhClient`, instead of threads of forked server workers."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import contextlib
+import functools
+import hmac
+import io
+import signal
+import ssl
+import sys
+import time
+import typing
+
+from ovh_exporter.logger import log
+from ovh_exporter.ovh_client import FetchEngine, build_async_client, build_client
+from ovh_exporter.scheduler import RefreshScheduler
+
+try:
+    from aiohttp import web
+except ImportError as e:
+    raise RuntimeError("aiohttp is needed for asyncio server (pip install ovh_exporter[async])") from e  # noqa: TRY003,EM101
+
+if typing.TYPE_CHECKING:
+    import concurrent.futures
+
+    import ovh
+
+    from ovh_exporter.config import Account, Service
+    from ovh_exporter.ovh_client import AsyncOvhClient, OvhApiResponse
+    from ovh_exporter.reload import ConfigReloader
+
+
+async def _in_thread(func, *args):
+    """Run a blocking call in the default executor (`asyncio.to_thread` needs Python 3.9)."""
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args))
+
+
+class AsyncFetchEngine(FetchEngine):
+    """Fetch engine calling OVH API from an event loop, with an `AsyncOvhClient`.
+
+    `submit` may be called from any thread. Blocking `client` is only used by
+    discovery (see `ServiceDiscovery`)."""
+
+    # no thread pool: endpoints are called by event loop
+    # pylint: disable=super-init-not-called
+    def __init__(self, client: ovh.Client, async_client: AsyncOvhClient, loop: asyncio.AbstractEventLoop):
+        self.client = client
+        self.async_client = async_client
+        self._loop = loop
+        # service fetches not done yet (awaited before closing connections when draining)
+        self._pending: set[concurrent.futures.Future] = set()
+
+    @staticmethod
+    def build(loop: asyncio.AbstractEventLoop, account: Account) -> AsyncFetchEngine:
+        """Engine of an account; `account.workers` is the maximum number of concurrent API calls."""
+        return AsyncFetchEngine(build_client(account.ovh), build_async_client(account.ovh, account.workers), loop)
+
+    def submit(
+        self,
+        service_id: str,
+        previous: OvhApiResponse | None = None,
+        ttl: typing.Mapping[str, float] | None = None,
+    ) -> concurrent.futures.Future[OvhApiResponse]:
+        """Schedule service fetch in event loop."""
+        future = asyncio.run_coroutine_threadsafe(self.async_client.fetch(service_id, previous, ttl), self._loop)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        return future
+
+    def shutdown(self, drain: bool = False):  # noqa: FBT001,FBT002
+        """Close pooled connections (in event loop), once service fetches not done yet completed if `drain`."""
+        if not self._loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._close(list(self._pending) if drain else []), self._loop)
+
+    async def _close(self, pending: list[concurrent.futures.Future]):
+        if pending:
+            await asyncio.gather(*(asyncio.wrap_future(future) for future in pending), return_exceptions=True)
+        await self.async_client.close()
+
+
+class AsyncRefreshScheduler(RefreshScheduler):
+    """Refresh scheduler running in an event loop (see `run_async`).
+
+    Services are fetched concurrently by event loop (see `AsyncFetchEngine`);
+    discovery and snapshots saving, which block, run in threads."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._async_wakeup: asyncio.Event | None = None
+
+    def _wake(self):
+        super()._wake()
+        if self._loop is not None and self._async_wakeup is not None:
+            self._loop.call_soon_threadsafe(self._async_wakeup.set)
+
+    async def refresh_async(self, services: list[Service] | None = None):
+        """Refresh all services (or only `services`) snapshots, without blocking event loop."""
+        if services is None:
+            await _in_thread(functools.partial(self._update_services, discover=True))
+            services = self._services
+        start = time.monotonic()
+        with self._lock:
+            breakers, engines = self._breakers, self._engines
+        fetches = []
+        for service in services:
+            breaker = breakers.get(service.id, None)
+            if breaker is None:
+                # removed by a configuration reload
+                continue
+            if not breaker.allow():
+                log.debug("Circuit open for service %s, refresh skipped", service.id)
+                continue
+            fetches.append(self._fetch(service, engines[service.id], start))
+        await asyncio.gather(*fetches)
+
+    async def _fetch(self, service: Service, engine: FetchEngine, start: float):
+        # only endpoints with expired data are fetched again
+        previous = self.store.get(service.id)
+        future = engine.submit(service.id, previous.response if previous else None, service.ttl)
+        try:
+            response = await asyncio.wrap_future(future)
+        except Exception as e:  # noqa: BLE001 pylint: disable=broad-exception-caught
+            self._store_snapshot(service.id, start, None, e)
+        else:
+            self._store_snapshot(service.id, start, response)
+
+    async def run_async(self):
+        """Run refresh loop in current event loop, until cancelled."""
+        self._loop = asyncio.get_running_loop()
+        self._async_wakeup = asyncio.Event()
+        next_refresh = time.monotonic()
+        while True:
+            self._async_wakeup.clear()
+            with self._lock:
+                added, self._added = self._added, []
+            if time.monotonic() >= next_refresh:
+                await self.refresh_async()
+                await _in_thread(self.save)
+                next_refresh = time.monotonic() + self._interval
+            elif added:
+                await self.refresh_async(added)
+                await _in_thread(self.save)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._async_wakeup.wait(), max(0.0, next_refresh - time.monotonic()))
+
+
+def wsgi_handler(app):
+    """aiohttp handler calling a WSGI application in event loop.
+
+    Used for exposition apps, which serve pre-rendered responses."""
+
+    async def handler(request: web.Request) -> web.Response:
+        environ = {
+            "REQUEST_METHOD": request.method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": request.path,
+            "QUERY_STRING": request.query_string,
+            "SERVER_NAME": request.url.host or "",
+            "SERVER_PORT": str(request.url.port or ""),
+            "SERVER_PROTOCOL": f"HTTP/{request.version.major}.{request.version.minor}",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": request.scheme,
+            "wsgi.input": io.BytesIO(await request.read()),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": False,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name in request.headers:
+            key = name.upper().replace("-", "_")
+            if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                key = f"HTTP_{key}"
+            environ[key] = ",".join(request.headers.getall(name))
+        started: list = []
+
+        def start_response(status, headers, _exc_info=None):
+            started[:] = [status, headers]
+
+        chunks = app(environ, start_response)
+        try:
+            body = b"".join(chunks)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+        status, headers = started
+        code, _, reason = status.partition(" ")
+        return web.Response(status=int(code), reason=reason or None, headers=headers, body=body)
+
+    return handler
+
+
+def _credentials(authorization: str) -> tuple[bytes, bytes] | None:
+    """Login and password of a basic Authorization header."""
+    if not authorization.startswith("Basic "):
+        return None
+    try:
+        login, separator, password = base64.b64decode(authorization[6:], validate=True).partition(b":")
+    except (binascii.Error, ValueError):
+        return None
+    return (login, password) if separator else None
+
+
+def basic_auth_middleware(login: str, password: str, realm: str = "ovh_exporter"):
+    """aiohttp middleware checking basic authentication (see `wsgi.BasicAuthMiddleware`)."""
+    expected = (login.encode(), password.encode())
+
+    @web.middleware
+    async def middleware(request: web.Request, handler):
+        credentials = _credentials(request.headers.get("Authorization", ""))
+        # constant-time comparisons
+        if credentials is None or not all(map(hmac.compare_digest, credentials, expected)):
+            return web.Response(status=401, headers={"WWW-Authenticate": f'Basic realm={realm}, charset="UTF-8"'})
+        return await handler(request)
+
+    return middleware
+
+
+def build_app(app, basic_auth: tuple[str, str] | None = None) -> web.Application:
+    """aiohttp application serving WSGI `app` on all paths."""
+    middlewares = [basic_auth_middleware(*basic_auth)] if basic_auth is not None else []
+    web_app = web.Application(middlewares=middlewares)
+    web_app.router.add_route("*", "/{path:.*}", wsgi_handler(app))
+    return web_app
+
+
+# pylint: disable=too-many-arguments
+async def serve(
+    web_app: web.Application,
+    scheduler: AsyncRefreshScheduler,
+    bind_addr: str,
+    bind_port: int,
+    ssl_context: ssl.SSLContext | None = None,
+    reloader: ConfigReloader | None = None,
+):
+    """Serve `web_app` and run `scheduler` refresh loop until SIGINT or SIGTERM; SIGHUP reloads configuration."""
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+    if reloader is not None:
+        loop.add_signal_handler(signal.SIGHUP, reloader.request)
+        reloader.start()
+    runner = web.AppRunner(web_app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, bind_addr, bind_port, ssl_context=ssl_context).start()
+    refresh = asyncio.create_task(scheduler.run_async())
+    log.info("Serving on %s:%s (asyncio engine)", bind_addr, bind_port)
+    try:
+        await stopped.wait()
+    finally:
+        refresh.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await refresh
+        await runner.cleanup()
+        # engines shutdown and snapshots saving block
+        await _in_thread(scheduler.stop)
+        # wait for connections closing scheduled by engines shutdown
+        pending = asyncio.all_tasks() - {asyncio.current_task()}
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+# pylint: disable=too-many-arguments
+def run_server(
+    loop: asyncio.AbstractEventLoop,
+    app,
+    scheduler: AsyncRefreshScheduler,
+    bind_addr: str = "127.0.0.1",
+    bind_port: int = 9100,
+    cert_file: str | None = None,
+    key_file: str | None = None,
+    basic_auth: tuple[str, str] | None = None,
+    reloader: ConfigReloader | None = None,
+):
+    """Serve WSGI `app` and refresh services in `loop`, the loop engines were built with (see `AsyncFetchEngine`)."""
+    ssl_context = None
+    if cert_file and key_file:
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(cert_file, key_file)
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(
+            serve(build_app(app, basic_auth), scheduler, bind_addr, bind_port, ssl_context, reloader)
+        )
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
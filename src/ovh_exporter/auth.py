@@ -1,5 +1,7 @@
 """OVH authentication utility."""
 
+from __future__ import annotations
+
 import datetime
 import fileinput
 import http.server
@@ -7,31 +9,39 @@ import os.path
 import re
 import subprocess
 import threading
+import typing
 
 import ovh
 
-from ovh_exporter.config import Config
 from ovh_exporter.logger import log
 
+if typing.TYPE_CHECKING:
+    from ovh_exporter.config import Account, Config
+
 
-def login(config: Config):
-    """Init an auth process. Consumer key is displayed in console and
-    `env_file` is updated if provided (replace any OVH_CONSUMER_KEY
-    declaration)."""
+def login(config: Config, account: Account | None = None):
+    """Init an auth process for `account` (default to first account). Consumer
+    key is displayed in console and `env_file` is updated if provided (replace
+    any OVH_CONSUMER_KEY declaration)."""
+    account = account if account is not None else config.account()
     client = ovh.Client(
-        endpoint=config.ovh.endpoint,
-        application_key=config.ovh.application_key,
-        application_secret=config.ovh.application_secret,
+        endpoint=account.ovh.endpoint,
+        application_key=account.ovh.application_key,
+        application_secret=account.ovh.application_secret,
     )
     req = ovh.ConsumerKeyRequest(client=client)
     req.add_rule("GET", "/me")
-    for service in config.services:
+    for service in account.services:
         req.add_rule("GET", f"/cloud/project/{service.id}")
         req.add_rule("GET", f"/cloud/project/{service.id}/quota")
         req.add_rule("GET", f"/cloud/project/{service.id}/instance")
         req.add_rule("GET", f"/cloud/project/{service.id}/storage")
         req.add_rule("GET", f"/cloud/project/{service.id}/usage/current")
         req.add_rule("GET", f"/cloud/project/{service.id}/volume")
+    if account.discovery.enabled:
+        # discovered projects are not known yet
+        req.add_rule("GET", "/cloud/project")
+        req.add_rule("GET", "/cloud/project/*")
     pending_request = req.request("http://localhost:8000/")
     if os.path.exists("/usr/bin/xdg-open"):
         subprocess.check_call(["/usr/bin/xdg-open", pending_request["validationUrl"]])
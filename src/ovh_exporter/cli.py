@@ -1,23 +1,33 @@
 """Command line entry-points."""
 
+from __future__ import annotations
+
+# Commands import their dependencies (OVH client, prometheus_client, gunicorn, ...)
+# when run, so that CLI startup only pays for configuration loading.
+# pylint: disable=import-outside-toplevel
+import functools
 import logging
 import os
 import os.path
+import shutil
+import signal
 import sys
+import tempfile
+import typing
 
 import click
-import dotenv
-import yaml
-from prometheus_client import REGISTRY
-from prometheus_client.exposition import make_wsgi_app
-
-from ovh_exporter import auth
-from ovh_exporter.collector import OvhCollector
-from ovh_exporter.config import Config, expandvars, validate
+
+from ovh_exporter.config import load_file
 from ovh_exporter.logger import init_logging, log
-from ovh_exporter.ovh_client import build_client, fetch
-from ovh_exporter.wsgi import BasicAuthMiddleware, run_server
 
+if typing.TYPE_CHECKING:
+    from ovh_exporter.config import Account, Collector, Config, Service
+    from ovh_exporter.reload import AccountSource, ConfigReloader
+    from ovh_exporter.scheduler import RefreshScheduler, SchedulerProcess
+    from ovh_exporter.snapshot import SnapshotStore
+
+# delay given to a running refresh on shutdown (seconds)
+STOP_TIMEOUT = 5
 VERBOSITY = {"info": logging.INFO, "debug": logging.DEBUG, "warning": logging.WARNING, "error": logging.ERROR}
 
 
@@ -36,38 +46,179 @@ VERBOSITY = {"info": logging.INFO, "debug": logging.DEBUG, "warning": logging.WA
 def main(ctx, config, verbosity):
     """Command line entry-point. Load configuration."""
     init_logging(VERBOSITY[verbosity])
-    with open(config, encoding="utf-8") as fstream:
-        # Load configuration
-        config_dict = yaml.safe_load(fstream)
-        validate(config_dict)
-        # Load environment file if provided
-        if "env_file" in config_dict and config_dict["env_file"] and os.path.exists(config_dict["env_file"]):
-            env_file = config_dict["env_file"]
-            log.info("Loading environment file %s", env_file)
-            dotenv.load_dotenv(env_file)
-        # Expand environment variables in config
-        expandvars(config_dict)
-        # Set on context
-        ctx.obj = Config.load(config_dict)
+    ctx.obj = load_file(config)
+
+
+def _services(config: Config, account: Account, client) -> list[Service]:
+    """Account services, discovered ones included."""
+    from ovh_exporter.discovery import build_discovery  # noqa: PLC0415
+
+    discovery = build_discovery(config, account, client)
+    return discovery.services() if discovery is not None else account.services
 
 
 @main.command("ovh")
+@click.option("-a", "--account", "account_name", help="Account name (default: first account)")
 @click.pass_context
-def ovh(ctx):
+def ovh(ctx, account_name):
     """OVH client test."""
-    service_id = ctx.obj.services[0].id
-    client = build_client(ctx.obj.ovh)
-    fetch(client, service_id)
+    from ovh_exporter.ovh_client import build_client, fetch  # noqa: PLC0415
+
+    account = ctx.obj.account(account_name)
+    client = build_client(account.ovh)
+    fetch(client, _services(ctx.obj, account, client)[0].id)
+
+
+@main.command("record")
+@click.option("-o", "--output", type=click.Path(dir_okay=False), default="recording.json", show_default=True)
+@click.option("-s", "--service", "service_ids", multiple=True, help="Service id to record (default: all services)")
+@click.pass_context
+def record(ctx, output, service_ids):
+    """Record sanitized OVH API responses (replayed by ovh_exporter_fake_api)."""
+    from ovh_exporter import recording  # noqa: PLC0415
+    from ovh_exporter.ovh_client import build_client  # noqa: PLC0415
+
+    sanitizer = recording.Sanitizer()
+    recorded = {"version": recording.RECORDING_VERSION, "services": {}}
+    for account in ctx.obj.accounts:
+        client = build_client(account.ovh)
+        account_ids = [service.id for service in _services(ctx.obj, account, client)]
+        if service_ids:
+            account_ids = [service_id for service_id in account_ids if service_id in service_ids]
+        recorded["services"].update(recording.record(client, account_ids, sanitizer)["services"])
+    recording.save(recorded, output)
+    print(f"{len(recorded['services'])} services recorded in {output}")  # noqa: T201
+
+
+def _stop_leader(leader: SchedulerProcess, scheduler: RefreshScheduler, temporary_dir: str | None = None):
+    """Stop collector process, save snapshots it shared, then remove temporary shared directory."""
+    leader.stop()
+    scheduler.save()
+    if temporary_dir is not None:
+        shutil.rmtree(temporary_dir, ignore_errors=True)
+
+
+def _start_worker(scheduler: RefreshScheduler, reloader: ConfigReloader):
+    """Start refresh and configuration file watch of a server worker."""
+    scheduler.start()
+    reloader.start()
+
+
+def _reload_master(reloader: ConfigReloader, scheduler: RefreshScheduler, snapshot_file: str | None):
+    """Prepare workers started by a gunicorn reload (SIGHUP): latest configuration and saved snapshots."""
+    # workers are replaced, and their snapshots lost: new ones start from saved snapshots
+    if snapshot_file:
+        scheduler.store.load(snapshot_file)
+    reloader.reload()
+
+
+def _gunicorn_hooks(
+    collector: Collector, scheduler: RefreshScheduler, reloader: ConfigReloader, temporary_dir: str | None = None
+) -> dict:
+    """gunicorn server hooks running scheduler and configuration reload (`temporary_dir` is removed on exit)."""
+    from ovh_exporter.scheduler import SchedulerProcess  # noqa: PLC0415
+
+    if collector.mode == "shared":
+        leader = SchedulerProcess(scheduler, reloader)
+        return {
+            "when_ready": lambda _server: leader.start(),
+            "on_reload": lambda _server: leader.signal(signal.SIGHUP),
+            "on_exit": lambda _server: _stop_leader(leader, scheduler, temporary_dir),
+        }
+    # background refresh; started in each worker (threads are not inherited from master)
+    return {
+        "post_worker_init": lambda _worker: _start_worker(scheduler, reloader),
+        "on_reload": lambda _server: _reload_master(reloader, scheduler, collector.snapshot_file),
+        "worker_exit": lambda _server, _worker: scheduler.stop(STOP_TIMEOUT),
+    }
+
+
+def _build_scheduler(
+    ctx, scheduler_class: type[RefreshScheduler], store: SnapshotStore | None = None, build_engine=None
+) -> tuple[RefreshScheduler, ConfigReloader, dict[str, AccountSource]]:
+    """Refresh scheduler of all configured accounts, with configuration reload."""
+    from ovh_exporter.reload import ConfigReloader, build_sources, fetch_engine, sources_accounts  # noqa: PLC0415
+
+    collector = ctx.obj.collector
+    build_engine = build_engine or fetch_engine
+    # each account has its own client (rate limits, retries, connections) and fetch workers;
+    # with discovery, services are listed by scheduler
+    sources = build_sources(ctx.obj, build_engine=build_engine)
+    for name, source in sources.items():
+        log.info("Account %s: %s services, %s workers", name, len(source.account.services), source.account.workers)
+    (account_engine, services, discovery), *accounts = sources_accounts(sources)
+    scheduler = scheduler_class(
+        account_engine,
+        services,
+        collector.refresh_interval,
+        store,
+        collector.circuit_breaker.failure_threshold,
+        collector.circuit_breaker.reset_timeout,
+        discovery,
+        collector.snapshot_file,
+    )
+    for account in accounts:
+        scheduler.add_account(*account)
+    if collector.snapshot_file:
+        # warm restart: previous snapshots are served (and only expired endpoints fetched) until refreshed
+        scheduler.store.load(collector.snapshot_file)
+    # services changes are applied without restart (configuration file watched, SIGHUP)
+    reloader = ConfigReloader(ctx.find_root().params["config"], ctx.obj, scheduler, sources, build_engine)
+    return scheduler, reloader, sources
 
 
 @main.command("server")
+@click.option(
+    "--engine",
+    type=click.Choice(["gunicorn", "async"]),
+    default="gunicorn",
+    show_default=True,
+    help="gunicorn: forked workers; async: a single process and asyncio event loop (async extra)",
+)
 @click.pass_context
-def server(ctx):
+def server(ctx, engine):
     """Exporter startup"""
-    # load client
-    client = build_client(ctx.obj.ovh)
-    # initialize registry
-    REGISTRY.register(OvhCollector(client, ctx.obj.services))
+    from prometheus_client import REGISTRY, CollectorRegistry  # noqa: PLC0415
+
+    from ovh_exporter import json_backend  # noqa: PLC0415
+    from ovh_exporter.collector import OvhCollector, SnapshotAgeCollector  # noqa: PLC0415
+    from ovh_exporter.exposition import CachedMetricsApp, ExpositionCache, ProbeApp  # noqa: PLC0415
+    from ovh_exporter.reload import fetch_engine, labelnames  # noqa: PLC0415
+    from ovh_exporter.scheduler import RefreshScheduler  # noqa: PLC0415
+    from ovh_exporter.snapshot import FileSnapshotStore  # noqa: PLC0415
+    from ovh_exporter.wsgi import BasicAuthMiddleware, run_server  # noqa: PLC0415
+
+    collector = ctx.obj.collector
+    log.info("OVH API responses decoded with %s", json_backend.set_backend(collector.json_backend))
+    store = None
+    loop = None
+    temporary_dir = None
+    build_engine = fetch_engine
+    scheduler_class = RefreshScheduler
+    if engine == "async":
+        # services are fetched by the event loop serving metrics
+        import asyncio  # noqa: PLC0415
+
+        from ovh_exporter import aio  # noqa: PLC0415
+
+        loop = asyncio.new_event_loop()
+        build_engine = functools.partial(aio.AsyncFetchEngine.build, loop)
+        scheduler_class = aio.AsyncRefreshScheduler
+    elif collector.mode == "shared":
+        # a single collector process, forked by gunicorn master, fetches for all workers
+        shared_dir = collector.shared_dir
+        if not shared_dir:
+            shared_dir = temporary_dir = tempfile.mkdtemp(prefix="ovh_exporter-")
+        store = FileSnapshotStore(shared_dir)
+        log.info("Shared collection mode, snapshots in %s", shared_dir)
+    scheduler, reloader, sources = _build_scheduler(ctx, scheduler_class, store, build_engine)
+    # OVH metrics are rendered once by refresh; default registry (process metrics,
+    # snapshot age) is rendered on each scrape. Services are the ones published by
+    # scheduler, so that they follow discovery and configuration reloads.
+    ovh_collector = OvhCollector(scheduler.store, None, labelnames(sources))
+    ovh_registry = CollectorRegistry()
+    ovh_registry.register(ovh_collector)
+    REGISTRY.register(SnapshotAgeCollector(ovh_collector))
     scheme = "http"
     tls = ctx.obj.server.tls
     cert_file = None
@@ -83,20 +234,103 @@ def server(ctx):
         cert_file = tls.cert_file
         key_file = tls.key_file
     basic_auth = ctx.obj.server.basic_auth
-    wsgi_app = make_wsgi_app(REGISTRY)
+    # /probe?target=<service id>; in shared mode, only the collector process calls OVH API, and
+    # the event loop cannot wait for its own fetches
+    refresh = scheduler.refresh_service if engine == "gunicorn" and collector.mode == "worker" else None
+    probe = ProbeApp(ovh_collector, refresh, collector.refresh_interval)
+    wsgi_app = CachedMetricsApp(ExpositionCache(ovh_registry, ovh_collector.version), REGISTRY, probe)
+    credentials = None
     if basic_auth.enabled:
         if not basic_auth.login or not basic_auth.password:
             print("Login and password for basic auth are missing.", file=sys.stderr)  # noqa: T201
             ctx.exit(1)
-        wsgi_app = BasicAuthMiddleware(wsgi_app, basic_auth.login, basic_auth.password)
+        credentials = (basic_auth.login, basic_auth.password)
     bind_addr = ctx.obj.server.bind_addr
     bind_port = ctx.obj.server.port
     print(f"Visit {scheme}://{bind_addr}:{bind_port}/metrics to view metrics.")  # noqa: T201
-    run_server(wsgi_app, bind_addr, bind_port, cert_file, key_file)
+    if loop is not None:
+        from ovh_exporter.aio import run_server as run_async_server  # noqa: PLC0415
+
+        run_async_server(loop, wsgi_app, scheduler, bind_addr, bind_port, cert_file, key_file, credentials, reloader)
+        return
+    if credentials is not None:
+        wsgi_app = BasicAuthMiddleware(wsgi_app, *credentials)
+    run_server(
+        wsgi_app,
+        bind_addr,
+        bind_port,
+        cert_file,
+        key_file,
+        _gunicorn_hooks(collector, scheduler, reloader, temporary_dir),
+    )
+
+
+@main.command("push")
+@click.option("--once", is_flag=True, help="Refresh all services and push their metrics once, then exit")
+@click.pass_context
+def push(ctx, once):
+    """Push metrics to a Prometheus remote-write endpoint (push configuration)."""
+    import threading  # noqa: PLC0415
+
+    from prometheus_client import CollectorRegistry  # noqa: PLC0415
+
+    from ovh_exporter import json_backend  # noqa: PLC0415
+    from ovh_exporter.collector import OvhCollector  # noqa: PLC0415
+    from ovh_exporter.reload import labelnames  # noqa: PLC0415
+    from ovh_exporter.remote_write import RemoteWriter  # noqa: PLC0415
+    from ovh_exporter.resilience import RetryPolicy  # noqa: PLC0415
+    from ovh_exporter.scheduler import RefreshScheduler  # noqa: PLC0415
+
+    settings = ctx.obj.push
+    if settings is None:
+        print("push configuration (remote-write url) is missing.", file=sys.stderr)  # noqa: T201
+        ctx.exit(1)
+    log.info("OVH API responses decoded with %s", json_backend.set_backend(ctx.obj.collector.json_backend))
+    scheduler, reloader, sources = _build_scheduler(ctx, RefreshScheduler)
+    registry = CollectorRegistry()
+    registry.register(OvhCollector(scheduler.store, None, labelnames(sources)))
+    retry = settings.retry
+    writer = RemoteWriter(
+        settings.url,
+        settings.batch_size,
+        settings.max_buffer,
+        settings.resend_interval,
+        settings.timeout,
+        settings.headers,
+        settings.basic_auth,
+        RetryPolicy(retry.max_attempts, retry.backoff, retry.max_backoff),
+    )
+    if once:
+        try:
+            scheduler.refresh()
+            log.info("%s series pushed to %s", writer.push(registry.collect()), settings.url)
+        finally:
+            scheduler.stop(STOP_TIMEOUT)
+            writer.close()
+        if writer.pending:
+            ctx.exit(1)
+        return
+    stopped = threading.Event()
+    signal.signal(signal.SIGINT, lambda _signum, _frame: stopped.set())
+    signal.signal(signal.SIGTERM, lambda _signum, _frame: stopped.set())
+    signal.signal(signal.SIGHUP, lambda _signum, _frame: reloader.request())
+    scheduler.start()
+    reloader.start()
+    log.info("Pushing metrics to %s every %ss", settings.url, settings.interval)
+    try:
+        # samples are the ones of latest refresh; services without snapshot yet are skipped
+        while not stopped.wait(settings.interval):
+            log.debug("%s series pushed", writer.push(registry.collect()))
+    finally:
+        scheduler.stop(STOP_TIMEOUT)
+        writer.close()
 
 
 @main.command("login")
+@click.option("-a", "--account", "account_name", help="Account name (default: first account)")
 @click.pass_context
-def login(ctx):
+def login(ctx, account_name):
     """Perform login (retrieve consumerKey). Updated env_file if configured."""
-    auth.login(ctx.obj)
+    from ovh_exporter import auth  # noqa: PLC0415
+
+    auth.login(ctx.obj, ctx.obj.account(account_name))
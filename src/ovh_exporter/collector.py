@@ -2,624 +2,314 @@
 
 from __future__ import annotations
 
+import sys
+import threading
+import time
 import typing
 
 from prometheus_client.core import GaugeMetricFamily
 
-from ovh_exporter import ovh_client
+from ovh_exporter.config import Service
+from ovh_exporter.instrumentation import COLLECT_DURATION_BUCKETS, Histogram, add_api_stats
 from ovh_exporter.logger import log
+from ovh_exporter.metric_spec import FAMILIES, compile_tables, describe_families
 
 if typing.TYPE_CHECKING:
-    import ovh
+    from prometheus_client.metrics_core import Metric
 
-    from ovh_exporter.config import Service
+    from ovh_exporter.metric_spec import CompiledTable
+    from ovh_exporter.snapshot import Snapshot, SnapshotStore
 
 
-# pylint: disable=too-many-instance-attributes,too-few-public-methods
 class Metrics:
-    """Metrics wrapper."""
+    """Metric families of `metric_spec.FAMILIES`, as attributes named after families."""
 
-    # pylint: disable=too-many-statements
     def __init__(self, labelnames):
-        # Storage
-        storage_usage_labels = ["service_id", "region", "flavor", "storage_name"]
-        self.ovh_usage_storage_gb_hours = GaugeMetricFamily(
-            "ovh_usage_storage_gb_hours",
-            "Storage usage in gb x hours",
-            labels=labelnames + storage_usage_labels,
-        )
-        self.ovh_usage_storage_price = GaugeMetricFamily(
-            "ovh_usage_storage_price",
-            "Storage usage price",
-            labels=labelnames + storage_usage_labels,
-        )
-        self.ovh_usage_storage_bandwidth_external_outgoing_gb = GaugeMetricFamily(
-            "ovh_usage_storage_bandwidth_external_outgoing_gb",
-            "Storage usage external outgoing bandwidth in gb",
-            labels=labelnames + storage_usage_labels,
-        )
-        self.ovh_usage_storage_bandwidth_external_outgoing_price = GaugeMetricFamily(
-            "ovh_usage_storage_bandwidth_external_outgoing_price",
-            "Storage usage external outgoing bandwidth price",
-            labels=labelnames + storage_usage_labels,
-        )
-        self.ovh_usage_storage_bandwidth_internal_outgoing_gb = GaugeMetricFamily(
-            "ovh_usage_storage_bandwidth_internal_outgoing_gb",
-            "Storage usage external outgoing bandwidth in gb",
-            labels=labelnames + storage_usage_labels,
-        )
-        self.ovh_usage_storage_bandwidth_internal_outgoing_price = GaugeMetricFamily(
-            "ovh_usage_storage_bandwidth_internal_outgoing_price",
-            "Storage usage external outgoing bandwidth price",
-            labels=labelnames + storage_usage_labels,
-        )
-        self.ovh_usage_storage_bandwidth_external_incoming_gb = GaugeMetricFamily(
-            "ovh_usage_storage_bandwidth_external_incoming_gb",
-            "Storage usage external incoming bandwidth in gb",
-            labels=labelnames + storage_usage_labels,
-        )
-        self.ovh_usage_storage_bandwidth_external_incoming_price = GaugeMetricFamily(
-            "ovh_usage_storage_bandwidth_external_incoming_price",
-            "Storage usage external incoming bandwidth price",
-            labels=labelnames + storage_usage_labels,
-        )
-        self.ovh_usage_storage_bandwidth_internal_incoming_gb = GaugeMetricFamily(
-            "ovh_usage_storage_bandwidth_internal_incoming_gb",
-            "Storage usage external incoming bandwidth in gb",
-            labels=labelnames + storage_usage_labels,
-        )
-        self.ovh_usage_storage_bandwidth_internal_incoming_price = GaugeMetricFamily(
-            "ovh_usage_storage_bandwidth_internal_incoming_price",
-            "Storage usage external incoming bandwidth price",
-            labels=labelnames + storage_usage_labels,
-        )
-
-        # Volumes
-        volume_labels = ["service_id", "volume_id", "name", "region", "type"]
-        self.ovh_volume_size_gb = GaugeMetricFamily(
-            "ovh_volume_size_gb", "Volume size in Gb", labels=labelnames + volume_labels
-        )
-
-        # Volumes quota
-        volume_quota_labels = ["service_id", "region"]
-        self.ovh_quota_volume_gb = GaugeMetricFamily(
-            "ovh_quota_volume_gb", "Volume gigabytes", labels=labelnames + volume_quota_labels
-        )
-        self.ovh_quota_volume_max_gb = GaugeMetricFamily(
-            "ovh_quota_volume_max_gb",
-            "Volume max gigabytes",
-            labels=labelnames + volume_quota_labels,
-        )
-        self.ovh_quota_volume_backup_gb = GaugeMetricFamily(
-            "ovh_quota_volume_backup_gb",
-            "Volume backup gigabytes",
-            labels=labelnames + volume_quota_labels,
-        )
-        self.ovh_quota_volume_backup_max_gb = GaugeMetricFamily(
-            "ovh_quota_volume_backup_max_gb",
-            "Volume backup max gigabytes",
-            labels=labelnames + volume_quota_labels,
-        )
-        self.ovh_quota_volume_count = GaugeMetricFamily(
-            "ovh_quota_volume_count", "Volume count", labels=labelnames + volume_quota_labels
-        )
-        self.ovh_quota_volume_max_count = GaugeMetricFamily(
-            "ovh_quota_volume_max_count", "Volume max count", labels=labelnames + volume_quota_labels
-        )
-        self.ovh_quota_volume_backup_count = GaugeMetricFamily(
-            "ovh_quota_volume_backup_count", "Volume count", labels=labelnames + volume_quota_labels
-        )
-        self.ovh_quota_volume_backup_max_count = GaugeMetricFamily(
-            "ovh_quota_volume_backup_max_count",
-            "Volume max count",
-            labels=labelnames + volume_quota_labels,
-        )
+        self.families: dict[str, Metric] = {spec.name: spec.family(labelnames) for spec in FAMILIES}
 
-        # Instances
-        instance_labels = ["service_id", "region"]
-        self.ovh_quota_instance_count = GaugeMetricFamily(
-            "ovh_quota_instance_count", "Instance count", labels=labelnames + instance_labels
-        )
-        self.ovh_quota_instance_max_count = GaugeMetricFamily(
-            "ovh_quota_instance_max_count", "Instance max count", labels=labelnames + instance_labels
-        )
-        self.ovh_quota_cpu_count = GaugeMetricFamily(
-            "ovh_quota_cpu_count", "CPU count", labels=labelnames + instance_labels
-        )
-        self.ovh_quota_cpu_max_count = GaugeMetricFamily(
-            "ovh_quota_cpu_max_count", "CPU max count", labels=labelnames + instance_labels
-        )
-        self.ovh_quota_ram_gb = GaugeMetricFamily("ovh_quota_ram_gb", "RAM count", labels=labelnames + instance_labels)
-        self.ovh_quota_ram_max_gb = GaugeMetricFamily(
-            "ovh_quota_ram_max_gb", "RAM max count", labels=labelnames + instance_labels
-        )
+    def __getattr__(self, name) -> typing.Any:
+        try:
+            return self.__dict__["families"][name]
+        except KeyError:
+            raise AttributeError(name) from None
 
-        # Network quota
-        network_quota_labels = ["service_id", "region"]
-        self.ovh_quota_network_count = GaugeMetricFamily(
-            "ovh_quota_network_count", "Network count", labels=labelnames + network_quota_labels
-        )
-        self.ovh_quota_network_max_count = GaugeMetricFamily(
-            "ovh_quota_network_max_count",
-            "Network max count",
-            labels=labelnames + network_quota_labels,
-        )
-        self.ovh_quota_network_subnet_count = GaugeMetricFamily(
-            "ovh_quota_network_subnet_count",
-            "Network subnet count",
-            labels=labelnames + network_quota_labels,
-        )
-        self.ovh_quota_network_subnet_max_count = GaugeMetricFamily(
-            "ovh_quota_network_subnet_max_count",
-            "Network subnet max count",
-            labels=labelnames + network_quota_labels,
-        )
-        self.ovh_quota_network_floating_ip_count = GaugeMetricFamily(
-            "ovh_quota_network_floating_ip_count",
-            "Network floating IP count",
-            labels=labelnames + network_quota_labels,
-        )
-        self.ovh_quota_network_floating_ip_max_count = GaugeMetricFamily(
-            "ovh_quota_network_floating_ip_max_count",
-            "Network floating IP max count",
-            labels=labelnames + network_quota_labels,
-        )
-        self.ovh_quota_network_gateway_count = GaugeMetricFamily(
-            "ovh_quota_network_gateway_count",
-            "Network gateway count",
-            labels=labelnames + network_quota_labels,
-        )
-        self.ovh_quota_network_gateway_max_count = GaugeMetricFamily(
-            "ovh_quota_network_gateway_max_count",
-            "Network gateway max count",
-            labels=labelnames + network_quota_labels,
-        )
-
-        # load balancer quota
-        load_balancer_quota_labels = ["service_id", "region"]
-        self.ovh_quota_load_balancer_count = GaugeMetricFamily(
-            "ovh_quota_load_balancer_count",
-            "Load balancer count",
-            labels=labelnames + load_balancer_quota_labels,
-        )
-        self.ovh_quota_load_balancer_max_count = GaugeMetricFamily(
-            "ovh_quota_load_balancer_max_count",
-            "Load balancer max count",
-            labels=labelnames + load_balancer_quota_labels,
-        )
-
-        # keymanager quota
-        keymanager_labels = ["service_id", "region"]
-        self.ovh_quota_keymanager_secret_count = GaugeMetricFamily(
-            "ovh_quota_keymanager_secret_count",
-            "Key manager count",
-            labels=labelnames + keymanager_labels,
-        )
-        self.ovh_quota_keymanager_secret_max_count = GaugeMetricFamily(
-            "ovh_quota_keymanager_secret_max_count",
-            "Key manager max count",
-            labels=labelnames + keymanager_labels,
-        )
-
-        # storage
-        storage_labels = [
-            "service_id",
-            "region",
-            "storage_id",
-            "storage_name",
-            "storage_type",
-        ]
-        self.ovh_storage_size_bytes = GaugeMetricFamily(
-            "ovh_storage_size_bytes", "Storage size in bytes", labels=labelnames + storage_labels
-        )
-        self.ovh_storage_object_count = GaugeMetricFamily(
-            "ovh_storage_object_count", "Storage object count", labels=labelnames + storage_labels
-        )
-
-        # instance usage
-        instance_usage_labels = [
-            "service_id",
-            "region",
-            "instance_id",
-            "type",
-            "flavor",
-        ]
-        self.ovh_usage_instance_hours = GaugeMetricFamily(
-            "ovh_usage_instance_hours",
-            "Instance usage in hours",
-            labels=labelnames + instance_usage_labels,
-        )
-        self.ovh_usage_instance_price = GaugeMetricFamily(
-            "ovh_usage_instance_price",
-            "Instance usage price",
-            labels=labelnames + instance_usage_labels,
-        )
-
-        # volume usage
-        volume_usage_labels = ["service_id", "region", "volume_id", "flavor"]
-        self.ovh_usage_volume_gb_hours = GaugeMetricFamily(
-            "ovh_usage_volume_gb_hours",
-            "Volume usage in gb x hours",
-            labels=labelnames + volume_usage_labels,
-        )
-        self.ovh_usage_volume_price = GaugeMetricFamily(
-            "ovh_usage_volume_price", "Volume usage price", labels=labelnames + volume_usage_labels
-        )
-
-    # pylint: disable=too-many-statements
     def do_yield(self):
         """Perform all yields."""
-        yield self.ovh_quota_instance_count
-        yield self.ovh_quota_instance_max_count
-        yield self.ovh_quota_cpu_count
-        yield self.ovh_quota_cpu_max_count
-        yield self.ovh_quota_ram_gb
-        yield self.ovh_quota_ram_max_gb
-
-        yield self.ovh_quota_volume_gb
-        yield self.ovh_quota_volume_max_gb
-        yield self.ovh_quota_volume_count
-        yield self.ovh_quota_volume_max_count
-        yield self.ovh_quota_volume_backup_gb
-        yield self.ovh_quota_volume_backup_max_gb
-        yield self.ovh_quota_volume_backup_count
-        yield self.ovh_quota_volume_backup_max_count
-
-        yield self.ovh_quota_network_count
-        yield self.ovh_quota_network_max_count
-        yield self.ovh_quota_network_subnet_count
-        yield self.ovh_quota_network_subnet_max_count
-        yield self.ovh_quota_network_floating_ip_count
-        yield self.ovh_quota_network_floating_ip_max_count
-        yield self.ovh_quota_network_gateway_count
-        yield self.ovh_quota_network_gateway_max_count
-
-        yield self.ovh_quota_load_balancer_count
-        yield self.ovh_quota_load_balancer_max_count
-
-        yield self.ovh_quota_keymanager_secret_count
-        yield self.ovh_quota_keymanager_secret_max_count
-
-        yield self.ovh_storage_object_count
-        yield self.ovh_storage_size_bytes
-
-        yield self.ovh_usage_instance_hours
-        yield self.ovh_usage_instance_price
-
-        yield self.ovh_usage_volume_gb_hours
-        yield self.ovh_usage_volume_price
-
-        yield self.ovh_usage_storage_price
-        yield self.ovh_usage_storage_gb_hours
-        yield self.ovh_usage_storage_bandwidth_internal_outgoing_price
-        yield self.ovh_usage_storage_bandwidth_internal_outgoing_gb
-        yield self.ovh_usage_storage_bandwidth_internal_incoming_price
-        yield self.ovh_usage_storage_bandwidth_internal_incoming_gb
-        yield self.ovh_usage_storage_bandwidth_external_outgoing_price
-        yield self.ovh_usage_storage_bandwidth_external_outgoing_gb
-        yield self.ovh_usage_storage_bandwidth_external_incoming_price
-        yield self.ovh_usage_storage_bandwidth_external_incoming_gb
+        yield from self.families.values()
+
+    def extend(self, samples: typing.Mapping[str, list]):
+        """Append samples lists by family name."""
+        for name, family_samples in samples.items():
+            self.families[name].samples.extend(family_samples)
 
 
 # pylint: disable=too-few-public-methods
 class OvhCollector:
-    """OVH collector."""
-
-    def __init__(self, client: ovh.Client, services: list[Service]):
-        self._client: ovh.Client = client
-        self._services: list[Service] = services
+    """OVH collector.
+
+    Metrics are built from the latest snapshots refreshed in background; collect
+    does not perform any OVH API call.
+
+    Samples of each service payload are kept as a fragment, only built again
+    when the payload content changes: collect cost depends on changed payloads,
+    not on the number of services."""
+
+    def __init__(self, store: SnapshotStore, services: list[Service] | None, labelnames: list[str] | None = None):
+        """`services` None: collect services published by scheduler (see `SnapshotStore.get_services`),
+        which label names are `labelnames`."""
+        self._store: SnapshotStore = store
+        self._dynamic = services is None
+        if labelnames is None:
+            labelnames = list(services[0].labels.keys()) if services else []
+        self.labelnames = labelnames
+        self._services: list[Service] = []
         self.labels: typing.Mapping[str, typing.Sequence[str]] = {}
-        self.labelnames = []
-        if services:
-            labelset = set(services[0].labels.keys())
-            self.labelnames = list(services[0].labels.keys())
-            for service in services:
-                service_labelset = set(service.labels.keys())
-                if labelset != service_labelset:
-                    raise RuntimeError("Service label names must be the same for all services")  # noqa: TRY003,EM101
-                self.labels[service.id] = [service.labels[name] for name in self.labelnames]
-
-    def _labels(self, service, labels):
-        value = []
-        value.extend(self.labels[service.id])
-        value.extend(labels)
-        return value
+        # service id -> label values of service families (custom labels and service id)
+        self._prefixes: dict[str, tuple[str, ...]] = {}
+        # snapshot response attribute -> tables of its payload
+        self._sources: dict[str, list[CompiledTable]] = {}
+        for table in compile_tables(self.labelnames):
+            self._sources.setdefault(table.source, []).append(table)
+        # (service id, response attribute) -> (payload version, samples by family name)
+        self._fragments: dict[tuple[str, str], tuple[typing.Hashable, dict[str, list]]] = {}
+        self._usage_cache_hits: dict[str, int] = {}
+        # table name -> duration histogram
+        self._method_durations: dict[str, Histogram] = {}
+        self._collect_errors: dict[str, int] = {}
+        # (service id, table name) -> labels dicts by resource, kept across refreshes
+        self._labels_caches: dict[tuple[str, str], dict[tuple, dict[str, str]]] = {}
+        # published services list and its version token (dynamic services)
+        self._published: tuple[list[dict] | None, typing.Hashable] = (None, ())
+        self._collected_token: typing.Hashable = ()
+        # collect and probes may run concurrently (fragments and caches are shared)
+        self._lock = threading.Lock()
+        self.set_services(services or [])
+
+    def set_services(self, services: list[Service]):
+        """Replace collected services; samples of unchanged services are kept."""
+        labels = {}
+        for service in services:
+            if set(service.labels.keys()) != set(self.labelnames):
+                raise RuntimeError("Service label names must be the same for all services")  # noqa: TRY003,EM101
+            labels[service.id] = [service.labels[name] for name in self.labelnames]
+        prefixes = {
+            service.id: tuple(sys.intern(str(value)) for value in (*labels[service.id], service.id))
+            for service in services
+        }
+        # samples of removed services, or services which labels changed, are dropped
+        changed = {service_id for service_id, prefix in self._prefixes.items() if prefixes.get(service_id) != prefix}
+        if changed:
+            for cache in (self._fragments, self._labels_caches):
+                for key in [key for key in cache if key[0] in changed]:
+                    del cache[key]
+            for counters in (self._usage_cache_hits, self._collect_errors):
+                for service_id in changed.difference(prefixes):
+                    counters.pop(service_id, None)
+        self.labels = labels
+        self._prefixes = prefixes
+        self._services = services
+
+    def _published_services(self) -> tuple[list[dict] | None, typing.Hashable]:
+        """Services published by scheduler, with a token identifying them."""
+        published = self._store.get_services()
+        if published is not self._published[0]:
+            token = tuple((service["id"], tuple(sorted(service["labels"].items()))) for service in published or [])
+            self._published = (published, token)
+        return self._published
+
+    def _update_services(self):
+        """Follow services published by scheduler (dynamic services)."""
+        if not self._dynamic:
+            return
+        published, token = self._published_services()
+        if token != self._collected_token:
+            self.set_services([Service(service["id"], service["labels"]) for service in published or []])
+            self._collected_token = token
+
+    def version(self):
+        """Token identifying collected data; changes when any service snapshot or statistics are refreshed."""
+        versions = []
+        if self._dynamic:
+            _published, token = self._published_services()
+            service_ids = [service_id for service_id, _labels in token]
+            versions.append(token)
+        else:
+            service_ids = [service.id for service in self._services]
+        for service_id in service_ids:
+            snapshot = self._store.get(service_id)
+            versions.append(snapshot.timestamp if snapshot is not None else None)
+        stats = self._store.get_stats()
+        versions.append(stats.get("published_at") if stats is not None else None)
+        return tuple(versions)
+
+    def _age_family(self) -> GaugeMetricFamily:
+        return GaugeMetricFamily(
+            "ovh_exporter_snapshot_age_seconds",
+            "Age of the OVH API data snapshot in seconds",
+            labels=[*self.labelnames, "service_id"],
+        )
+
+    def collect_age(self):
+        """Collect snapshots age (depends on scrape time)."""
+        age = self._age_family()
+        now = time.time()
+        prefixes = self._prefixes
+        for service in self._services:
+            snapshot = self._store.get(service.id)
+            # services may be replaced by a concurrent collect
+            if snapshot is not None and service.id in prefixes:
+                age.add_metric(prefixes[service.id], snapshot.age(now))
+        yield age
 
     def describe(self):
-        """Describe metrics."""
-        metrics = Metrics(self.labelnames)
-        yield from metrics.do_yield()
+        """Describe metrics (families are not built by each call, see `metric_spec.describe_families`)."""
+        yield from describe_families(tuple(self.labelnames))
 
     def collect(self):
-        """Collect metrics."""
-        metrics = Metrics(self.labelnames)
-        for service in self._services:
-            response = ovh_client.fetch(self._client, service.id)
-            self._collect_volumes(metrics, service, response.volumes)
-            self._collect_volume_quota(metrics, service, response.quotas)
-            self._collect_instance_quota(metrics, service, response.quotas)
-            self._collect_network_quota(metrics, service, response.quotas)
-            self._collect_load_balancer_quota(metrics, service, response.quotas)
-            self._collect_keymanager_quota(metrics, service, response.quotas)
-            self._collect_storages(metrics, service, response.storages)
-            self._collect_instance_usage(metrics, service, response.usage)
-            self._collect_volume_usage(metrics, service, response.usage)
-            self._collect_storage_usage(metrics, service, response.usage)
+        """Collect metrics.
+
+        Services are collected independently: a service which metrics cannot be
+        built is skipped, other services are still exposed."""
+        with self._lock:
+            self._update_services()
+            metrics = Metrics(self.labelnames)
+            stats = self._store.get_stats()
+            services_state = stats.get("services", {}) if stats is not None else {}
+            for service in self._services:
+                self._collect_service(metrics, service, services_state.get(service.id, None))
+            self._collect_instrumentation(metrics, stats)
         yield from metrics.do_yield()
 
-    def _collect_volumes(self, metrics: Metrics, service, volumes):
-        """Collect volume information."""
-        for volume in volumes:
-            try:
-                gauge_value = int(volume["size"])
-                metrics.ovh_volume_size_gb.add_metric(
-                    self._labels(
-                        service,
-                        [
-                            service.id,
-                            volume["id"],
-                            volume["name"],
-                            volume["region"],
-                            volume["type"],
-                        ],
-                    ),
-                    gauge_value,
-                )
-            except (TypeError, ValueError):
-                log.warning("Volume %s ignored as size is missing", volume["id"])
-
-    def _collect_instance_quota(self, metrics: Metrics, service, quotas):
-        """Collect instance quota information."""
-        for quota in quotas:
-            if "instance" not in quota:
-                return
-            metrics.ovh_quota_instance_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["instance"]["usedInstances"]
-            )
-            metrics.ovh_quota_instance_max_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["instance"]["maxInstances"]
-            )
-            metrics.ovh_quota_cpu_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["instance"]["usedCores"]
-            )
-            metrics.ovh_quota_cpu_max_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["instance"]["maxCores"]
-            )
-            metrics.ovh_quota_ram_gb.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["instance"]["usedRAM"]
-            )
-            metrics.ovh_quota_ram_max_gb.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["instance"]["maxRam"]
-            )
+    def service(self, service_id: str) -> Service | None:
+        """Collected service by id."""
+        with self._lock:
+            self._update_services()
+            return next((service for service in self._services if service.id == service_id), None)
+
+    def collect_service(self, service: Service) -> list[Metric]:
+        """Metric families of a single service (see `exposition.ProbeApp`), snapshot age included."""
+        with self._lock:
+            metrics = Metrics(self.labelnames)
+            stats = self._store.get_stats()
+            state = stats.get("services", {}).get(service.id, None) if stats is not None else None
+            snapshot = self._collect_service(metrics, service, state)
+            prefix = self._prefixes[service.id]
+        age = self._age_family()
+        if snapshot is not None:
+            age.add_metric(prefix, snapshot.age())
+        return [family for family in (*metrics.do_yield(), age) if family.samples]
+
+    def _collect_service(self, metrics: Metrics, service, state) -> Snapshot | None:
+        """Collect a service metrics from its latest snapshot (returned)."""
+        snapshot = self._store.get(service.id)
+        self._collect_state(metrics, service, snapshot, state)
+        if snapshot is None:
+            log.debug("No data yet for service %s", service.id)
+            return None
+        start = time.perf_counter()
+        try:
+            fragments = self._collect_fragments(service, snapshot)
+        except Exception:  # noqa: BLE001 pylint: disable=broad-exception-caught
+            log.exception("Metrics collection failed for service %s", service.id)
+            self._collect_errors[service.id] = self._collect_errors.get(service.id, 0) + 1
+        else:
+            for fragment in fragments:
+                metrics.extend(fragment)
+            self._collect_snapshot(metrics, service, snapshot, time.perf_counter() - start)
+        metrics.ovh_exporter_service_collect_errors.add_metric(
+            self._prefixes[service.id], self._collect_errors.get(service.id, 0)
+        )
+        return snapshot
+
+    def _collect_state(self, metrics: Metrics, service, snapshot: Snapshot | None, state):
+        """Collect service refresh state (published by scheduler)."""
+        if state is None:
+            return
+        labels = self._prefixes[service.id]
+        metrics.ovh_exporter_service_stale.add_metric(labels, int(snapshot is not None and state["failures"] > 0))
+        metrics.ovh_exporter_service_refresh_failures.add_metric(labels, state["failures"])
+        metrics.ovh_exporter_service_circuit_open.add_metric(labels, int(state["open"]))
+
+    def _collect_snapshot(self, metrics: Metrics, service, snapshot: Snapshot, duration: float):
+        """Collect service snapshot information."""
+        labels = self._prefixes[service.id]
+        metrics.ovh_exporter_snapshot_timestamp_seconds.add_metric(labels, snapshot.timestamp)
+        metrics.ovh_exporter_refresh_duration_seconds.add_metric(labels, snapshot.duration)
+        metrics.ovh_exporter_usage_cache_hits.add_metric(labels, self._usage_cache_hits.get(service.id, 0))
+        metrics.ovh_exporter_service_collect_duration_seconds.add_metric(labels, duration)
+
+    def _collect_fragments(self, service, snapshot: Snapshot) -> list[dict[str, list]]:
+        """Samples of service snapshot payloads, by payload."""
+        return [self._fragment(service, snapshot, source, tables) for source, tables in self._sources.items()]
+
+    def _fragment(self, service, snapshot: Snapshot, source: str, tables: list[CompiledTable]) -> dict[str, list]:
+        """Samples of a payload, built again only if payload changed.
+
+        Payload version is its content hash; usage payload version is its
+        lastUpdate when known (no need to hash the largest payload)."""
+        payload = getattr(snapshot.response, source)
+        version = _usage_version(payload) if source == "usage" else None
+        if version is None:
+            version = snapshot.digest(source)
+        cached = self._fragments.get((service.id, source), None)
+        if cached is not None and cached[0] == version:
+            if source == "usage":
+                self._usage_cache_hits[service.id] = self._usage_cache_hits.get(service.id, 0) + 1
+            return cached[1]
+        samples: dict[str, list] = {name: [] for table in tables for name in table.families}
+        for table in tables:
+            self._timed(table, samples, service, payload)
+        self._fragments[(service.id, source)] = (version, samples)
+        return samples
+
+    def _timed(self, table: CompiledTable, samples: dict[str, list], service, payload):
+        """Extract samples of a table, recording its duration."""
+        start = time.perf_counter()
+        key = (service.id, table.name)
+        self._labels_caches[key] = table.extract(
+            payload, self._prefixes[service.id], samples, self._labels_caches.get(key, None)
+        )
+        duration = time.perf_counter() - start
+        self._method_durations.setdefault(table.name, Histogram(COLLECT_DURATION_BUCKETS)).observe(duration)
+
+    def _collect_instrumentation(self, metrics: Metrics, stats):
+        """Collect exporter self-instrumentation."""
+        if stats is not None:
+            add_api_stats(
+                stats,
+                metrics.ovh_exporter_api_request_duration_seconds,
+                metrics.ovh_exporter_api_response_size_bytes,
+                metrics.ovh_exporter_api_responses,
+                metrics.ovh_exporter_api_throttled,
+                metrics.ovh_exporter_api_throttle_wait_seconds,
+                metrics.ovh_exporter_api_retries,
+            )
+        for name, histogram in sorted(self._method_durations.items()):
+            histogram.add_to(metrics.ovh_exporter_collect_method_duration_seconds, [name])
+        for family in metrics.do_yield():
+            if family.samples and family is not metrics.ovh_exporter_family_series:
+                metrics.ovh_exporter_family_series.add_metric([family.name], len(family.samples))
 
-    def _collect_volume_quota(self, metrics: Metrics, service, quotas):
-        """Collect volume quota information."""
-        for quota in quotas:
-            if "volume" not in quota:
-                return
-            metrics.ovh_quota_volume_gb.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["volume"]["usedGigabytes"]
-            )
-            metrics.ovh_quota_volume_max_gb.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["volume"]["maxGigabytes"]
-            )
-            metrics.ovh_quota_volume_backup_gb.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["volume"]["usedBackupGigabytes"]
-            )
-            metrics.ovh_quota_volume_backup_max_gb.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["volume"]["maxBackupGigabytes"]
-            )
-            metrics.ovh_quota_volume_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["volume"]["volumeCount"]
-            )
-            metrics.ovh_quota_volume_max_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["volume"]["maxVolumeCount"]
-            )
-            metrics.ovh_quota_volume_backup_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["volume"]["volumeBackupCount"]
-            )
-            metrics.ovh_quota_volume_backup_max_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]),
-                quota["volume"]["maxVolumeBackupCount"],
-            )
 
-    def _collect_network_quota(self, metrics: Metrics, service, quotas):
-        """Collect network quota information."""
-        for quota in quotas:
-            if "network" not in quota:
-                return
-            metrics.ovh_quota_network_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["network"]["usedNetworks"]
-            )
-            metrics.ovh_quota_network_max_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["network"]["maxNetworks"]
-            )
-            metrics.ovh_quota_network_subnet_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["network"]["usedSubnets"]
-            )
-            metrics.ovh_quota_network_subnet_max_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["network"]["maxSubnets"]
-            )
-            metrics.ovh_quota_network_floating_ip_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["network"]["usedFloatingIPs"]
-            )
-            metrics.ovh_quota_network_floating_ip_max_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["network"]["maxFloatingIPs"]
-            )
-            metrics.ovh_quota_network_gateway_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["network"]["usedGateways"]
-            )
-            metrics.ovh_quota_network_gateway_max_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["network"]["maxGateways"]
-            )
+# pylint: disable=too-few-public-methods
+class SnapshotAgeCollector:
+    """Snapshot age collector.
 
-    def _collect_load_balancer_quota(self, metrics: Metrics, service, quotas):
-        """Collect load balancer quota information."""
-        for quota in quotas:
-            if "loadBalancer" not in quota:
-                return
-            metrics.ovh_quota_load_balancer_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]),
-                quota["loadBalancer"]["usedLoadBalancers"],
-            )
-            metrics.ovh_quota_load_balancer_max_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]),
-                quota["loadBalancer"]["maxLoadBalancers"],
-            )
+    Kept apart from OvhCollector as its values change on each scrape, whereas
+    OvhCollector output only changes on refresh (and can be pre-rendered)."""
 
-    def _collect_keymanager_quota(self, metrics: Metrics, service, quotas):
-        """Collect key manager quota information."""
-        for quota in quotas:
-            if "keymanager" not in quota:
-                return
-            metrics.ovh_quota_keymanager_secret_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["keymanager"]["usedSecrets"]
-            )
-            metrics.ovh_quota_keymanager_secret_max_count.add_metric(
-                self._labels(service, [service.id, quota["region"]]), quota["keymanager"]["maxSecrets"]
-            )
+    def __init__(self, collector: OvhCollector):
+        self._collector = collector
 
-    def _collect_storages(self, metrics: Metrics, service, storages):
-        """Collect storage usage information."""
-        for storage in storages:
-            metrics.ovh_storage_size_bytes.add_metric(
-                self._labels(
-                    service,
-                    [
-                        service.id,
-                        storage["region"],
-                        storage["id"],
-                        storage["name"],
-                        storage["containerType"],
-                    ],
-                ),
-                storage["storedBytes"],
-            )
-            metrics.ovh_storage_object_count.add_metric(
-                self._labels(
-                    service,
-                    [
-                        service.id,
-                        storage["region"],
-                        storage["id"],
-                        storage["name"],
-                        storage["containerType"],
-                    ],
-                ),
-                storage["storedObjects"],
-            )
+    def collect(self):
+        """Collect metrics."""
+        yield from self._collector.collect_age()
 
-    def _collect_instance_usage(self, metrics: Metrics, service, usages):
-        if "hourlyUsage" in usages:
-            for group in usages["hourlyUsage"]["instance"]:
-                flavor = group["reference"]
-                region = group["region"]
-                for instance in group["details"]:
-                    hours = instance["quantity"]["value"]
-                    price = instance["totalPrice"]
-                    instance_id = instance["instanceId"]
-                    metrics.ovh_usage_instance_hours.add_metric(
-                        self._labels(service, [service.id, region, instance_id, "hourly", flavor]), hours
-                    )
-                    metrics.ovh_usage_instance_price.add_metric(
-                        self._labels(service, [service.id, region, instance_id, "hourly", flavor]), price
-                    )
-        if "monthlyUsage" in usages:
-            for group in usages["monthlyUsage"]["instance"]:
-                flavor = group["reference"]
-                region = group["region"]
-                for instance in group["details"]:
-                    hours = 720
-                    price = instance["totalPrice"]
-                    instance_id = instance["instanceId"]
-                    metrics.ovh_usage_instance_hours.add_metric(
-                        self._labels(service, [service.id, region, instance_id, "monthly", flavor]), hours
-                    )
-                    metrics.ovh_usage_instance_price.add_metric(
-                        self._labels(service, [service.id, region, instance_id, "monthly", flavor]), price
-                    )
-
-    def _collect_volume_usage(self, metrics: Metrics, service, usages):
-        """Collect volume usage information."""
-        if "hourlyUsage" in usages:
-            for group in usages["hourlyUsage"]["volume"]:
-                flavor = group["type"]
-                region = group["region"]
-                for volume in group["details"]:
-                    hours = volume["quantity"]["value"]
-                    price = volume["totalPrice"]
-                    instance_id = volume["volumeId"]
-                    metrics.ovh_usage_volume_gb_hours.add_metric(
-                        self._labels(service, [service.id, region, instance_id, flavor]), hours
-                    )
-                    metrics.ovh_usage_volume_price.add_metric(
-                        self._labels(service, [service.id, region, instance_id, flavor]), price
-                    )
-
-    # pylint: disable=too-many-locals,too-many-statements
-    def _collect_storage_usage(self, metrics: Metrics, service, usages):
-        """Collect storage usage information."""
-        if "hourlyUsage" not in usages:
-            return
-        for storage in usages["hourlyUsage"]["storage"]:
-            if not storage["totalPrice"]:
-                continue
-            flavor = storage["type"]
-            region = storage["region"]
-            hours = storage["stored"]["quantity"]["value"]
-            price = storage["stored"]["totalPrice"]
-            storage_name = "__all__" if flavor == "pcs" else storage["bucketName"]
-            if storage.get("incomingBandwidth", None):
-                external_incoming_gb = storage["incomingBandwidth"]["quantity"]["value"]
-                external_incoming_price = storage["incomingBandwidth"]["totalPrice"]
-            else:
-                external_incoming_gb = 0
-                external_incoming_price = 0
-            if storage.get("outgoingBandwidth", None):
-                external_outgoing_gb = storage["outgoingBandwidth"]["quantity"]["value"]
-                external_outgoing_price = storage["outgoingBandwidth"]["totalPrice"]
-            else:
-                external_outgoing_gb = 0
-                external_outgoing_price = 0
-            if storage.get("incomingInternalBandwidth", None):
-                internal_incoming_gb = storage["incomingInternalBandwidth"]["quantity"]["value"]
-                internal_incoming_price = storage["incomingInternalBandwidth"]["totalPrice"]
-            else:
-                internal_incoming_gb = 0
-                internal_incoming_price = 0
-            if storage.get("outgoingInternalBandwidth", None):
-                internal_outgoing_gb = storage["outgoingInternalBandwidth"]["quantity"]["value"]
-                internal_outgoing_price = storage["outgoingInternalBandwidth"]["totalPrice"]
-            else:
-                internal_outgoing_gb = 0
-                internal_outgoing_price = 0
-            metrics.ovh_usage_storage_gb_hours.add_metric(
-                self._labels(service, [service.id, region, flavor, storage_name]), hours
-            )
-            metrics.ovh_usage_storage_price.add_metric(
-                self._labels(service, [service.id, region, flavor, storage_name]), price
-            )
-            metrics.ovh_usage_storage_bandwidth_external_incoming_gb.add_metric(
-                self._labels(service, [service.id, region, flavor, storage_name]), external_incoming_gb
-            )
-            metrics.ovh_usage_storage_bandwidth_external_incoming_price.add_metric(
-                self._labels(service, [service.id, region, flavor, storage_name]), external_incoming_price
-            )
-            metrics.ovh_usage_storage_bandwidth_external_outgoing_gb.add_metric(
-                self._labels(service, [service.id, region, flavor, storage_name]), external_outgoing_gb
-            )
-            metrics.ovh_usage_storage_bandwidth_external_outgoing_price.add_metric(
-                self._labels(service, [service.id, region, flavor, storage_name]), external_outgoing_price
-            )
-            metrics.ovh_usage_storage_bandwidth_internal_incoming_gb.add_metric(
-                self._labels(service, [service.id, region, flavor, storage_name]), internal_incoming_gb
-            )
-            metrics.ovh_usage_storage_bandwidth_internal_incoming_price.add_metric(
-                self._labels(service, [service.id, region, flavor, storage_name]), internal_incoming_price
-            )
-            metrics.ovh_usage_storage_bandwidth_internal_outgoing_gb.add_metric(
-                self._labels(service, [service.id, region, flavor, storage_name]), internal_outgoing_gb
-            )
-            metrics.ovh_usage_storage_bandwidth_internal_outgoing_price.add_metric(
-                self._labels(service, [service.id, region, flavor, storage_name]), internal_outgoing_price
-            )
+
+def _usage_version(usages) -> typing.Hashable:
+    """Usage payload version (lastUpdate and period), None if unknown."""
+    last_update = usages.get("lastUpdate", None) if isinstance(usages, dict) else None
+    if not last_update:
+        return None
+    period = usages.get("period", None) or {}
+    return (last_update, period.get("from", None), period.get("to", None))
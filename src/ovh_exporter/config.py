@@ -2,13 +2,19 @@
 
 from __future__ import annotations
 
+import functools
 import os
+import re
 import string
 import typing
 
 import yaml
-from jsonschema import Draft202012Validator
-from referencing import Registry
+
+from ovh_exporter.logger import log
+
+if typing.TYPE_CHECKING:
+    from jsonschema import Draft202012Validator
+    from referencing import Registry
 
 CONFIG_SCHEMA = """
 $schema: https://json-schema.org/draft/2020-12/schema
@@ -19,18 +25,68 @@ properties:
     description: OVH account credentials
     type: object
     $ref: urn:OvhAccount
+  accounts:
+    description: Additional OVH accounts, collected in parallel with their own services
+    type: array
+    items:
+      type: object
+      $ref: urn:Account
   env_file:
     description: Environment variables file path
     type: string
+  collector:
+    description: Metrics collection setting
+    type: object
+    $ref: urn:Collector
   services:
     description: OVH project/service to check
     type: array
     items:
       type: object
       $ref: urn:Service
+  discovery:
+    description: Discovery of projects listed by OVH API (/cloud/project), added to configured services
+    type: object
+    $ref: urn:Discovery
+  push:
+    description: Prometheus remote-write endpoint metrics are pushed to (push command)
+    type: object
+    $ref: urn:Push
+anyOf:
+  - required:
+      - ovh
+  - required:
+      - accounts
+"""
+ACCOUNT_SCHEMA = """
+$schema: https://json-schema.org/draft/2020-12/schema
+title: OVH account and its services
+type: object
+properties:
+  name:
+    description: Account name (used in logs)
+    type: string
+  ovh:
+    description: OVH account credentials
+    type: object
+    $ref: urn:OvhAccount
+  workers:
+    type: integer
+    description: Maximum number of concurrent API calls of this account (default to collector.workers)
+    minimum: 1
+  services:
+    description: OVH project/service to check
+    type: array
+    items:
+      type: object
+      $ref: urn:Service
+  discovery:
+    description: Discovery of projects of this account
+    type: object
+    $ref: urn:Discovery
 required:
+  - name
   - ovh
-  - services
 """
 SERVICE_SCHEMA = """
 $schema: https://json-schema.org/draft/2020-12/schema
@@ -48,6 +104,10 @@ properties:
       "^[a-zA-Z0-9_:]+$":
         type: string
     additionalProperties: false
+  ttl:
+    description: Endpoint data time-to-live overrides for this service
+    type: object
+    $ref: urn:Ttl
 required:
   - id
 """
@@ -67,6 +127,9 @@ properties:
       - soyoustart-ca
       - kimsufi-eu
       - kimsufi-ca
+  endpoint_url:
+    description: API base URL overriding endpoint one (for example a local fake API, see ovh_exporter_fake_api)
+    type: string
   application_key:
     description: Application key
     type: string
@@ -76,11 +139,114 @@ properties:
   consumer_key:
     description: Consumer key; use ${ENV_VAR} to reference an environment variable
     type: string
+  rate_limit:
+    description: Client-side rate limit of API calls, by endpoint (project, instance, ...)
+    type: object
+    properties:
+      rate:
+        type: number
+        description: Calls per second by endpoint; 0 disables rate limiting
+        default: 0
+        minimum: 0
+      burst:
+        type: integer
+        description: Calls allowed in a burst by endpoint
+        default: 10
+        minimum: 1
+  retry:
+    description: Retry of failed API calls (network errors, 429 and 5xx statuses)
+    type: object
+    properties:
+      max_attempts:
+        type: integer
+        description: Maximum number of attempts of a call; 1 disables retries
+        default: 3
+        minimum: 1
+      backoff:
+        type: number
+        description: Initial backoff delay in seconds, doubled on each retry (randomized)
+        default: 0.5
+        minimum: 0
+      max_backoff:
+        type: number
+        description: Maximum backoff delay in seconds
+        default: 30
+        minimum: 0
 required:
   - endpoint
   - application_key
   - application_secret
 """
+PUSH_SCHEMA = """
+$schema: https://json-schema.org/draft/2020-12/schema
+title: Remote-write push setting
+type: object
+properties:
+  url:
+    description: Prometheus remote-write endpoint (for example http://prometheus:9090/api/v1/write)
+    type: string
+  interval:
+    description: Delay in seconds between two pushes
+    type: number
+    default: 60
+    exclusiveMinimum: 0
+  resend_interval:
+    description: >-
+      Delay in seconds after which unchanged series are sent again, so that Prometheus does not mark
+      them stale (only changed series are sent otherwise)
+    type: number
+    default: 240
+    minimum: 0
+  batch_size:
+    description: Maximum number of series by request
+    type: integer
+    default: 2000
+    minimum: 1
+  max_buffer:
+    description: Maximum number of series kept while endpoint is failing (oldest are dropped)
+    type: integer
+    default: 100000
+    minimum: 1
+  timeout:
+    description: Request timeout in seconds
+    type: number
+    default: 30
+    exclusiveMinimum: 0
+  headers:
+    description: Additional request headers (tenant id, bearer token, ...)
+    type: object
+    additionalProperties:
+      type: string
+  basic_auth:
+    description: Basic authentication
+    type: object
+    properties:
+      login:
+        type: string
+      password:
+        type: string
+    required:
+      - login
+      - password
+  retry:
+    description: Retry of failed requests (network errors, 429 and 5xx statuses), before buffering series
+    type: object
+    properties:
+      max_attempts:
+        type: integer
+        default: 3
+        minimum: 1
+      backoff:
+        type: number
+        default: 1
+        minimum: 0
+      max_backoff:
+        type: number
+        default: 30
+        minimum: 0
+required:
+  - url
+"""
 SERVER_SCHEMA = """
 $schema: https://json-schema.org/draft/2020-12/schema
 title: HTTP server setting
@@ -117,43 +283,258 @@ properties:
         type: string
         description: Basic authentication password
 """
+COLLECTOR_SCHEMA = """
+$schema: https://json-schema.org/draft/2020-12/schema
+title: Metrics collection setting
+type: object
+properties:
+  refresh_interval:
+    type: number
+    description: Delay in seconds between two background refreshes of OVH data
+    default: 300
+    exclusiveMinimum: 0
+  workers:
+    type: integer
+    description: Maximum number of concurrent OVH API calls
+    default: 8
+    minimum: 1
+  mode:
+    type: string
+    description: >-
+      worker: each server worker fetches OVH data;
+      shared: a single collector process fetches OVH data for all workers
+    enum:
+      - worker
+      - shared
+    default: worker
+  shared_dir:
+    type: string
+    description: Directory used to share snapshots between processes (shared mode; default to a temporary directory, removed on exit)
+  ttl:
+    description: Endpoint data time-to-live; endpoint is fetched again on refresh only when expired
+    type: object
+    $ref: urn:Ttl
+  snapshot_file:
+    type: string
+    description: >-
+      File where snapshots are saved after each refresh and on shutdown, and loaded on startup, so
+      that data is served right after a restart (disabled by default)
+  reload_interval:
+    type: number
+    description: >-
+      Delay in seconds between two checks of configuration file; services changes are applied
+      without restart (0 disables checks, SIGHUP still reloads configuration)
+    default: 30
+    minimum: 0
+  json_backend:
+    type: string
+    description: >-
+      Decoder of OVH API responses; auto uses orjson or msgspec when installed, else json
+    enum:
+      - auto
+      - orjson
+      - msgspec
+      - json
+    default: auto
+  sharding:
+    description: >-
+      Split services between exporter replicas (consistent hashing of service ids); each replica
+      fetches and exposes its own services
+    type: object
+    properties:
+      replica:
+        description: >-
+          Index of this replica, from 0; a string is allowed (environment variable), its trailing digits
+          are used (StatefulSet pod name)
+        type:
+          - integer
+          - string
+        default: 0
+      replicas:
+        type: integer
+        description: Number of replicas
+        default: 1
+        minimum: 1
+  circuit_breaker:
+    description: Stop refreshing a failing service for a while; its last snapshot is served meanwhile
+    type: object
+    properties:
+      failure_threshold:
+        type: integer
+        description: Consecutive failed refreshes opening the circuit; 0 disables circuit breaker
+        default: 3
+        minimum: 0
+      reset_timeout:
+        type: number
+        description: Delay in seconds before a failing service is refreshed again
+        default: 300
+        minimum: 0
+"""
+DISCOVERY_SCHEMA = """
+$schema: https://json-schema.org/draft/2020-12/schema
+title: Project discovery setting
+type: object
+properties:
+  enabled:
+    type: boolean
+    description: List projects of OVH account; configured services take precedence over discovered ones
+    default: false
+  interval:
+    type: number
+    description: Delay in seconds between two listings of projects
+    default: 3600
+    minimum: 0
+  include:
+    type: array
+    description: Regular expressions; a project is discovered only if its id or description matches one of them
+    items:
+      type: string
+  exclude:
+    type: array
+    description: Regular expressions; a project is ignored if its id or description matches one of them
+    items:
+      type: string
+  labels:
+    description: >-
+      Prometheus labels of discovered projects; values are templates formatted with project
+      fields, for example "{description}" (unknown fields are empty)
+    type: object
+    patternProperties:
+      "^[a-zA-Z0-9_:]+$":
+        type: string
+    additionalProperties: false
+"""
+TTL_SCHEMA = """
+$schema: https://json-schema.org/draft/2020-12/schema
+title: Endpoint data time-to-live in seconds (default 0, fetched on each refresh)
+type: object
+properties:
+  project:
+    type: number
+    minimum: 0
+  instance:
+    type: number
+    minimum: 0
+  volume:
+    type: number
+    minimum: 0
+  storage:
+    type: number
+    minimum: 0
+  quota:
+    type: number
+    minimum: 0
+  usage:
+    type: number
+    minimum: 0
+additionalProperties: false
+"""
+
+SCHEMAS = {
+    "urn:Config": CONFIG_SCHEMA,
+    "urn:OvhAccount": OVH_ACCOUNT_SCHEMA,
+    "urn:Account": ACCOUNT_SCHEMA,
+    "urn:Service": SERVICE_SCHEMA,
+    "urn:Server": SERVER_SCHEMA,
+    "urn:Push": PUSH_SCHEMA,
+    "urn:Collector": COLLECTOR_SCHEMA,
+    "urn:Discovery": DISCOVERY_SCHEMA,
+    "urn:Ttl": TTL_SCHEMA,
+}
+
+
+def load_yaml(stream):
+    """Parse a YAML document (safe loader, libyaml one when available)."""
+    return yaml.load(stream, getattr(yaml, "CSafeLoader", yaml.SafeLoader))  # noqa: S506
+
+
+@functools.lru_cache(maxsize=None)
+def registry() -> Registry:
+    """Schemas registry; schemas are parsed on first use, not on import."""
+    from referencing import Registry  # noqa: PLC0415 pylint: disable=import-outside-toplevel
+
+    return Registry().with_contents([(urn, load_yaml(schema)) for urn, schema in SCHEMAS.items()])
+
 
-REGISTRY: Registry = Registry().with_contents(
-    [
-        ("urn:Config", yaml.safe_load(CONFIG_SCHEMA)),
-        ("urn:OvhAccount", yaml.safe_load(OVH_ACCOUNT_SCHEMA)),
-        ("urn:Service", yaml.safe_load(SERVICE_SCHEMA)),
-        ("urn:Server", yaml.safe_load(SERVER_SCHEMA)),
-    ]
-)
+@functools.lru_cache(maxsize=None)
+def validator(urn: str = "urn:Config") -> Draft202012Validator:
+    """Validator of a schema, built once."""
+    from jsonschema import Draft202012Validator  # noqa: PLC0415 pylint: disable=import-outside-toplevel
+
+    return Draft202012Validator(registry().contents(urn), registry=registry())
+
+
+def __getattr__(name):
+    # REGISTRY is built on first access
+    if name == "REGISTRY":
+        return registry()
+    raise AttributeError(name)
 
 
 # pylint: disable=too-few-public-methods
+class RateLimit:
+    """Client-side rate limit options."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+
+    @staticmethod
+    def load(config_dict):
+        """Load configuration from dict."""
+        return RateLimit(config_dict.get("rate", 0), config_dict.get("burst", 10))
+
+
+class Retry:
+    """API call retry options."""
+
+    def __init__(self, max_attempts: int, backoff: float, max_backoff: float):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    @staticmethod
+    def load(config_dict):
+        """Load configuration from dict."""
+        return Retry(
+            config_dict.get("max_attempts", 3), config_dict.get("backoff", 0.5), config_dict.get("max_backoff", 30)
+        )
+
+
 class OvhAccount:
     """OVH account configuration."""
 
+    # pylint: disable=too-many-arguments
     def __init__(
         self,
         endpoint: str,
         application_key: str,
         application_secret: str,
         consumer_key: str | None,
+        rate_limit: RateLimit | None = None,
+        retry: Retry | None = None,
+        endpoint_url: str | None = None,
     ):
         self.endpoint = endpoint
         self.application_key = application_key
         self.application_secret = application_secret
         self.consumer_key = consumer_key
+        self.rate_limit = rate_limit if rate_limit is not None else RateLimit.load({})
+        self.retry = retry if retry is not None else Retry.load({})
+        self.endpoint_url = endpoint_url
 
     @staticmethod
     def load(config_dict):
         """Load configuration from a configuration dict."""
-        validator = Draft202012Validator(REGISTRY.contents("urn:OvhAccount"), registry=REGISTRY)
-        validator.validate(config_dict)
+        validator("urn:OvhAccount").validate(config_dict)
         return OvhAccount(
             config_dict["endpoint"],
             config_dict["application_key"],
             config_dict["application_secret"],
             config_dict.get("consumer_key", None),
+            RateLimit.load(config_dict.get("rate_limit", {})),
+            Retry.load(config_dict.get("retry", {})),
+            config_dict.get("endpoint_url", None),
         )
 
 
@@ -216,43 +597,278 @@ class Server:
         return Server(bind_addr, port, tls, basic_auth)
 
 
+class Push:
+    """Remote-write push configuration."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        url: str,
+        interval: float = 60,
+        resend_interval: float = 240,
+        batch_size: int = 2000,
+        max_buffer: int = 100000,
+        timeout: float = 30,
+        headers: typing.Mapping[str, str] | None = None,
+        basic_auth: tuple[str, str] | None = None,
+        retry: Retry | None = None,
+    ):
+        self.url = url
+        self.interval = interval
+        self.resend_interval = resend_interval
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.timeout = timeout
+        self.headers = headers if headers is not None else {}
+        self.basic_auth = basic_auth
+        self.retry = retry if retry is not None else Retry(3, 1, 30)
+
+    @staticmethod
+    def load(config_dict):
+        """Load push configuration."""
+        basic_auth = config_dict.get("basic_auth", None)
+        retry = config_dict.get("retry", {})
+        return Push(
+            config_dict["url"],
+            config_dict.get("interval", 60),
+            config_dict.get("resend_interval", 240),
+            config_dict.get("batch_size", 2000),
+            config_dict.get("max_buffer", 100000),
+            config_dict.get("timeout", 30),
+            config_dict.get("headers", {}),
+            (basic_auth["login"], basic_auth["password"]) if basic_auth else None,
+            Retry(retry.get("max_attempts", 3), retry.get("backoff", 1), retry.get("max_backoff", 30)),
+        )
+
+
+class CircuitBreaker:
+    """Circuit breaker options."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    @staticmethod
+    def load(config_dict):
+        """Load configuration from dict."""
+        return CircuitBreaker(config_dict.get("failure_threshold", 3), config_dict.get("reset_timeout", 300))
+
+
+class Sharding:
+    """Sharding of services between replicas."""
+
+    def __init__(self, replica: int, replicas: int):
+        if not 0 <= replica < replicas:
+            raise ValueError(f"Replica index {replica} out of range (replicas: {replicas})")  # noqa: TRY003,EM102
+        self.replica = replica
+        self.replicas = replicas
+
+    @staticmethod
+    def load(config_dict):
+        """Load configuration from dict."""
+        replica = config_dict.get("replica", 0)
+        if isinstance(replica, str):
+            # ovh-exporter-2 -> 2
+            match = re.search(r"(\d+)$", replica)
+            if match is None:
+                raise ValueError(f"Replica index not found in {replica!r}")  # noqa: TRY003,EM102
+            replica = int(match.group(1))
+        return Sharding(replica, config_dict.get("replicas", 1))
+
+
+class Collector:
+    """Metrics collection configuration."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        refresh_interval: float,
+        workers: int,
+        mode: str,
+        shared_dir: str | None,
+        ttl: typing.Mapping[str, float],
+        circuit_breaker: CircuitBreaker | None = None,
+        json_backend: str = "auto",
+        sharding: Sharding | None = None,
+        snapshot_file: str | None = None,
+        reload_interval: float = 30,
+    ):
+        self.refresh_interval = refresh_interval
+        self.workers = workers
+        self.mode = mode
+        self.shared_dir = shared_dir
+        self.ttl = ttl
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker.load({})
+        self.json_backend = json_backend
+        self.sharding = sharding if sharding is not None else Sharding(0, 1)
+        self.snapshot_file = snapshot_file
+        self.reload_interval = reload_interval
+
+    @staticmethod
+    def load(config_dict):
+        """Load collector configuration."""
+        refresh_interval = config_dict.get("refresh_interval", 300)
+        workers = config_dict.get("workers", 8)
+        mode = config_dict.get("mode", "worker")
+        return Collector(
+            refresh_interval,
+            workers,
+            mode,
+            config_dict.get("shared_dir", None),
+            config_dict.get("ttl", {}),
+            CircuitBreaker.load(config_dict.get("circuit_breaker", {})),
+            config_dict.get("json_backend", "auto"),
+            Sharding.load(config_dict.get("sharding", {})),
+            config_dict.get("snapshot_file", None),
+            config_dict.get("reload_interval", 30),
+        )
+
+
 class Service:
     """Configuration."""
 
-    def __init__(self, field_id: str, labels: typing.Mapping[str, str]):
+    def __init__(self, field_id: str, labels: typing.Mapping[str, str], ttl: typing.Mapping[str, float] | None = None):
         self.id = field_id
         self.labels = labels
+        # endpoint name -> time-to-live (collector defaults merged with service overrides)
+        self.ttl = ttl if ttl is not None else {}
 
     @staticmethod
-    def load(config_dict):
+    def load(config_dict, default_ttl: typing.Mapping[str, float] | None = None):
         """Load service."""
-        return Service(config_dict["id"], config_dict.get("labels", {}))
+        ttl = {**(default_ttl or {}), **config_dict.get("ttl", {})}
+        return Service(config_dict["id"], config_dict.get("labels", {}), ttl)
 
 
-class Config:
-    """Configuration."""
+class Discovery:
+    """Project discovery options."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        enabled: bool,  # noqa: FBT001
+        interval: float,
+        include: list[str],
+        exclude: list[str],
+        labels: typing.Mapping[str, str],
+    ):
+        self.enabled = enabled
+        self.interval = interval
+        self.include = include
+        self.exclude = exclude
+        # label name -> template
+        self.labels = labels
+
+    @staticmethod
+    def load(config_dict):
+        """Load configuration from dict."""
+        return Discovery(
+            config_dict.get("enabled", False),
+            config_dict.get("interval", 3600),
+            config_dict.get("include", []),
+            config_dict.get("exclude", []),
+            config_dict.get("labels", {}),
+        )
 
-    def __init__(self, ovh: OvhAccount, server: Server, env_file: str, services: list[Service]):
+
+class Account:
+    """OVH account, its services and its fetch concurrency."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        name: str,
+        ovh: OvhAccount,
+        services: list[Service],
+        discovery: Discovery | None = None,
+        workers: int = 8,
+    ):
+        self.name = name
         self.ovh = ovh
+        self.services = services
+        self.discovery = discovery if discovery is not None else Discovery.load({})
+        self.workers = workers
+
+    @staticmethod
+    def load(config_dict, collector: Collector):
+        """Load account configuration; collector settings are defaults."""
+        return Account(
+            config_dict["name"],
+            OvhAccount.load(config_dict["ovh"]),
+            [Service.load(i, collector.ttl) for i in config_dict.get("services", [])],
+            Discovery.load(config_dict.get("discovery", {})),
+            config_dict.get("workers", collector.workers),
+        )
+
+
+class Config:
+    """Configuration.
+
+    `ovh`, `services` and `discovery` are the ones of the first account (`ovh`
+    section, else first of `accounts`)."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        server: Server,
+        collector: Collector,
+        env_file: str,
+        accounts: list[Account],
+        push: Push | None = None,
+    ):
         self.server = server
+        self.collector = collector
         self.env_file = env_file
-        self.services = services
+        self.accounts = accounts
+        self.push = push
+        self.ovh = accounts[0].ovh
+        self.services = accounts[0].services
+        self.discovery = accounts[0].discovery
 
     @staticmethod
-    def load(config_dict):
+    def load(config_dict) -> Config:
         """Load whole configuration."""
-        validator = Draft202012Validator(REGISTRY.contents("urn:Config"), registry=REGISTRY)
-        validator.validate(config_dict)
-        ovh = OvhAccount.load(config_dict.get("ovh"))
+        validator().validate(config_dict)
         server = Server.load(config_dict.get("server", {}))
-        services = [Service.load(i) for i in config_dict.get("services", [])]
-        return Config(ovh, server, config_dict.get("env_file", None), services)
+        collector = Collector.load(config_dict.get("collector", {}))
+        accounts = [Account.load(i, collector) for i in config_dict.get("accounts", [])]
+        if "ovh" in config_dict:
+            default = {key: config_dict[key] for key in ("ovh", "services", "discovery") if key in config_dict}
+            accounts.insert(0, Account.load({"name": "default", **default}, collector))
+        names = [account.name for account in accounts]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Account names must be unique: {names}")  # noqa: TRY003,EM102
+        push = Push.load(config_dict["push"]) if "push" in config_dict else None
+        return Config(server, collector, config_dict.get("env_file", None), accounts, push)
+
+    def account(self, name: str | None = None) -> Account:
+        """Account by name (first one by default)."""
+        for account in self.accounts:
+            if name is None or account.name == name:
+                return account
+        raise ValueError(f"Unknown account {name}")  # noqa: TRY003,EM102
 
 
 def validate(config_dict):
     """Validation configuration."""
-    validator = Draft202012Validator(REGISTRY.contents("urn:Config"), registry=REGISTRY)
-    validator.validate(config_dict)
+    validator().validate(config_dict)
+
+
+def load_file(path: str) -> Config:
+    """Load configuration file: validation, environment file, environment variables expansion."""
+    with open(path, encoding="utf-8") as fstream:
+        config_dict = load_yaml(fstream)
+    validate(config_dict)
+    # Load environment file if provided
+    if "env_file" in config_dict and config_dict["env_file"] and os.path.exists(config_dict["env_file"]):
+        import dotenv  # noqa: PLC0415 pylint: disable=import-outside-toplevel
+
+        env_file = config_dict["env_file"]
+        log.info("Loading environment file %s", env_file)
+        dotenv.load_dotenv(env_file)
+    # Expand environment variables in config
+    expandvars(config_dict)
+    return Config.load(config_dict)
 
 
 def expandvars(dictionary):
@@ -260,5 +876,10 @@ def expandvars(dictionary):
     for k, v in dictionary.items():
         if isinstance(v, dict):
             expandvars(v)
+        elif isinstance(v, list):
+            # accounts, services
+            for item in v:
+                if isinstance(item, dict):
+                    expandvars(item)
         elif isinstance(v, str):
             dictionary[k] = string.Template(v).substitute(os.environ)
@@ -0,0 +1,156 @@
+"""Services to collect: configured services, discovered projects, sharding between replicas."""
+
+from __future__ import annotations
+
+import concurrent.futures
+import hashlib
+import re
+import threading
+import time
+import typing
+
+from ovh_exporter.config import Service
+from ovh_exporter.logger import log
+from ovh_exporter.ovh_client import get
+
+if typing.TYPE_CHECKING:
+    import ovh
+
+    from ovh_exporter.config import Account, Config, Discovery, Sharding
+
+
+def shard_owner(service_id: str, replicas: int) -> int:
+    """Replica index owning a service.
+
+    Rendezvous hashing: a service only moves when its replica is added or
+    removed, so that replicas keep most of their services (and caches) when
+    scaling."""
+    if replicas == 1:
+        return 0
+    return max(
+        range(replicas),
+        key=lambda replica: hashlib.blake2b(f"{replica}/{service_id}".encode(), digest_size=8).digest(),
+    )
+
+
+class _ProjectFields(dict):
+    """Label template fields; unknown fields are formatted as empty strings."""
+
+    def __missing__(self, key):
+        return ""
+
+
+class ServiceDiscovery:
+    """Services of this replica: configured services and projects listed by OVH API.
+
+    Project list is fetched again every `interval` seconds; project details are
+    only fetched for new projects, by at most `workers` concurrent calls.
+    Configured services take precedence over discovered projects. Previous
+    list is kept when listing fails."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        client: ovh.Client,
+        services: list[Service],
+        discovery: Discovery,
+        sharding: Sharding,
+        default_ttl: typing.Mapping[str, float] | None = None,
+        workers: int = 8,
+    ):
+        self._client = client
+        self._workers = workers
+        self._static = services
+        self._discovery = discovery
+        self._sharding = sharding
+        self._default_ttl = default_ttl or {}
+        self._include = [re.compile(pattern) for pattern in discovery.include]
+        self._exclude = [re.compile(pattern) for pattern in discovery.exclude]
+        self.labelnames = list(services[0].labels) if services else list(discovery.labels)
+        if discovery.enabled and services and set(discovery.labels) != set(self.labelnames):
+            raise RuntimeError("Discovery label names must be the same as services label names")  # noqa: TRY003,EM101
+        self._lock = threading.Lock()
+        # project id -> project details (/cloud/project/{id})
+        self._projects: dict[str, dict] = {}
+        self._discovered: list[Service] = []
+        self._listed_at: float | None = None
+        self._services: list[Service] | None = None
+
+    def services(self, now: float | None = None) -> list[Service]:
+        """Services owned by this replica; projects are listed again when interval elapsed."""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            expired = self._listed_at is None or now - self._listed_at >= self._discovery.interval
+            if self._discovery.enabled and expired:
+                self._listed_at = now
+                self._discovered = self._discover()
+                self._services = None
+            if self._services is None:
+                static_ids = {service.id for service in self._static}
+                services = self._static + [service for service in self._discovered if service.id not in static_ids]
+                self._services = [
+                    service
+                    for service in services
+                    if shard_owner(service.id, self._sharding.replicas) == self._sharding.replica
+                ]
+                log.info(
+                    "%s services (replica %s/%s)", len(self._services), self._sharding.replica, self._sharding.replicas
+                )
+            return self._services
+
+    def _discover(self) -> list[Service]:
+        """Discovered projects (previous ones if listing fails)."""
+        try:
+            project_ids = get(self._client, "projects", "/cloud/project")
+        except Exception:  # noqa: BLE001 pylint: disable=broad-exception-caught
+            log.exception("Project listing failed, previous projects kept")
+            return self._discovered
+        # forget deleted projects
+        self._projects = {
+            project_id: self._projects[project_id] for project_id in project_ids if project_id in self._projects
+        }
+        self._fetch_projects([project_id for project_id in project_ids if project_id not in self._projects])
+        return [
+            Service(project_id, self._labels(project_id, self._projects[project_id]), self._default_ttl)
+            for project_id in project_ids
+            if project_id in self._projects and self._match(project_id, self._projects[project_id])
+        ]
+
+    def _fetch_projects(self, project_ids: list[str]):
+        """Fetch details of new projects concurrently (failed ones are fetched again on next listing)."""
+        if not project_ids:
+            return
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(self._workers, len(project_ids)), thread_name_prefix="ovh-discovery"
+        ) as executor:
+            futures = {
+                project_id: executor.submit(get, self._client, "project", f"/cloud/project/{project_id}")
+                for project_id in project_ids
+            }
+        for project_id, future in futures.items():
+            try:
+                self._projects[project_id] = future.result()
+            except Exception:  # noqa: BLE001 pylint: disable=broad-exception-caught
+                log.exception("Project %s details cannot be fetched", project_id)
+
+    def _match(self, project_id: str, project: dict) -> bool:
+        """Apply include and exclude filters on project id and description."""
+        values = (project_id, project.get("description") or "")
+        if self._include and not any(pattern.search(value) for pattern in self._include for value in values):
+            return False
+        return not any(pattern.search(value) for pattern in self._exclude for value in values)
+
+    def _labels(self, project_id: str, project: dict) -> dict[str, str]:
+        """Labels of a discovered project, formatted from `discovery.labels` templates."""
+        fields = _ProjectFields(project, project_id=project_id)
+        return {name: template.format_map(fields) for name, template in self._discovery.labels.items()}
+
+
+def build_discovery(config: Config, account: Account, client: ovh.Client) -> ServiceDiscovery | None:
+    """Account services discovery, None if services are only the configured ones."""
+    if not account.discovery.enabled and config.collector.sharding.replicas == 1:
+        return None
+    return ServiceDiscovery(
+        client, account.services, account.discovery, config.collector.sharding, config.collector.ttl, account.workers
+    )
@@ -0,0 +1,212 @@
+"""Pre-rendered metrics exposition."""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import threading
+import typing
+import urllib.parse
+
+from prometheus_client import exposition
+from prometheus_client.openmetrics import exposition as openmetrics
+
+from ovh_exporter.logger import log
+
+if typing.TYPE_CHECKING:
+    from prometheus_client.metrics_core import Metric
+    from prometheus_client.registry import Collector
+
+    from ovh_exporter.collector import OvhCollector
+    from ovh_exporter.config import Service
+    from ovh_exporter.snapshot import Snapshot
+
+OPENMETRICS_EOF = b"# EOF\n"
+# probe refresh timeout when Prometheus does not send its scrape timeout, and margin kept to render
+PROBE_TIMEOUT = 10
+PROBE_TIMEOUT_MARGIN = 0.5
+
+
+# pylint: disable=too-few-public-methods
+class Rendering:
+    """One exposition format, rendered and compressed once."""
+
+    def __init__(self, content_type: str, body: bytes, etag: str):
+        self.content_type = content_type
+        self.body = body
+        self.body_gzip = gzip.compress(body)
+        self.etag = etag
+
+
+class ExpositionCache:
+    """Render `registry` only when `version()` changes.
+
+    `version` is a cheap callable returning a hashable token identifying
+    registry data (for example snapshot timestamps)."""
+
+    def __init__(self, registry: Collector, version: typing.Callable[[], typing.Hashable]):
+        self._registry = registry
+        self._version = version
+        self._lock = threading.Lock()
+        self._rendered_version: typing.Hashable = None
+        self._renderings: dict[str, Rendering] = {}
+
+    def get(self, fmt: str) -> Rendering:
+        """Rendering for `text` or `openmetrics` format, rendered if data changed."""
+        version = self._version()
+        with self._lock:
+            if not self._renderings or version != self._rendered_version:
+                self._renderings = self._render()
+                self._rendered_version = version
+            return self._renderings[fmt]
+
+    def _render(self) -> dict[str, Rendering]:
+        text = exposition.generate_latest(self._registry)
+        # openmetrics EOF marker is appended after dynamic metrics
+        om = openmetrics.generate_latest(self._registry)
+        if om.endswith(OPENMETRICS_EOF):
+            om = om[: -len(OPENMETRICS_EOF)]
+        digest = hashlib.blake2b(text, digest_size=16).hexdigest()
+        log.debug("Exposition rendered (%s bytes)", len(text))
+        return {
+            "text": Rendering(exposition.CONTENT_TYPE_LATEST, text, f'W/"{digest}"'),
+            "openmetrics": Rendering(openmetrics.CONTENT_TYPE_LATEST, om, f'W/"{digest}-om"'),
+        }
+
+
+def _accepts_openmetrics(accept: str) -> bool:
+    return any(item.split(";")[0].strip() == "application/openmetrics-text" for item in accept.split(","))
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    return any(item.split(";")[0].strip() in ("gzip", "*") for item in accept_encoding.split(","))
+
+
+def _opaque_tag(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # weak comparison (RFC 9110 13.1.2)
+    candidates = [item.strip() for item in if_none_match.split(",")]
+    return "*" in candidates or _opaque_tag(etag) in [_opaque_tag(c) for c in candidates]
+
+
+class CachedMetricsApp:
+    """WSGI metrics endpoint serving pre-rendered bytes.
+
+    Cached data metrics are served as is, followed by `dynamic_registry` metrics
+    (process, snapshot age, ...) rendered on each request. Compressed responses
+    are a cached gzip member followed by a small gzip member for dynamic metrics.
+
+    ETag is weak: it identifies cached data, dynamic metrics may differ between
+    two responses with the same ETag."""
+
+    def __init__(
+        self, cache: ExpositionCache, dynamic_registry: Collector | None = None, probe: ProbeApp | None = None
+    ):
+        self._cache = cache
+        self._dynamic_registry = dynamic_registry
+        self._probe = probe
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO") == "/favicon.ico":
+            start_response("200 OK", [])
+            return [b""]
+        if environ.get("PATH_INFO") == "/probe" and self._probe is not None:
+            return self._probe(environ, start_response)
+        fmt = "openmetrics" if _accepts_openmetrics(environ.get("HTTP_ACCEPT", "")) else "text"
+        rendering = self._cache.get(fmt)
+        headers = [
+            ("Content-Type", rendering.content_type),
+            ("ETag", rendering.etag),
+            ("Vary", "Accept, Accept-Encoding"),
+        ]
+        if _etag_matches(environ.get("HTTP_IF_NONE_MATCH", ""), rendering.etag):
+            start_response("304 Not Modified", headers)
+            return []
+        dynamic = self._render_dynamic(fmt)
+        if _accepts_gzip(environ.get("HTTP_ACCEPT_ENCODING", "")):
+            body = [rendering.body_gzip, gzip.compress(dynamic, compresslevel=1)]
+            headers.append(("Content-Encoding", "gzip"))
+        else:
+            body = [rendering.body, dynamic]
+        headers.append(("Content-Length", str(sum(len(chunk) for chunk in body))))
+        start_response("200 OK", headers)
+        return body
+
+    def _render_dynamic(self, fmt: str) -> bytes:
+        if fmt == "openmetrics":
+            if self._dynamic_registry is None:
+                return OPENMETRICS_EOF
+            body: bytes = openmetrics.generate_latest(self._dynamic_registry)
+            return body
+        if self._dynamic_registry is None:
+            return b""
+        return exposition.generate_latest(self._dynamic_registry)
+
+
+# pylint: disable=too-few-public-methods
+class _Families:
+    """Registry of already collected metric families."""
+
+    def __init__(self, families: list[Metric]):
+        self._families = families
+
+    def collect(self):
+        """Collected families."""
+        return self._families
+
+
+class ProbeApp:
+    """WSGI `/probe?target=<service id>` endpoint: metrics of a single service.
+
+    As blackbox_exporter probes, each service can be a Prometheus target with
+    its own scrape interval and timeout. Service snapshot is refreshed first
+    when older than `max_age` seconds (`max_age` query parameter), within
+    Prometheus scrape timeout; latest snapshot is served if refresh fails or
+    lasts too long. Without `refresh`, snapshots are served as is."""
+
+    def __init__(
+        self,
+        collector: OvhCollector,
+        refresh: typing.Callable[[Service, float | None, float | None], Snapshot | None] | None = None,
+        max_age: float = 300,
+    ):
+        self._collector = collector
+        self._refresh = refresh
+        self._max_age = max_age
+
+    def __call__(self, environ, start_response):
+        params = urllib.parse.parse_qs(environ.get("QUERY_STRING", ""))
+        target = params.get("target", [""])[0]
+        if not target:
+            return _error(start_response, "400 Bad Request", "target parameter is missing")
+        service = self._collector.service(target)
+        if service is None:
+            return _error(start_response, "404 Not Found", f"unknown target {target}")
+        if self._refresh is not None:
+            try:
+                max_age = float(params.get("max_age", [self._max_age])[0])
+                timeout = float(environ.get("HTTP_X_PROMETHEUS_SCRAPE_TIMEOUT_SECONDS", PROBE_TIMEOUT))
+            except ValueError:
+                return _error(start_response, "400 Bad Request", "invalid max_age or scrape timeout")
+            self._refresh(service, max(0.0, timeout - PROBE_TIMEOUT_MARGIN), max_age)
+        registry = _Families(self._collector.collect_service(service))
+        if _accepts_openmetrics(environ.get("HTTP_ACCEPT", "")):
+            content_type, body = openmetrics.CONTENT_TYPE_LATEST, openmetrics.generate_latest(registry)
+        else:
+            content_type, body = exposition.CONTENT_TYPE_LATEST, exposition.generate_latest(registry)
+        headers = [("Content-Type", content_type), ("Vary", "Accept, Accept-Encoding")]
+        if _accepts_gzip(environ.get("HTTP_ACCEPT_ENCODING", "")):
+            body = gzip.compress(body, compresslevel=1)
+            headers.append(("Content-Encoding", "gzip"))
+        headers.append(("Content-Length", str(len(body))))
+        start_response("200 OK", headers)
+        return [body]
+
+
+def _error(start_response, status: str, message: str):
+    body = f"{message}\n".encode()
+    start_response(status, [("Content-Type", "text/plain; charset=utf-8"), ("Content-Length", str(len(body)))])
+    return [body]
@@ -0,0 +1,203 @@
+"""Local fake OVH API, for offline benchmarks and load tests.
+
+Serves `/cloud/project` endpoints used by the exporter from a recording (see
+`ovh_exporter record`) or from synthetic payloads, with configurable latency,
+errors and rate limit. Requests are not authenticated."""
+
+from __future__ import annotations
+
+import json
+import logging
+import random
+import socketserver
+import threading
+import time
+import typing
+from http import HTTPStatus
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import click
+
+from ovh_exporter import recording
+from ovh_exporter.logger import init_logging, log
+from ovh_exporter.ovh_client import ENDPOINT_PATHS
+from ovh_exporter.resilience import TokenBucket
+from ovh_exporter.synthetic import service_id, synthetic_payloads
+
+# path suffix -> endpoint name
+_SUFFIXES = {suffix: name for name, (suffix, _) in ENDPOINT_PATHS.items()}
+_PREFIX = "/cloud/project"
+
+
+class RecordingSource:
+    """Payloads replayed from a recording."""
+
+    def __init__(self, recording_dict):
+        self._services = recording_dict["services"]
+
+    def service_ids(self) -> list[str]:
+        """Served service ids."""
+        return list(self._services)
+
+    def payload(self, project_id: str, endpoint: str):
+        """Endpoint payload of a service, None if unknown."""
+        return self._services.get(project_id, {}).get(endpoint)
+
+
+class SyntheticSource:
+    """Synthetic payloads of `services` services (see `synthetic.synthetic_payloads`)."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, services: int, instances: int, volumes: int, storages: int, seed: int | None = None):
+        self._ids = [service_id(i) for i in range(services)]
+        self._known = set(self._ids)
+        self._args = (instances, volumes, storages, seed)
+        self._lock = threading.Lock()
+        # service id -> payloads by endpoint, generated on first request
+        self._payloads: dict[str, dict[str, typing.Any]] = {}
+
+    def service_ids(self) -> list[str]:
+        """Served service ids."""
+        return list(self._ids)
+
+    def payload(self, project_id: str, endpoint: str):
+        """Endpoint payload of a service, None if unknown."""
+        if project_id not in self._known:
+            return None
+        with self._lock:
+            if project_id not in self._payloads:
+                self._payloads[project_id] = synthetic_payloads(project_id, *self._args)
+            return self._payloads[project_id][endpoint]
+
+
+class FakeOvhApi:
+    """WSGI fake OVH API.
+
+    Each request waits `latency` seconds (plus up to `jitter` seconds), fails
+    with a 500 status with `error_rate` probability, and gets a 429 status
+    when more than `rate_limit` requests by second are received (0: no limit)."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        source: RecordingSource | SyntheticSource,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: float = 0.0,
+        burst: int = 10,
+        seed: int | None = None,
+    ):
+        self.source = source
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._bucket = TokenBucket(rate_limit, burst) if rate_limit > 0 else None
+        self._random = random.Random(seed)  # noqa: S311
+        self._lock = threading.Lock()
+        # HTTP status -> served responses count
+        self.responses: dict[int, int] = {}
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        status, payload, headers = self._handle(path[4:] if path.startswith("/1.0") else path)
+        with self._lock:
+            self.responses[status] = self.responses.get(status, 0) + 1
+        body = json.dumps(payload).encode()
+        start_response(
+            f"{status.value} {status.phrase}",
+            [("Content-Type", "application/json"), ("Content-Length", str(len(body))), *headers],
+        )
+        return [body]
+
+    def _handle(self, path: str) -> tuple[HTTPStatus, typing.Any, list[tuple[str, str]]]:
+        if path == "/auth/time":
+            return HTTPStatus.OK, int(time.time()), []
+        if self._bucket is not None and not self._bucket.try_take():
+            return HTTPStatus.TOO_MANY_REQUESTS, {"message": "Too many requests"}, [("Retry-After", "1")]
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        if failed:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"message": "Internal server error"}, []
+        if path == _PREFIX:
+            return HTTPStatus.OK, self.source.service_ids(), []
+        payload = None
+        if path.startswith(f"{_PREFIX}/"):
+            project_id, _, suffix = path[len(_PREFIX) + 1 :].partition("/")
+            endpoint = _SUFFIXES.get(f"/{suffix}" if suffix else "")
+            payload = self.source.payload(project_id, endpoint) if endpoint else None
+        if payload is None:
+            return HTTPStatus.NOT_FOUND, {"message": f"The requested object ({path}) does not exist"}, []
+        return HTTPStatus.OK, payload, []
+
+
+class _ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _RequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):  # noqa: A002 pylint: disable=redefined-builtin
+        log.debug(format, *args)
+
+
+def serve(app: FakeOvhApi, host: str = "127.0.0.1", port: int = 0) -> WSGIServer:
+    """Build a threaded HTTP server for `app`; call `serve_forever()` to run it.
+
+    Port 0 picks a free port (see `server.server_port`)."""
+    return make_server(host, port, app, server_class=_ThreadingWSGIServer, handler_class=_RequestHandler)
+
+
+@click.command("ovh_exporter_fake_api")
+@click.option("-v", "--verbosity", type=click.Choice(["warning", "info", "debug", "error"]), default="info")
+@click.option("--bind", default="127.0.0.1", show_default=True)
+@click.option("--port", type=int, default=8081, show_default=True)
+@click.option("--recording", "recording_file", type=click.Path(exists=True, dir_okay=False), help="Replay a recording")
+@click.option("--services", type=int, default=10, show_default=True, help="Synthetic services count")
+@click.option("--instances", type=int, default=10, show_default=True, help="Synthetic instances by service")
+@click.option("--volumes", type=int, default=10, show_default=True, help="Synthetic volumes by service")
+@click.option("--storages", type=int, default=10, show_default=True, help="Synthetic buckets by service")
+@click.option("--seed", type=int, default=None, help="Random seed (payloads, latency, errors)")
+@click.option("--latency", type=float, default=0.0, show_default=True, help="Response delay in seconds")
+@click.option("--jitter", type=float, default=0.0, show_default=True, help="Random additional delay in seconds")
+@click.option("--error-rate", type=float, default=0.0, show_default=True, help="Ratio of 500 responses")
+@click.option("--rate-limit", type=float, default=0.0, show_default=True, help="Requests by second (0: no limit)")
+@click.option("--burst", type=int, default=10, show_default=True, help="Rate limit burst")
+# pylint: disable=too-many-arguments,too-many-locals
+def main(
+    verbosity,
+    bind,
+    port,
+    recording_file,
+    services,
+    instances,
+    volumes,
+    storages,
+    seed,
+    latency,
+    jitter,
+    error_rate,
+    rate_limit,
+    burst,
+):
+    """Run a fake OVH API (use it with ovh.endpoint_url configuration)."""
+    init_logging(getattr(logging, verbosity.upper()))
+    if recording_file:
+        source: RecordingSource | SyntheticSource = RecordingSource(recording.load(recording_file))
+    else:
+        source = SyntheticSource(services, instances, volumes, storages, seed)
+    app = FakeOvhApi(source, latency, jitter, error_rate, rate_limit, burst, seed)
+    server = serve(app, bind, port)
+    print(f"Fake OVH API on http://{bind}:{server.server_port}/1.0 ({len(source.service_ids())} services)")  # noqa: T201
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
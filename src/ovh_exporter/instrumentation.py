@@ -0,0 +1,116 @@
+"""Exporter self-instrumentation."""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import typing
+
+if typing.TYPE_CHECKING:
+    from prometheus_client.core import HistogramMetricFamily
+
+API_DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+API_SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+COLLECT_DURATION_BUCKETS = (0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+
+
+class Histogram:
+    """Plain histogram accumulator (not thread-safe), serializable as a dict."""
+
+    def __init__(self, buckets: typing.Sequence[float], counts: list[int] | None = None, total: float = 0.0):
+        self.buckets = list(buckets)
+        # non-cumulative counts; last item is +Inf bucket
+        self.counts = counts if counts is not None else [0] * (len(self.buckets) + 1)
+        self.sum = total
+
+    def observe(self, value: float):
+        """Add an observation."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def add_to(self, family: HistogramMetricFamily, labels: typing.Sequence[str]):
+        """Add histogram as a sample set of a HistogramMetricFamily."""
+        cumulative = []
+        count = 0
+        for bound, bucket_count in zip([*self.buckets, float("inf")], self.counts):
+            count += bucket_count
+            cumulative.append(("+Inf" if bound == float("inf") else str(bound), count))
+        family.add_metric(labels, cumulative, self.sum)
+
+    def to_dict(self):
+        """Serializable representation."""
+        return {"buckets": self.buckets, "counts": self.counts, "sum": self.sum}
+
+    @staticmethod
+    def from_dict(histogram_dict) -> Histogram:
+        """Load from `to_dict` representation."""
+        return Histogram(histogram_dict["buckets"], list(histogram_dict["counts"]), histogram_dict["sum"])
+
+
+class ApiStats:
+    """OVH API calls statistics, by endpoint (thread-safe).
+
+    Statistics are kept as plain data so that a collector process can share them
+    with server workers (see `SnapshotStore.put_stats`)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._durations: dict[str, Histogram] = {}
+        self._sizes: dict[str, Histogram] = {}
+        # (endpoint, status) -> count; status is `error` for network errors
+        self._responses: dict[tuple[str, str], int] = {}
+        # endpoint -> [throttled calls count, total wait in seconds]
+        self._throttled: dict[str, list[float]] = {}
+        # (endpoint, reason) -> count; reason is the HTTP status, or `error` for network errors
+        self._retries: dict[tuple[str, str], int] = {}
+
+    def observe(self, endpoint: str, status: str, duration: float, size: int | None):
+        """Record an API call."""
+        with self._lock:
+            self._durations.setdefault(endpoint, Histogram(API_DURATION_BUCKETS)).observe(duration)
+            if size is not None:
+                self._sizes.setdefault(endpoint, Histogram(API_SIZE_BUCKETS)).observe(size)
+            self._responses[(endpoint, status)] = self._responses.get((endpoint, status), 0) + 1
+
+    def observe_throttle(self, endpoint: str, delay: float):
+        """Record a call delayed by rate limiting."""
+        with self._lock:
+            throttled = self._throttled.setdefault(endpoint, [0, 0.0])
+            throttled[0] += 1
+            throttled[1] += delay
+
+    def observe_retry(self, endpoint: str, reason: str):
+        """Record a retried call."""
+        with self._lock:
+            self._retries[(endpoint, reason)] = self._retries.get((endpoint, reason), 0) + 1
+
+    def to_dict(self):
+        """Serializable representation."""
+        with self._lock:
+            return {
+                "durations": {k: v.to_dict() for k, v in self._durations.items()},
+                "sizes": {k: v.to_dict() for k, v in self._sizes.items()},
+                "responses": [[endpoint, status, count] for (endpoint, status), count in self._responses.items()],
+                "throttled": {k: list(v) for k, v in self._throttled.items()},
+                "retries": [[endpoint, reason, count] for (endpoint, reason), count in self._retries.items()],
+            }
+
+
+# API statistics of current process
+API_STATS = ApiStats()
+
+
+# pylint: disable=too-many-arguments
+def add_api_stats(stats, durations, sizes, responses, throttled, throttle_wait, retries):
+    """Fill API metric families from `ApiStats.to_dict` statistics."""
+    for endpoint, histogram in sorted(stats["durations"].items()):
+        Histogram.from_dict(histogram).add_to(durations, [endpoint])
+    for endpoint, histogram in sorted(stats["sizes"].items()):
+        Histogram.from_dict(histogram).add_to(sizes, [endpoint])
+    for endpoint, status, count in sorted(stats["responses"]):
+        responses.add_metric([endpoint, status], count)
+    for endpoint, (count, wait) in sorted(stats.get("throttled", {}).items()):
+        throttled.add_metric([endpoint], count)
+        throttle_wait.add_metric([endpoint], wait)
+    for endpoint, reason, count in sorted(stats.get("retries", [])):
+        retries.add_metric([endpoint, reason], count)
@@ -0,0 +1,78 @@
+"""Pluggable JSON decoder of OVH API responses.
+
+`orjson` or `msgspec` are used when installed (`fast-json` extra), else the
+standard library `json` module."""
+
+from __future__ import annotations
+
+import json
+import typing
+
+from ovh_exporter.logger import log
+
+# backends by preference order (auto selection)
+BACKENDS = ("orjson", "msgspec", "json")
+
+
+def decoder(name: str) -> typing.Callable[[bytes], typing.Any]:
+    """Decode function of a backend; raises RuntimeError if backend is not installed.
+
+    Decode functions raise ValueError on invalid documents, as `json.loads` does."""
+    # pylint: disable=import-outside-toplevel
+    try:
+        if name == "orjson":
+            import orjson  # noqa: PLC0415
+
+            return orjson.loads
+        if name == "msgspec":
+            import msgspec.json  # noqa: PLC0415
+
+            return _msgspec_decoder(msgspec.json.Decoder().decode, msgspec.DecodeError)
+    except ImportError as e:
+        raise RuntimeError(f"{name} is not installed (pip install ovh_exporter[fast-json])") from e  # noqa: TRY003,EM102
+    if name == "json":
+        return json.loads
+    raise ValueError(f"Unknown JSON backend {name}")  # noqa: TRY003,EM102
+
+
+def _msgspec_decoder(decode, error: type[Exception]) -> typing.Callable[[bytes], typing.Any]:
+    def loads(data: bytes):
+        try:
+            return decode(data)
+        except error as e:
+            raise ValueError(str(e)) from e
+
+    return loads
+
+
+_backend = "json"
+_loads: typing.Callable[[bytes], typing.Any] = json.loads
+
+
+def set_backend(name: str = "auto") -> str:
+    """Select decoder backend (`auto`: first installed of `BACKENDS`); returns backend name."""
+    global _backend, _loads  # noqa: PLW0603 pylint: disable=global-statement
+    for candidate in BACKENDS if name == "auto" else (name,):
+        try:
+            _loads = decoder(candidate)
+        except RuntimeError:
+            if name != "auto":
+                raise
+            continue
+        _backend = candidate
+        break
+    log.debug("JSON backend: %s", _backend)
+    return _backend
+
+
+def backend() -> str:
+    """Selected backend name."""
+    return _backend
+
+
+def loads(data: bytes) -> typing.Any:
+    """Decode a JSON document with the selected backend."""
+    return _loads(data)
+
+
+set_backend()
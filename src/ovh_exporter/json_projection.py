@@ -0,0 +1,96 @@
+"""Incremental JSON decoding keeping only needed fields.
+
+Large payloads (`/usage/current`) are decoded value by value: only projected
+fields are built as Python objects, dropped arrays are decoded one item at a
+time, so that memory use does not depend on dropped data."""
+
+from __future__ import annotations
+
+import json
+import re
+import typing
+
+# projection: True keeps a whole value; a dict keeps listed object keys (with
+# their own projection), and applies to each item of an array
+Projection = typing.Union[bool, typing.Mapping[str, "Projection"]]
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def loads_projected(text: str, projection: Projection) -> typing.Any:
+    """Decode a JSON document, keeping only `projection` fields.
+
+    Raises `json.JSONDecodeError` (a ValueError) on invalid documents."""
+    value, end = _decode(text, _skip(text, 0), projection)
+    if _skip(text, end) != len(text):
+        raise json.JSONDecodeError("Extra data", text, end)  # noqa: TRY003,EM101
+    return value
+
+
+def project(value: typing.Any, projection: Projection) -> typing.Any:
+    """Copy of a decoded value keeping only `projection` fields (as `loads_projected` decodes them)."""
+    if isinstance(value, list) and projection is not True:
+        return [project(item, projection) for item in value]
+    if isinstance(value, dict) and isinstance(projection, dict):
+        return {key: project(item, projection[key]) for key, item in value.items() if key in projection}
+    return value
+
+
+def _skip(text: str, idx: int) -> int:
+    return _WHITESPACE.match(text, idx).end()  # type: ignore[union-attr]
+
+
+def _decode(text: str, idx: int, projection: Projection | None) -> tuple[typing.Any, int]:
+    """Decode value at `idx`; returns (value, end index). Value is None if dropped (no projection)."""
+    char = text[idx : idx + 1]
+    if char == "[" and projection is not True:
+        return _decode_array(text, _skip(text, idx + 1), projection)
+    if char == "{" and isinstance(projection, dict):
+        return _decode_object(text, _skip(text, idx + 1), projection)
+    value, end = _DECODER.raw_decode(text, idx)
+    return (value if projection else None), end
+
+
+def _separator(text: str, idx: int, closing: str) -> tuple[bool, int]:
+    """Read a `,` or closing character; returns (True if closed, index after whitespace)."""
+    idx = _skip(text, idx)
+    char = text[idx : idx + 1]
+    if char == closing:
+        return True, idx + 1
+    if char != ",":
+        raise json.JSONDecodeError(f"Expecting ',' delimiter or '{closing}'", text, idx)  # noqa: TRY003,EM102
+    return False, _skip(text, idx + 1)
+
+
+def _decode_array(text: str, idx: int, projection: Projection | None) -> tuple[list | None, int]:
+    items: list | None = [] if projection else None
+    if text[idx : idx + 1] == "]":
+        return items, idx + 1
+    while True:
+        value, idx = _decode(text, idx, projection)
+        if items is not None:
+            items.append(value)
+        closed, idx = _separator(text, idx, "]")
+        if closed:
+            return items, idx
+
+
+def _decode_object(text: str, idx: int, projection: typing.Mapping[str, Projection]) -> tuple[dict, int]:
+    result: dict = {}
+    if text[idx : idx + 1] == "}":
+        return result, idx + 1
+    while True:
+        if text[idx : idx + 1] != '"':
+            raise json.JSONDecodeError("Expecting property name enclosed in double quotes", text, idx)  # noqa: TRY003,EM101
+        key, idx = _DECODER.raw_decode(text, idx)
+        idx = _skip(text, idx)
+        if text[idx : idx + 1] != ":":
+            raise json.JSONDecodeError("Expecting ':' delimiter", text, idx)  # noqa: TRY003,EM101
+        field = projection.get(key, None)
+        value, idx = _decode(text, _skip(text, idx + 1), field)
+        if field:
+            result[key] = value
+        closed, idx = _separator(text, idx, "}")
+        if closed:
+            return result, idx
@@ -0,0 +1,509 @@
+"""Declarative metrics specification and compiled extraction engine.
+
+`FAMILIES` declares every exposed metric family (name, help, labels, unit).
+`TABLES` maps snapshot payloads to OVH families: each table walks rows of one
+payload once, and adds one sample by row to each of its families.
+
+Paths are dotted keys (`stored.quantity.value`); `[]` iterates a list
+(`hourlyUsage.instance[].details[]`); a leading `^` reads the parent row
+(`^region`, region of the usage group of a detail)."""
+
+from __future__ import annotations
+
+import functools
+import sys
+import typing
+
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from prometheus_client.samples import Sample
+
+if typing.TYPE_CHECKING:
+    from prometheus_client.metrics_core import Metric
+
+# marker of a missing payload value
+MISSING = object()
+
+_FAMILY_TYPES: dict[str, typing.Callable[..., Metric]] = {
+    "gauge": GaugeMetricFamily,
+    "counter": CounterMetricFamily,
+    "histogram": HistogramMetricFamily,
+}
+
+
+# pylint: disable=too-few-public-methods
+class FamilySpec:
+    """Metric family declaration.
+
+    Families labelled by `service_id` get custom service labels first."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...], unit: str = "", kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.unit = unit
+        self.kind = kind
+
+    def family(self, labelnames: typing.Sequence[str]) -> Metric:
+        """New empty family; `labelnames` are custom service label names."""
+        labels = [*labelnames, *self.labels] if self.labels[:1] == ("service_id",) else list(self.labels)
+        return _FAMILY_TYPES[self.kind](self.name, self.documentation, labels=labels, unit=self.unit)
+
+
+class Const:
+    """Constant label or value."""
+
+    def __init__(self, value):
+        self.value = value
+
+
+# label or value: a path, a constant, or a function of (row, parent row)
+Field = typing.Union[str, Const, typing.Callable[[typing.Any, typing.Any], typing.Any]]
+
+
+class Table:
+    """Rows of a snapshot payload mapped to metric families.
+
+    `source` is the snapshot response attribute holding the payload. `labels`
+    maps label names (after `service_id`) to fields, `values` maps
+    family names to fields. Rows are skipped if `where` field is falsy; samples
+    are skipped if their value is missing, unless a `defaults` value is given."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        name: str,
+        source: str,
+        rows: str,
+        labels: dict[str, Field],
+        values: dict[str, Field],
+        where: Field | None = None,
+        defaults: dict[str, float] | None = None,
+    ):
+        self.name = name
+        self.source = source
+        self.rows = rows
+        self.labels = labels
+        self.values = values
+        self.where = where
+        self.defaults = defaults or {}
+
+
+def _path_getter(path: str) -> typing.Callable[[typing.Any], typing.Any]:
+    keys = [key for key in path.split(".") if key]
+
+    def get(item):
+        for key in keys:
+            if not isinstance(item, dict):
+                return MISSING
+            item = item.get(key, MISSING)
+            if item is MISSING or item is None:
+                return MISSING
+        return item
+
+    return get
+
+
+def _field_getter(field: Field) -> typing.Callable[[typing.Any, typing.Any], typing.Any]:
+    """Compile a field into a function of (row, parent row)."""
+    if isinstance(field, Const):
+        value = field.value
+        return lambda _row, _parent: value
+    if callable(field):
+        return field
+    if field.startswith("^"):
+        parent_getter = _path_getter(field[1:])
+        return lambda _row, parent: parent_getter(parent)
+    getter = _path_getter(field)
+    return lambda row, _parent: getter(row)
+
+
+def _rows_walker(rows: str) -> typing.Callable[[typing.Any], list[tuple[typing.Any, typing.Any]]]:
+    """Compile a rows path into a function returning (row, parent row) pairs."""
+    levels = [_path_getter(level) for level in rows.split("[]")[:-1]]
+
+    def walk(payload):
+        items = [(payload, None)]
+        for level in levels:
+            children = []
+            for item, _ in items:
+                sequence = level(item)
+                if isinstance(sequence, list):
+                    children.extend((child, item) for child in sequence)
+            items = children
+        return items
+
+    return walk
+
+
+def _number(value):
+    if value is MISSING or isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return MISSING
+
+
+# pylint: disable=too-few-public-methods
+class CompiledTable:
+    """Table compiled for a set of custom service label names."""
+
+    def __init__(self, table: Table, labelnames: typing.Sequence[str]):
+        self.name = table.name
+        self.source = table.source
+        self.families = tuple(table.values)
+        self._labelnames = (*labelnames, "service_id", *table.labels)
+        for name in table.values:
+            if FAMILIES_BY_NAME[name].labels != ("service_id", *table.labels):
+                raise RuntimeError(f"Table {table.name} labels do not match {name} labels")  # noqa: TRY003,EM102
+        self._walk = _rows_walker(table.rows)
+        self._where = _field_getter(table.where) if table.where is not None else None
+        self._labels = tuple(_field_getter(field) for field in table.labels.values())
+        self._values = tuple(
+            (name, _field_getter(field), table.defaults.get(name, MISSING)) for name, field in table.values.items()
+        )
+
+    def extract(
+        self,
+        payload,
+        prefix: tuple[str, ...],
+        samples: typing.Mapping[str, list],
+        labels_cache: dict[tuple, dict[str, str]] | None = None,
+    ) -> dict[tuple, dict[str, str]]:
+        """Append samples of payload rows to `samples` (family name -> samples list).
+
+        `prefix` holds custom service label values and service id. Returns
+        labels dicts by row label values: pass it as `labels_cache` on next
+        extraction of the same service, so that labels of unchanged resources
+        are reused instead of being built again."""
+        if not isinstance(payload, (list, dict)):
+            raise TypeError(f"Unexpected {type(payload).__name__} payload for {self.name}")  # noqa: TRY003,EM102
+        if labels_cache is None:
+            labels_cache = {}
+        cache: dict[tuple, dict[str, str]] = {}
+        labelnames = self._labelnames
+        where = self._where
+        label_getters = self._labels
+        values = [(samples[name], name, getter, default) for name, getter, default in self._values]
+        for row, parent in self._walk(payload):
+            if where is not None and _number(where(row, parent)) in (MISSING, 0):
+                continue
+            key = tuple([getter(row, parent) for getter in label_getters])
+            # one labels dict by resource, shared by the samples of the row
+            labels = cache.get(key)
+            if labels is None:
+                labels = labels_cache.get(key)
+                if labels is None:
+                    labels = dict(zip(labelnames, (*prefix, *_label_values(key))))
+                cache[key] = labels
+            for family_samples, name, getter, default in values:
+                value = _number(getter(row, parent))
+                if value is MISSING:
+                    if default is MISSING:
+                        continue
+                    value = default
+                family_samples.append(Sample(name, labels, value))
+        return cache
+
+
+def _label_values(values: tuple) -> typing.Iterator[str]:
+    """Label values as interned strings (shared by services and refreshes)."""
+    for value in values:
+        yield "" if value is MISSING else sys.intern(str(value))
+
+
+def compile_tables(labelnames: typing.Sequence[str]) -> tuple[CompiledTable, ...]:
+    """Compile `TABLES` for custom service label names."""
+    return tuple(CompiledTable(table, labelnames) for table in TABLES)
+
+
+@functools.lru_cache(maxsize=None)
+def describe_families(labelnames: tuple[str, ...]) -> tuple[Metric, ...]:
+    """Empty families of `FAMILIES` (collector description), cached by custom service label names."""
+    return tuple(spec.family(labelnames) for spec in FAMILIES)
+
+
+def _storage_name(row, _parent):
+    return "__all__" if row.get("type") == "pcs" else row.get("bucketName", MISSING)
+
+
+_REGION = ("service_id", "region")
+_VOLUME = ("service_id", "volume_id", "name", "region", "type")
+_STORAGE = ("service_id", "region", "storage_id", "storage_name", "storage_type")
+_INSTANCE_USAGE = ("service_id", "region", "instance_id", "type", "flavor")
+_VOLUME_USAGE = ("service_id", "region", "volume_id", "flavor")
+_STORAGE_USAGE = ("service_id", "region", "flavor", "storage_name")
+_SERVICE = ("service_id",)
+
+# exposition order
+FAMILIES = (
+    FamilySpec("ovh_quota_instance_count", "Instance count", _REGION),
+    FamilySpec("ovh_quota_instance_max_count", "Instance max count", _REGION),
+    FamilySpec("ovh_quota_cpu_count", "CPU count", _REGION),
+    FamilySpec("ovh_quota_cpu_max_count", "CPU max count", _REGION),
+    FamilySpec("ovh_quota_ram_gb", "RAM count", _REGION, "gb"),
+    FamilySpec("ovh_quota_ram_max_gb", "RAM max count", _REGION, "gb"),
+    FamilySpec("ovh_quota_volume_gb", "Volume gigabytes", _REGION, "gb"),
+    FamilySpec("ovh_quota_volume_max_gb", "Volume max gigabytes", _REGION, "gb"),
+    FamilySpec("ovh_quota_volume_count", "Volume count", _REGION),
+    FamilySpec("ovh_quota_volume_max_count", "Volume max count", _REGION),
+    FamilySpec("ovh_quota_volume_backup_gb", "Volume backup gigabytes", _REGION, "gb"),
+    FamilySpec("ovh_quota_volume_backup_max_gb", "Volume backup max gigabytes", _REGION, "gb"),
+    FamilySpec("ovh_quota_volume_backup_count", "Volume count", _REGION),
+    FamilySpec("ovh_quota_volume_backup_max_count", "Volume max count", _REGION),
+    FamilySpec("ovh_quota_network_count", "Network count", _REGION),
+    FamilySpec("ovh_quota_network_max_count", "Network max count", _REGION),
+    FamilySpec("ovh_quota_network_subnet_count", "Network subnet count", _REGION),
+    FamilySpec("ovh_quota_network_subnet_max_count", "Network subnet max count", _REGION),
+    FamilySpec("ovh_quota_network_floating_ip_count", "Network floating IP count", _REGION),
+    FamilySpec("ovh_quota_network_floating_ip_max_count", "Network floating IP max count", _REGION),
+    FamilySpec("ovh_quota_network_gateway_count", "Network gateway count", _REGION),
+    FamilySpec("ovh_quota_network_gateway_max_count", "Network gateway max count", _REGION),
+    FamilySpec("ovh_quota_load_balancer_count", "Load balancer count", _REGION),
+    FamilySpec("ovh_quota_load_balancer_max_count", "Load balancer max count", _REGION),
+    FamilySpec("ovh_quota_keymanager_secret_count", "Key manager count", _REGION),
+    FamilySpec("ovh_quota_keymanager_secret_max_count", "Key manager max count", _REGION),
+    FamilySpec("ovh_volume_size_gb", "Volume size in Gb", _VOLUME, "gb"),
+    FamilySpec("ovh_storage_object_count", "Storage object count", _STORAGE),
+    FamilySpec("ovh_storage_size_bytes", "Storage size in bytes", _STORAGE, "bytes"),
+    FamilySpec("ovh_usage_instance_hours", "Instance usage in hours", _INSTANCE_USAGE, "hours"),
+    FamilySpec("ovh_usage_instance_price", "Instance usage price", _INSTANCE_USAGE),
+    FamilySpec("ovh_usage_volume_gb_hours", "Volume usage in gb x hours", _VOLUME_USAGE, "gb_hours"),
+    FamilySpec("ovh_usage_volume_price", "Volume usage price", _VOLUME_USAGE),
+    FamilySpec("ovh_usage_storage_price", "Storage usage price", _STORAGE_USAGE),
+    FamilySpec("ovh_usage_storage_gb_hours", "Storage usage in gb x hours", _STORAGE_USAGE, "gb_hours"),
+    FamilySpec(
+        "ovh_usage_storage_bandwidth_internal_outgoing_price",
+        "Storage usage external outgoing bandwidth price",
+        _STORAGE_USAGE,
+    ),
+    FamilySpec(
+        "ovh_usage_storage_bandwidth_internal_outgoing_gb",
+        "Storage usage external outgoing bandwidth in gb",
+        _STORAGE_USAGE,
+        "gb",
+    ),
+    FamilySpec(
+        "ovh_usage_storage_bandwidth_internal_incoming_price",
+        "Storage usage external incoming bandwidth price",
+        _STORAGE_USAGE,
+    ),
+    FamilySpec(
+        "ovh_usage_storage_bandwidth_internal_incoming_gb",
+        "Storage usage external incoming bandwidth in gb",
+        _STORAGE_USAGE,
+        "gb",
+    ),
+    FamilySpec(
+        "ovh_usage_storage_bandwidth_external_outgoing_price",
+        "Storage usage external outgoing bandwidth price",
+        _STORAGE_USAGE,
+    ),
+    FamilySpec(
+        "ovh_usage_storage_bandwidth_external_outgoing_gb",
+        "Storage usage external outgoing bandwidth in gb",
+        _STORAGE_USAGE,
+        "gb",
+    ),
+    FamilySpec(
+        "ovh_usage_storage_bandwidth_external_incoming_price",
+        "Storage usage external incoming bandwidth price",
+        _STORAGE_USAGE,
+    ),
+    FamilySpec(
+        "ovh_usage_storage_bandwidth_external_incoming_gb",
+        "Storage usage external incoming bandwidth in gb",
+        _STORAGE_USAGE,
+        "gb",
+    ),
+    # exporter snapshots
+    FamilySpec(
+        "ovh_exporter_snapshot_timestamp_seconds", "Unix time of the OVH API data snapshot", _SERVICE, "seconds"
+    ),
+    FamilySpec(
+        "ovh_exporter_refresh_duration_seconds",
+        "Duration of the last OVH API data refresh in seconds",
+        _SERVICE,
+        "seconds",
+    ),
+    FamilySpec(
+        "ovh_exporter_usage_cache_hits",
+        "Collections reusing usage metrics as usage lastUpdate has not changed",
+        _SERVICE,
+        kind="counter",
+    ),
+    # exporter self-instrumentation
+    FamilySpec(
+        "ovh_exporter_api_request_duration_seconds",
+        "OVH API request duration in seconds",
+        ("endpoint",),
+        "seconds",
+        "histogram",
+    ),
+    FamilySpec(
+        "ovh_exporter_api_response_size_bytes",
+        "OVH API response payload size in bytes",
+        ("endpoint",),
+        "bytes",
+        "histogram",
+    ),
+    FamilySpec(
+        "ovh_exporter_api_responses",
+        "OVH API responses by HTTP status (error for network errors)",
+        ("endpoint", "status"),
+        kind="counter",
+    ),
+    FamilySpec(
+        "ovh_exporter_api_throttled",
+        "OVH API calls delayed by client-side rate limiting",
+        ("endpoint",),
+        kind="counter",
+    ),
+    FamilySpec(
+        "ovh_exporter_api_throttle_wait_seconds",
+        "Time OVH API calls waited for client-side rate limiting",
+        ("endpoint",),
+        "seconds",
+        "counter",
+    ),
+    FamilySpec(
+        "ovh_exporter_api_retries",
+        "OVH API calls retried, by reason (HTTP status, or error for network errors)",
+        ("endpoint", "reason"),
+        kind="counter",
+    ),
+    FamilySpec(
+        "ovh_exporter_service_stale",
+        "1 if last refresh of the service failed and a previous snapshot is served",
+        _SERVICE,
+    ),
+    FamilySpec("ovh_exporter_service_refresh_failures", "Consecutive failed refreshes of the service", _SERVICE),
+    FamilySpec(
+        "ovh_exporter_service_circuit_open",
+        "1 if service refreshes are suspended after repeated failures",
+        _SERVICE,
+    ),
+    FamilySpec(
+        "ovh_exporter_service_collect_errors",
+        "Failed metrics collections of the service (service metrics are skipped)",
+        _SERVICE,
+        kind="counter",
+    ),
+    FamilySpec(
+        "ovh_exporter_service_collect_duration_seconds",
+        "Duration of the last metrics collection of the service in seconds",
+        _SERVICE,
+        "seconds",
+    ),
+    FamilySpec(
+        "ovh_exporter_collect_method_duration_seconds",
+        "Duration of collect methods in seconds",
+        ("method",),
+        "seconds",
+        "histogram",
+    ),
+    FamilySpec(
+        "ovh_exporter_family_series",
+        "Number of series emitted by non-empty metric families in the last collection",
+        ("family",),
+    ),
+)
+FAMILIES_BY_NAME = {spec.name: spec for spec in FAMILIES}
+
+_BANDWIDTHS = {
+    "external_incoming": "incomingBandwidth",
+    "external_outgoing": "outgoingBandwidth",
+    "internal_incoming": "incomingInternalBandwidth",
+    "internal_outgoing": "outgoingInternalBandwidth",
+}
+
+TABLES = (
+    Table(
+        "quotas",
+        "quotas",
+        "[]",
+        labels={"region": "region"},
+        values={
+            "ovh_quota_instance_count": "instance.usedInstances",
+            "ovh_quota_instance_max_count": "instance.maxInstances",
+            "ovh_quota_cpu_count": "instance.usedCores",
+            "ovh_quota_cpu_max_count": "instance.maxCores",
+            "ovh_quota_ram_gb": "instance.usedRAM",
+            "ovh_quota_ram_max_gb": "instance.maxRam",
+            "ovh_quota_volume_gb": "volume.usedGigabytes",
+            "ovh_quota_volume_max_gb": "volume.maxGigabytes",
+            "ovh_quota_volume_count": "volume.volumeCount",
+            "ovh_quota_volume_max_count": "volume.maxVolumeCount",
+            "ovh_quota_volume_backup_gb": "volume.usedBackupGigabytes",
+            "ovh_quota_volume_backup_max_gb": "volume.maxBackupGigabytes",
+            "ovh_quota_volume_backup_count": "volume.volumeBackupCount",
+            "ovh_quota_volume_backup_max_count": "volume.maxVolumeBackupCount",
+            "ovh_quota_network_count": "network.usedNetworks",
+            "ovh_quota_network_max_count": "network.maxNetworks",
+            "ovh_quota_network_subnet_count": "network.usedSubnets",
+            "ovh_quota_network_subnet_max_count": "network.maxSubnets",
+            "ovh_quota_network_floating_ip_count": "network.usedFloatingIPs",
+            "ovh_quota_network_floating_ip_max_count": "network.maxFloatingIPs",
+            "ovh_quota_network_gateway_count": "network.usedGateways",
+            "ovh_quota_network_gateway_max_count": "network.maxGateways",
+            "ovh_quota_load_balancer_count": "loadBalancer.usedLoadBalancers",
+            "ovh_quota_load_balancer_max_count": "loadBalancer.maxLoadBalancers",
+            "ovh_quota_keymanager_secret_count": "keymanager.usedSecrets",
+            "ovh_quota_keymanager_secret_max_count": "keymanager.maxSecrets",
+        },
+    ),
+    Table(
+        "volumes",
+        "volumes",
+        "[]",
+        labels={"volume_id": "id", "name": "name", "region": "region", "type": "type"},
+        values={"ovh_volume_size_gb": "size"},
+    ),
+    Table(
+        "storages",
+        "storages",
+        "[]",
+        labels={"region": "region", "storage_id": "id", "storage_name": "name", "storage_type": "containerType"},
+        values={"ovh_storage_size_bytes": "storedBytes", "ovh_storage_object_count": "storedObjects"},
+    ),
+    Table(
+        "instance_hourly_usage",
+        "usage",
+        "hourlyUsage.instance[].details[]",
+        labels={"region": "^region", "instance_id": "instanceId", "type": Const("hourly"), "flavor": "^reference"},
+        values={"ovh_usage_instance_hours": "quantity.value", "ovh_usage_instance_price": "totalPrice"},
+    ),
+    Table(
+        "instance_monthly_usage",
+        "usage",
+        "monthlyUsage.instance[].details[]",
+        labels={"region": "^region", "instance_id": "instanceId", "type": Const("monthly"), "flavor": "^reference"},
+        values={"ovh_usage_instance_hours": Const(720), "ovh_usage_instance_price": "totalPrice"},
+    ),
+    Table(
+        "volume_usage",
+        "usage",
+        "hourlyUsage.volume[].details[]",
+        labels={"region": "^region", "volume_id": "volumeId", "flavor": "^type"},
+        values={"ovh_usage_volume_gb_hours": "quantity.value", "ovh_usage_volume_price": "totalPrice"},
+    ),
+    Table(
+        "storage_usage",
+        "usage",
+        "hourlyUsage.storage[]",
+        where="totalPrice",
+        labels={"region": "region", "flavor": "type", "storage_name": _storage_name},
+        values={
+            "ovh_usage_storage_gb_hours": "stored.quantity.value",
+            "ovh_usage_storage_price": "stored.totalPrice",
+            **{f"ovh_usage_storage_bandwidth_{name}_gb": f"{key}.quantity.value" for name, key in _BANDWIDTHS.items()},
+            **{f"ovh_usage_storage_bandwidth_{name}_price": f"{key}.totalPrice" for name, key in _BANDWIDTHS.items()},
+        },
+        # no bandwidth: 0
+        defaults={
+            **{f"ovh_usage_storage_bandwidth_{name}_gb": 0 for name in _BANDWIDTHS},
+            **{f"ovh_usage_storage_bandwidth_{name}_price": 0 for name in _BANDWIDTHS},
+        },
+    ),
+)
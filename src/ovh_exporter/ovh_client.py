@@ -1,61 +1,271 @@
 """OVH API client."""
 
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+import itertools
+import logging
+import threading
+import time
+import typing
+from http import HTTPStatus
+from urllib.parse import urlencode
+
 import ovh
+import ovh.client
+import ovh.exceptions
+import requests
+from requests.adapters import HTTPAdapter
 
-from ovh_exporter.config import OvhAccount
+from ovh_exporter import json_backend
+from ovh_exporter.instrumentation import API_STATS
+from ovh_exporter.json_projection import loads_projected, project
 from ovh_exporter.logger import log
+from ovh_exporter.resilience import DEFAULT_POLICY, CallPolicy, RateLimiter, RetryPolicy
+
+if typing.TYPE_CHECKING:
+    from ovh_exporter.config import OvhAccount
+    from ovh_exporter.json_projection import Projection
 
 
 class OvhApiResponse:
     """API fetch result."""
 
     # pylint: disable=too-many-arguments
-    def __init__(self, projects, instances, storages, volumes, quotas, usage):
+    def __init__(self, projects, instances, storages, volumes, quotas, usage, fetched_at=None):
         self.projects = projects
         self.instances = instances
         self.storages = storages
         self.volumes = volumes
         self.quotas = quotas
         self.usage = usage
+        # endpoint name -> unix time of the API call
+        self.fetched_at: dict[str, float] = fetched_at if fetched_at is not None else {}
+
+    def is_fresh(self, endpoint: str, ttl: typing.Mapping[str, float], now: float) -> bool:
+        """True if endpoint data is younger than its ttl."""
+        fetched_at = self.fetched_at.get(endpoint, None)
+        return fetched_at is not None and now < fetched_at + ttl.get(endpoint, 0)
+
+
+def build_policy(config: OvhAccount) -> CallPolicy:
+    """Build account rate limiting and retry policy from a Configuration."""
+    return CallPolicy(
+        RateLimiter(config.rate_limit.rate, config.rate_limit.burst),
+        RetryPolicy(config.retry.max_attempts, config.retry.backoff, config.retry.max_backoff),
+    )
 
 
 def build_client(config: OvhAccount):
     """Build a client from a Configuration."""
-    return ovh.Client(
+    client = ovh.Client(
         config.endpoint,
         config.application_key,
         config.application_secret,
         config.consumer_key,
     )
+    if config.endpoint_url:
+        # pylint: disable=protected-access
+        client._endpoint = config.endpoint_url  # noqa: SLF001
+    # used by endpoint calls (see `_get`)
+    client.call_policy = build_policy(config)
+    return client
 
 
 def fetch(client: ovh.Client, service_id: str) -> OvhApiResponse:
     """Test OVH API calls."""
-    projects = _project(client, service_id)
-    instances = _instances(client, service_id)
-    volumes = _volumes(client, service_id)
-    storages = _storages(client, service_id)
-    quotas = _quota(client, service_id)
-    usage = _usage(client, service_id)
-    return OvhApiResponse(
-        projects=projects,
-        instances=instances,
-        quotas=quotas,
-        storages=storages,
-        volumes=volumes,
-        usage=usage,
-    )
+    values = {}
+    fetched_at = {}
+    for name, (attribute, func) in ENDPOINTS.items():
+        values[attribute] = func(client, service_id, ENDPOINT_PROJECTIONS.get(name))
+        fetched_at[name] = time.time()
+    return OvhApiResponse(**values, fetched_at=fetched_at)
+
+
+class FetchEngine:
+    """Bounded thread pool fetching OVH API endpoints concurrently.
+
+    Each endpoint call of each service is a pool task, so at most `workers`
+    HTTP requests are in flight, whatever the number of services."""
+
+    def __init__(self, client: ovh.Client, workers: int = 8):
+        self.client = client
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ovh-fetch")
+        # endpoint calls not done yet (cancelled by shutdown)
+        self._pending: set[concurrent.futures.Future] = set()
+        # keep one HTTP connection by worker (requests default pool size is 10)
+        # pylint: disable=protected-access
+        session = getattr(client, "_session", None)
+        if session is not None:
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+
+    def submit(
+        self,
+        service_id: str,
+        previous: OvhApiResponse | None = None,
+        ttl: typing.Mapping[str, float] | None = None,
+    ) -> concurrent.futures.Future[OvhApiResponse]:
+        """Schedule endpoint calls for a service.
+
+        Endpoint data from `previous` response is reused if not older than
+        `ttl` (endpoint name -> seconds). Returned future fails with the first
+        endpoint error."""
+        result: concurrent.futures.Future[OvhApiResponse] = concurrent.futures.Future()
+        result.set_running_or_notify_cancel()
+        values: dict[str, typing.Any] = {}
+        fetched_at: dict[str, float] = {}
+        lock = threading.Lock()
+        now = time.time()
+        expired = []
+        for name, (attribute, func) in ENDPOINTS.items():
+            if previous is not None and ttl and previous.is_fresh(name, ttl, now):
+                values[attribute] = getattr(previous, attribute)
+                fetched_at[name] = previous.fetched_at[name]
+            else:
+                expired.append((name, attribute, func))
+        if not expired:
+            result.set_result(OvhApiResponse(**values, fetched_at=fetched_at))
+            return result
+
+        futures: list[concurrent.futures.Future] = []
+
+        def done(name, attribute, future):
+            self._pending.discard(future)
+            with lock:
+                if result.done():
+                    return
+                error = concurrent.futures.CancelledError() if future.cancelled() else future.exception()
+                if error is None:
+                    values[attribute] = future.result()
+                    fetched_at[name] = time.time()
+                    if len(values) == len(ENDPOINTS):
+                        result.set_result(OvhApiResponse(**values, fetched_at=fetched_at))
+                    return
+                result.set_exception(error)
+            # service failed: endpoint calls not started yet are not made (rate limit tokens are kept)
+            for sibling in futures:
+                sibling.cancel()
+
+        for name, attribute, func in expired:
+            if result.done():
+                break
+            future = self._executor.submit(func, self.client, service_id, ENDPOINT_PROJECTIONS.get(name))
+            futures.append(future)
+            self._pending.add(future)
+            future.add_done_callback(functools.partial(done, name, attribute))
+        return result
+
+    def fetch(
+        self,
+        service_id: str,
+        previous: OvhApiResponse | None = None,
+        ttl: typing.Mapping[str, float] | None = None,
+    ) -> OvhApiResponse:
+        """Fetch a service, endpoints being called concurrently."""
+        return self.submit(service_id, previous, ttl).result()
+
+    def fetch_all(self, service_ids: typing.Iterable[str]) -> dict[str, concurrent.futures.Future[OvhApiResponse]]:
+        """Schedule all services; futures are returned by service id."""
+        return {service_id: self.submit(service_id) for service_id in service_ids}
+
+    def shutdown(self, drain: bool = False):  # noqa: FBT001,FBT002
+        """Stop worker threads; endpoint calls not done yet are cancelled, unless `drain` (completed in background)."""
+        if not drain:
+            # `shutdown(cancel_futures=True)` needs Python 3.9
+            for future in list(self._pending):
+                future.cancel()
+        self._executor.shutdown(wait=False)
+
+
+def _with_query(target: str, params: typing.Mapping[str, typing.Any]) -> str:
+    """Append query parameters to target (booleans are sent as true/false, as `ovh.Client` does)."""
+    if not params:
+        return target
+    query = urlencode({k: str(v).lower() if isinstance(v, bool) else v for k, v in params.items()})
+    return f"{target}{'&' if '?' in target else '?'}{query}"
+
+
+def _throttle_delay(policy: CallPolicy, endpoint: str) -> float:
+    """Rate limiting delay of a call, recorded in API statistics."""
+    delay = policy.limiter.reserve(endpoint)
+    if delay > 0:
+        API_STATS.observe_throttle(endpoint, delay)
+    return delay
+
+
+def _retry_delay(policy: CallPolicy, endpoint: str, attempt: int, reason: str, retry_after: str | None = None) -> float:
+    """Backoff delay before retrying a call, recorded in API statistics."""
+    delay = policy.retry.delay(attempt, retry_after)
+    API_STATS.observe_retry(endpoint, reason)
+    log.info("OVH API %s call failed (%s, attempt %s), retrying in %.2fs", endpoint, reason, attempt, delay)
+    return delay
+
+
+def _get(client: ovh.Client, endpoint: str, target: str, _projection: Projection | None = None, **params):
+    """GET an API path; call is recorded in API statistics under `endpoint` name.
+
+    Call is rate limited and retried according to client `call_policy` (see
+    `build_client`). Errors are raised as `ovh.Client.get` does. Payload is
+    decoded keeping only `_projection` fields if given (see `json_projection`)."""
+    policy: CallPolicy = getattr(client, "call_policy", DEFAULT_POLICY)
+    url = _with_query(target, params)
+    for attempt in itertools.count(1):
+        time.sleep(_throttle_delay(policy, endpoint))
+        start = time.monotonic()
+        try:
+            response = client.raw_call("GET", url)
+        except requests.RequestException as e:
+            API_STATS.observe(endpoint, "error", time.monotonic() - start, None)
+            if policy.should_retry(attempt, None):
+                time.sleep(_retry_delay(policy, endpoint, attempt, "error"))
+                continue
+            raise ovh.exceptions.HTTPError("Low HTTP request failed error", e) from e  # noqa: TRY003,EM101
+        status = response.status_code
+        API_STATS.observe(endpoint, str(status), time.monotonic() - start, len(response.content))
+        if not policy.should_retry(attempt, status):
+            break
+        time.sleep(_retry_delay(policy, endpoint, attempt, str(status), response.headers.get("Retry-After")))
+    try:
+        payload = None if status == HTTPStatus.NO_CONTENT else _decode(response.content, status, _projection)
+    except ValueError as e:
+        raise ovh.exceptions.InvalidResponse("Failed to decode API response", e) from e  # noqa: TRY003,EM101
+    if HTTPStatus.CONTINUE <= status < HTTPStatus.MULTIPLE_CHOICES:
+        return payload
+    raise api_error(status, payload, response)
+
+
+def get(client: ovh.Client, endpoint: str, target: str, **params):
+    """GET an API path which is not a service endpoint (e.g. project listing).
+
+    Call is recorded in API statistics under `endpoint` name, rate limited
+    and retried as service endpoint calls are (see `_get`)."""
+    return _get(client, endpoint, target, **params)
+
+
+def _decode(body: bytes, status: int, projection: Projection | None):
+    """Decode a response payload with the selected `json_backend`; only successful responses are projected.
+
+    With the standard `json` backend, projected payloads are decoded
+    incrementally (bounded memory); faster backends decode the whole payload,
+    then keep projected fields."""
+    if projection is None or not HTTPStatus.CONTINUE <= status < HTTPStatus.MULTIPLE_CHOICES:
+        return json_backend.loads(body)
+    if json_backend.backend() == "json":
+        return loads_projected(body.decode(), projection)
+    return project(json_backend.loads(body), projection)
 
 
-def _project(client: ovh.Client, service_id: str):
+def _project(client: ovh.Client, service_id: str, projection: Projection | None = None):
     """Fetch project information."""
-    proj = client.get(f"/cloud/project/{service_id}")
-    # pylint: disable=W1203:logging-fstring-interpolation
-    log.debug(f"/cloud/project/{service_id}: {proj}")
+    proj = _get(client, "project", f"/cloud/project/{service_id}", _projection=projection)
+    log.debug("/cloud/project/%s: %s", service_id, proj)
     return proj
 
 
-def _quota(client: ovh.Client, service_id: str):
+def _quota(client: ovh.Client, service_id: str, projection: Projection | None = None):
     """Fetch quota information.
 
     region
@@ -87,13 +297,12 @@ def _quota(client: ovh.Client, service_id: str):
     keymanager.maxSecrets
     keymanager.usedSecrets
     """
-    quota = client.get(f"/cloud/project/{service_id}/quota")
-    # pylint: disable=W1203:logging-fstring-interpolation
-    log.debug(f"/cloud/project/{service_id}/quota: {quota}")
+    quota = _get(client, "quota", f"/cloud/project/{service_id}/quota", _projection=projection)
+    log.debug("/cloud/project/%s/quota: %s", service_id, quota)
     return quota
 
 
-def _storages(client: ovh.Client, service_id: str):
+def _storages(client: ovh.Client, service_id: str, projection: Projection | None = None):
     """Fetch storage information.
 
     id
@@ -104,13 +313,12 @@ def _storages(client: ovh.Client, service_id: str):
     storedBytes
     storedObjects
     """
-    storages = client.get(f"/cloud/project/{service_id}/storage", includeType=True)
-    # pylint: disable=W1203:logging-fstring-interpolation
-    log.debug(f"/cloud/project/{service_id}/storage: {storages}")
+    storages = _get(client, "storage", f"/cloud/project/{service_id}/storage", _projection=projection, includeType=True)
+    log.debug("/cloud/project/%s/storage: %s", service_id, storages)
     return storages
 
 
-def _usage(client: ovh.Client, service_id: str):
+def _usage(client: ovh.Client, service_id: str, projection: Projection | None = None):
     """Fetch usage information.
 
     hourlyUsage.instance[].reference: d2-2, ...
@@ -158,13 +366,12 @@ def _usage(client: ovh.Client, service_id: str):
     period.to
     lastUpdate
     """
-    usage = client.get(f"/cloud/project/{service_id}/usage/current")
-    # pylint: disable=W1203:logging-fstring-interpolation
-    log.debug(f"/cloud/project/{service_id}/usage/current: {usage}")
+    usage = _get(client, "usage", f"/cloud/project/{service_id}/usage/current", _projection=projection)
+    log.debug("/cloud/project/%s/usage/current: %s", service_id, usage)
     return usage
 
 
-def _volumes(client: ovh.Client, service_id: str):
+def _volumes(client: ovh.Client, service_id: str, projection: Projection | None = None):
     """Fetch volumes information.
     [].id
     [].attachedTo: [uuid]
@@ -178,18 +385,17 @@ def _volumes(client: ovh.Client, service_id: str):
     [].planCode: volume.classic.consumption, volume.high-speed-gen2.consumption
     [].type: classic, high-speed-gen2
     """
-    volumes = client.get(f"/cloud/project/{service_id}/volume")
-    # pylint: disable=W1203:logging-fstring-interpolation
-    log.debug(f"/cloud/project/{service_id}/volume: {volumes}")
+    volumes = _get(client, "volume", f"/cloud/project/{service_id}/volume", _projection=projection)
+    log.debug("/cloud/project/%s/volume: %s", service_id, volumes)
     return volumes
 
 
-def _instances(client: ovh.Client, service_id: str):
+def _instances(client: ovh.Client, service_id: str, projection: Projection | None = None):
     """Fetch instances information."""
-    instances = client.get(f"/cloud/project/{service_id}/instance")
-    # pylint: disable=W1203:logging-fstring-interpolation
-    log.debug(f"/cloud/project/{service_id}/instance: {instances}")
-    log.info("instances: %s", [_instance(i) for i in instances])
+    instances = _get(client, "instance", f"/cloud/project/{service_id}/instance", _projection=projection)
+    log.debug("/cloud/project/%s/instance: %s", service_id, instances)
+    if log.isEnabledFor(logging.INFO):
+        log.info("instances: %s", [_instance(i) for i in instances])
     return instances
 
 
@@ -208,3 +414,259 @@ def _instance(instance):
         "billing": billing,
         "region": instance["region"],
     }
+
+
+def signature(application_secret: str, consumer_key: str, method: str, target: str, body: str, now: str) -> str:
+    """OVH request signature (same algorithm as `ovh.Client.raw_call`)."""
+    digest = hashlib.sha1(  # noqa: S324
+        f"{application_secret}+{consumer_key}+{method.upper()}+{target}+{body}+{now}".encode()
+    )
+    return "$1$" + digest.hexdigest()
+
+
+# 403 errorCode -> exception, as mapped by `ovh.Client.call`
+_FORBIDDEN_ERRORS = {
+    "NOT_GRANTED_CALL": ovh.exceptions.NotGrantedCall,
+    "NOT_CREDENTIAL": ovh.exceptions.NotCredential,
+    "INVALID_KEY": ovh.exceptions.InvalidKey,
+    "INVALID_CREDENTIAL": ovh.exceptions.InvalidCredential,
+    "FORBIDDEN": ovh.exceptions.Forbidden,
+}
+_STATUS_ERRORS = {
+    404: ovh.exceptions.ResourceNotFoundError,
+    400: ovh.exceptions.BadParametersError,
+    409: ovh.exceptions.ResourceConflictError,
+    460: ovh.exceptions.ResourceExpiredError,
+}
+
+
+def api_error(status: int, payload, response=None) -> ovh.exceptions.APIError:
+    """Exception matching an OVH API error response (same mapping as `ovh.Client.call`)."""
+    message = payload.get("message") if isinstance(payload, dict) else None
+    if status == HTTPStatus.FORBIDDEN and isinstance(payload, dict) and payload.get("errorCode") in _FORBIDDEN_ERRORS:
+        return _FORBIDDEN_ERRORS[payload["errorCode"]](message, response=response)
+    if status in _STATUS_ERRORS:
+        return _STATUS_ERRORS[status](message, response=response)
+    if status == 0:
+        return ovh.exceptions.NetworkError()
+    return ovh.exceptions.APIError(message, response=response)
+
+
+class AsyncOvhClient:
+    """Asyncio OVH API client (needs `aiohttp`, `async` extra).
+
+    Requests are signed as `ovh.Client` does. One keep-alive connection pool
+    (up to `limit` connections) is shared by all requests to the endpoint, so
+    hundreds of requests can be in flight from a single event loop.
+
+    Use as an async context manager, or call `close()`."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        endpoint: str,
+        application_key: str,
+        application_secret: str,
+        consumer_key: str | None,
+        limit: int = 100,
+        timeout: float = 180,
+        endpoint_url: str | None = None,
+        policy: CallPolicy | None = None,
+    ):
+        try:
+            # pylint: disable=import-outside-toplevel
+            import aiohttp  # noqa: PLC0415
+        except ImportError as e:
+            raise RuntimeError("aiohttp is needed for asyncio client (pip install ovh_exporter[async])") from e  # noqa: TRY003,EM101
+        self._aiohttp = aiohttp
+        self._endpoint = endpoint_url if endpoint_url else ovh.client.ENDPOINTS[endpoint]
+        self._application_key = application_key
+        self._application_secret = application_secret
+        self._consumer_key = consumer_key
+        self._limit = limit
+        self._policy = policy if policy is not None else DEFAULT_POLICY
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: aiohttp.ClientSession | None = None
+        self._time_delta: int | None = None
+        self._time_delta_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        """Close pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        # session must be created inside running loop
+        if self._session is None:
+            connector = self._aiohttp.TCPConnector(limit=self._limit, limit_per_host=self._limit)
+            self._session = self._aiohttp.ClientSession(connector=connector, timeout=self._timeout)
+        return self._session
+
+    async def time_delta(self) -> int:
+        """Delta between OVH API and local clocks, fetched once."""
+        async with self._time_delta_lock:
+            if self._time_delta is None:
+                server_time = await self.get("/auth/time", _need_auth=False)
+                self._time_delta = server_time - int(time.time())
+        return self._time_delta
+
+    # pylint: disable=too-many-locals
+    async def get(
+        self,
+        _target: str,
+        _need_auth: bool = True,  # noqa: FBT001,FBT002
+        _endpoint: str | None = None,
+        _projection: Projection | None = None,
+        **kwargs,
+    ):
+        """GET an API path; query parameters are given as keyword arguments.
+
+        If `_endpoint` is given, call is recorded in API statistics under this name,
+        and is rate limited and retried according to client policy. Payload is
+        decoded keeping only `_projection` fields if given (see `json_projection`)."""
+        target = self._endpoint + _with_query(_target, kwargs)
+        if _need_auth:
+            if not self._application_secret:
+                msg = f"Invalid ApplicationSecret '{self._application_secret}'"
+                raise ovh.exceptions.InvalidKey(msg)
+            if not self._consumer_key:
+                msg = f"Invalid ConsumerKey '{self._consumer_key}'"
+                raise ovh.exceptions.InvalidKey(msg)
+        # calls without endpoint name (clock, ...) are not limited nor retried
+        policy = self._policy if _endpoint else DEFAULT_POLICY
+        endpoint = _endpoint or ""
+        for attempt in itertools.count(1):
+            await asyncio.sleep(_throttle_delay(policy, endpoint))
+            # signature timestamp is computed for each attempt
+            headers = await self._headers(target, _need_auth=_need_auth)
+            start = time.monotonic()
+            try:
+                async with self._get_session().get(target, headers=headers) as response:
+                    status = response.status
+                    retry_after = response.headers.get("Retry-After")
+                    body = await response.read()
+            except self._aiohttp.ClientError as e:
+                if _endpoint:
+                    API_STATS.observe(_endpoint, "error", time.monotonic() - start, None)
+                if policy.should_retry(attempt, None):
+                    await asyncio.sleep(_retry_delay(policy, endpoint, attempt, "error"))
+                    continue
+                raise ovh.exceptions.HTTPError("Low HTTP request failed error", e) from e  # noqa: TRY003,EM101
+            if _endpoint:
+                API_STATS.observe(_endpoint, str(status), time.monotonic() - start, len(body))
+            if not policy.should_retry(attempt, status):
+                break
+            await asyncio.sleep(_retry_delay(policy, endpoint, attempt, str(status), retry_after))
+        try:
+            payload = None if status == HTTPStatus.NO_CONTENT else _decode(body, status, _projection)
+        except ValueError as e:
+            raise ovh.exceptions.InvalidResponse("Failed to decode API response", e) from e  # noqa: TRY003,EM101
+        if HTTPStatus.CONTINUE <= status < HTTPStatus.MULTIPLE_CHOICES:
+            return payload
+        raise api_error(status, payload)
+
+    async def _headers(self, target: str, *, _need_auth: bool) -> dict[str, str]:
+        """Request headers, signed if authentication is needed."""
+        headers = {"X-Ovh-Application": self._application_key}
+        if _need_auth:
+            now = str(int(time.time()) + await self.time_delta())
+            headers["X-Ovh-Consumer"] = typing.cast("str", self._consumer_key)
+            headers["X-Ovh-Timestamp"] = now
+            headers["X-Ovh-Signature"] = signature(
+                self._application_secret, typing.cast("str", self._consumer_key), "GET", target, "", now
+            )
+        return headers
+
+    async def fetch(
+        self,
+        service_id: str,
+        previous: OvhApiResponse | None = None,
+        ttl: typing.Mapping[str, float] | None = None,
+    ) -> OvhApiResponse:
+        """Fetch all endpoints of a service concurrently.
+
+        Endpoint data from `previous` response is reused if not older than `ttl`
+        (see `FetchEngine.submit`)."""
+        values: dict[str, typing.Any] = {}
+        fetched_at: dict[str, float] = {}
+        now = time.time()
+        paths = {}
+        for name, (suffix, params) in ENDPOINT_PATHS.items():
+            if previous is not None and ttl and previous.is_fresh(name, ttl, now):
+                values[ENDPOINTS[name][0]] = getattr(previous, ENDPOINTS[name][0])
+                fetched_at[name] = previous.fetched_at[name]
+            else:
+                paths[name] = (f"/cloud/project/{service_id}{suffix}", params)
+        results = await asyncio.gather(
+            *(
+                self.get(path, _endpoint=name, _projection=ENDPOINT_PROJECTIONS.get(name), **params)
+                for name, (path, params) in paths.items()
+            )
+        )
+        for (path, _), result in zip(paths.values(), results):
+            log.debug("%s: %s", path, result)
+        now = time.time()
+        for name, result in zip(paths, results):
+            values[ENDPOINTS[name][0]] = result
+            fetched_at[name] = now
+        return OvhApiResponse(**values, fetched_at=fetched_at)
+
+    async def fetch_all(self, service_ids: typing.Iterable[str]) -> dict[str, OvhApiResponse | BaseException]:
+        """Fetch services concurrently; failed services are mapped to their exception."""
+        service_ids = list(service_ids)
+        results = await asyncio.gather(*(self.fetch(i) for i in service_ids), return_exceptions=True)
+        return dict(zip(service_ids, results))
+
+
+def build_async_client(config: OvhAccount, limit: int = 100) -> AsyncOvhClient:
+    """Build an asyncio client from a Configuration."""
+    return AsyncOvhClient(
+        config.endpoint,
+        config.application_key,
+        config.application_secret,
+        config.consumer_key,
+        limit=limit,
+        endpoint_url=config.endpoint_url,
+        policy=build_policy(config),
+    )
+
+
+# endpoint name -> (OvhApiResponse attribute, fetch function); fetch functions
+# return whole payloads unless given a projection (see `ENDPOINT_PROJECTIONS`)
+ENDPOINTS = {
+    "project": ("projects", _project),
+    "instance": ("instances", _instances),
+    "volume": ("volumes", _volumes),
+    "storage": ("storages", _storages),
+    "quota": ("quotas", _quota),
+    "usage": ("usage", _usage),
+}
+
+# endpoint name -> (path suffix after /cloud/project/{service_id}, query parameters)
+ENDPOINT_PATHS: dict[str, tuple[str, dict[str, typing.Any]]] = {
+    "project": ("", {}),
+    "instance": ("/instance", {}),
+    "volume": ("/volume", {}),
+    "storage": ("/storage", {"includeType": True}),
+    "quota": ("/quota", {}),
+    "usage": ("/usage/current", {}),
+}
+
+# usage fields used by metrics (see `metric_spec.TABLES`): other fields
+# (resourcesUsage, instanceOption, ...) are dropped while decoding
+USAGE_PROJECTION: Projection = {
+    "lastUpdate": True,
+    "period": True,
+    "hourlyUsage": {"instance": True, "volume": True, "storage": True},
+    "monthlyUsage": {"instance": True},
+}
+# endpoint name -> decoded fields when collecting (default: whole payload);
+# recordings keep whole payloads
+ENDPOINT_PROJECTIONS: dict[str, Projection] = {"usage": USAGE_PROJECTION}
@@ -0,0 +1,180 @@
+"""Recording of OVH API responses, replayed by the fake OVH API."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import typing
+
+from ovh_exporter.json_projection import project
+from ovh_exporter.logger import log
+from ovh_exporter.ovh_client import ENDPOINTS
+
+if typing.TYPE_CHECKING:
+    import ovh
+
+    from ovh_exporter.json_projection import Projection
+
+# recording file format version
+RECORDING_VERSION = 1
+# usage group (by flavor, volume type, ...) and its details by resource
+_USAGE_GROUP: Projection = {
+    "reference": True,
+    "type": True,
+    "region": True,
+    "quantity": True,
+    "totalPrice": True,
+    "details": {"instanceId": True, "volumeId": True, "activation": True, "quantity": True, "totalPrice": True},
+}
+# recorded fields by endpoint (see `json_projection.project`): fields the
+# collector reads and other documented fields which do not identify customer
+# resources; other fields (project name, IAM urn, order id, gateway IP, ...) are dropped
+RECORDED_FIELDS: dict[str, Projection] = {
+    "project": {
+        "project_id": True,
+        "description": True,
+        "status": True,
+        "planCode": True,
+        "creationDate": True,
+        "expiration": True,
+        "unleash": True,
+        "manualQuota": True,
+        "access": True,
+    },
+    "instance": {
+        "id": True,
+        "name": True,
+        "planCode": True,
+        "region": True,
+        "status": True,
+        "created": True,
+        "flavorId": True,
+        "monthlyBilling": True,
+    },
+    "volume": {
+        "id": True,
+        "attachedTo": True,
+        "creationDate": True,
+        "name": True,
+        "description": True,
+        "size": True,
+        "status": True,
+        "region": True,
+        "bootable": True,
+        "planCode": True,
+        "type": True,
+    },
+    "storage": {
+        "id": True,
+        "name": True,
+        "archive": True,
+        "containerType": True,
+        "region": True,
+        "storedBytes": True,
+        "storedObjects": True,
+    },
+    # counters by region
+    "quota": {
+        "region": True,
+        "instance": True,
+        "keypair": True,
+        "volume": True,
+        "network": True,
+        "loadbalancer": True,
+        "loadBalancer": True,
+        "keymanager": True,
+    },
+    "usage": {
+        "lastUpdate": True,
+        "period": True,
+        "hourlyUsage": {
+            "instance": _USAGE_GROUP,
+            "instanceOption": _USAGE_GROUP,
+            "volume": _USAGE_GROUP,
+            "storage": {
+                "region": True,
+                "type": True,
+                "bucketName": True,
+                "totalPrice": True,
+                "stored": True,
+                "outgoingBandwidth": True,
+                "outgoingInternalBandwidth": True,
+                "incomingBandwidth": True,
+                "incomingInternalBandwidth": True,
+            },
+        },
+        "monthlyUsage": {"instance": _USAGE_GROUP, "instanceOption": _USAGE_GROUP},
+    },
+}
+# recorded keys which values identify customer resources; values are replaced by pseudonyms
+SENSITIVE_KEYS = frozenset(
+    {
+        "id",
+        "project_id",
+        "instanceId",
+        "volumeId",
+        "bucketName",
+        "name",
+        "description",
+        "attachedTo",
+    }
+)
+
+
+class Sanitizer:
+    """Keep recorded fields, and replace identifying values by keyed hashes.
+
+    A value always gets the same pseudonym within a recording, so references
+    between endpoints (instance id in usage details, ...) are kept. Pseudonyms
+    are 32 hex digits, as service ids are."""
+
+    def __init__(self, key: bytes | None = None):
+        self._key = key if key is not None else os.urandom(16)
+
+    def pseudonym(self, value: str) -> str:
+        """Pseudonym of a value."""
+        return hashlib.blake2b(value.encode(), key=self._key, digest_size=16).hexdigest()
+
+    def sanitize(self, payload, sensitive: bool = False):  # noqa: FBT001,FBT002
+        """Sanitized copy of a JSON payload."""
+        if isinstance(payload, dict):
+            return {k: self.sanitize(v, k in SENSITIVE_KEYS) for k, v in payload.items()}
+        if isinstance(payload, list):
+            return [self.sanitize(v, sensitive) for v in payload]
+        if sensitive and isinstance(payload, str):
+            return self.pseudonym(payload)
+        return payload
+
+    def sanitize_endpoint(self, endpoint: str, payload):
+        """Sanitized copy of an endpoint payload: only `RECORDED_FIELDS`, identifying values pseudonymized."""
+        return self.sanitize(project(payload, RECORDED_FIELDS[endpoint]))
+
+
+def record(client: ovh.Client, service_ids: typing.Iterable[str], sanitizer: Sanitizer | None = None):
+    """Fetch all endpoints of services; returns a sanitized recording.
+
+    Pass `Sanitizer(key)` to get stable pseudonyms between recordings."""
+    sanitizer = sanitizer if sanitizer is not None else Sanitizer()
+    services = {}
+    for service_id in service_ids:
+        log.info("Recording service %s", service_id)
+        services[sanitizer.pseudonym(service_id)] = {
+            name: sanitizer.sanitize_endpoint(name, func(client, service_id)) for name, (_, func) in ENDPOINTS.items()
+        }
+    return {"version": RECORDING_VERSION, "services": services}
+
+
+def save(recording, path: str):
+    """Write a recording file."""
+    with open(path, "w", encoding="utf-8") as fstream:
+        json.dump(recording, fstream, indent=1)
+
+
+def load(path: str):
+    """Load a recording file."""
+    with open(path, encoding="utf-8") as fstream:
+        recording = json.load(fstream)
+    if recording.get("version") != RECORDING_VERSION:
+        raise ValueError(f"Unsupported recording version {recording.get('version')}")  # noqa: TRY003,EM102
+    return recording
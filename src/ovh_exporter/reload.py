@@ -0,0 +1,196 @@
+"""Configuration reload: apply services changes to a running exporter."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import typing
+
+from ovh_exporter.config import load_file
+from ovh_exporter.discovery import build_discovery
+from ovh_exporter.logger import log
+from ovh_exporter.ovh_client import FetchEngine, build_client
+
+if typing.TYPE_CHECKING:
+    from ovh_exporter.config import Account, Config, Service
+    from ovh_exporter.discovery import ServiceDiscovery
+    from ovh_exporter.scheduler import RefreshScheduler
+
+
+def _settings(*objects) -> str:
+    """Comparable form of configuration objects."""
+    return json.dumps(objects, default=vars, sort_keys=True)
+
+
+def fetch_engine(account: Account) -> FetchEngine:
+    """Thread pool engine of an account."""
+    return FetchEngine(build_client(account.ovh), account.workers)
+
+
+# pylint: disable=too-few-public-methods
+class AccountSource:
+    """Fetch engine and discovery of an account, with the settings they are built from."""
+
+    def __init__(
+        self,
+        config: Config,
+        account: Account,
+        previous: AccountSource | None = None,
+        build_engine: typing.Callable[[Account], FetchEngine] = fetch_engine,
+    ):
+        self.account = account
+        self.engine_settings = _settings(account.ovh, account.workers)
+        self.settings = _settings(account, config.collector.sharding, config.collector.ttl)
+        self.engine: FetchEngine
+        self.discovery: ServiceDiscovery | None
+        if previous is not None and previous.engine_settings == self.engine_settings:
+            # same credentials: client (connections, rate limit) and fetch workers are kept
+            self.engine = previous.engine
+        else:
+            self.engine = build_engine(account)
+        if previous is not None and previous.settings == self.settings and previous.engine is self.engine:
+            # listed projects are kept
+            self.discovery = previous.discovery
+        else:
+            self.discovery = build_discovery(config, account, self.engine.client)
+
+    @property
+    def services(self) -> list[Service]:
+        """Configured services; with discovery, services are listed by scheduler."""
+        return self.account.services if self.discovery is None else []
+
+    @property
+    def labelnames(self) -> set[str] | None:
+        """Label names of account services, None if account has no service."""
+        if self.discovery is not None:
+            return set(self.discovery.labelnames)
+        return set(self.account.services[0].labels) if self.account.services else None
+
+
+def build_sources(
+    config: Config,
+    previous: typing.Mapping[str, AccountSource] | None = None,
+    build_engine: typing.Callable[[Account], FetchEngine] = fetch_engine,
+) -> dict[str, AccountSource]:
+    """Sources of all accounts, by account name; `previous` sources are reused when settings are unchanged."""
+    previous = previous or {}
+    return {
+        account.name: AccountSource(config, account, previous.get(account.name), build_engine)
+        for account in config.accounts
+    }
+
+
+def labelnames(sources: typing.Mapping[str, AccountSource]) -> list[str]:
+    """Label names of collected services (the ones of the first account)."""
+    for source in sources.values():
+        if source.discovery is not None:
+            return list(source.discovery.labelnames)
+        if source.account.services:
+            return list(source.account.services[0].labels)
+    return []
+
+
+def sources_accounts(
+    sources: typing.Mapping[str, AccountSource],
+) -> list[tuple[FetchEngine, list[Service], ServiceDiscovery | None]]:
+    """Scheduler accounts (see `RefreshScheduler.set_accounts`)."""
+    return [(source.engine, source.services, source.discovery) for source in sources.values()]
+
+
+class ConfigReloader:
+    """Reload configuration file when it changes or on request (SIGHUP).
+
+    Accounts are matched by name: an account with unchanged OVH settings keeps
+    its client and fetch engine. Scheduler only fetches added services, drops
+    removed ones, and keeps snapshots of unchanged ones (see
+    `RefreshScheduler.set_accounts`). Current configuration is kept when the
+    new one is invalid or changes label names; server and collector settings
+    are only applied on restart."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        path: str,
+        config: Config,
+        scheduler: RefreshScheduler,
+        sources: typing.Mapping[str, AccountSource],
+        build_engine: typing.Callable[[Account], FetchEngine] = fetch_engine,
+    ):
+        self._path = os.path.abspath(path)
+        self._build_engine = build_engine
+        self.config = config
+        self._scheduler = scheduler
+        self._sources = dict(sources)
+        self._labelnames = set(labelnames(sources))
+        self._lock = threading.Lock()
+        self._requested = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._signature = self._stat()
+
+    def _stat(self) -> tuple[int, int, int] | None:
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def changed(self) -> bool:
+        """Whether configuration file changed since last (re)load."""
+        return self._stat() != self._signature
+
+    def request(self):
+        """Reload configuration in watcher thread (safe in a signal handler)."""
+        self._requested.set()
+
+    def start(self):
+        """Watch configuration file in a daemon thread, every `collector.reload_interval` seconds."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(name="ovh-config-reload", target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        interval = self.config.collector.reload_interval or None
+        while True:
+            requested = self._requested.wait(interval)
+            self._requested.clear()
+            if requested or self.changed():
+                self.reload()
+
+    def reload(self) -> bool:
+        """Load configuration file again and apply services changes; False if current configuration is kept."""
+        with self._lock:
+            self._signature = self._stat()
+            try:
+                config = load_file(self._path)
+                sources = build_sources(config, self._sources, self._build_engine)
+            except Exception:  # noqa: BLE001 pylint: disable=broad-exception-caught
+                log.exception("Configuration %s cannot be reloaded, current configuration kept", self._path)
+                return False
+            engines = {id(source.engine) for source in self._sources.values()}
+            if any(source.labelnames not in (None, self._labelnames) for source in sources.values()):
+                log.error("Label names changes require a restart, current configuration kept")
+                for source in sources.values():
+                    if id(source.engine) not in engines:
+                        source.engine.shutdown()
+                return False
+            if _settings(config.server, self._restart_settings(config)) != _settings(
+                self.config.server, self._restart_settings(self.config)
+            ):
+                log.warning("Server and collector settings changes are applied on restart")
+            added, removed = self._scheduler.set_accounts(sources_accounts(sources))
+            kept = {id(source.engine) for source in sources.values()}
+            for source in self._sources.values():
+                if id(source.engine) not in kept:
+                    # fetches in flight complete (services still configured would count a failure otherwise)
+                    source.engine.shutdown(drain=True)
+            self._sources = sources
+            self.config = config
+            log.info("Configuration reloaded: %s services added, %s removed", len(added), len(removed))
+            return True
+
+    @staticmethod
+    def _restart_settings(config: Config) -> dict:
+        """Collector settings only applied on restart (ttl and sharding apply to services)."""
+        return {name: value for name, value in vars(config.collector).items() if name not in ("ttl", "sharding")}
@@ -0,0 +1,242 @@
+"""Prometheus remote-write client (`push` command).
+
+Write requests are protobuf messages (`prometheus.WriteRequest`), encoded
+here, compressed with snappy block format (python-snappy when installed,
+else a pure Python encoder)."""
+
+from __future__ import annotations
+
+import collections
+import math
+import struct
+import time
+import typing
+
+import requests
+
+from ovh_exporter import __version__
+from ovh_exporter.logger import log
+from ovh_exporter.resilience import RETRY_STATUSES, CallPolicy, RetryPolicy
+
+if typing.TYPE_CHECKING:
+    from prometheus_client import Metric
+
+# staleness marker: series ended (see Prometheus `value.StaleNaN`)
+STALE_NAN = struct.unpack("<d", struct.pack("<Q", 0x7FF0000000000002))[0]
+# copies farther than 64KiB are not searched
+MAX_OFFSET = 0xFFFF
+MIN_MATCH = 4
+
+
+def _varint(value: int) -> bytes:
+    """Protobuf base 128 varint (unsigned)."""
+    out = bytearray()
+    while value >> 7:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    """Length-delimited protobuf field."""
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def encode_labels(labels: typing.Iterable[tuple[str, str]]) -> bytes:
+    """`TimeSeries.labels` fields (labels sorted by name, as remote-write requires)."""
+    return b"".join(_field(1, _field(1, name.encode()) + _field(2, value.encode())) for name, value in sorted(labels))
+
+
+def encode_write_request(series: typing.Iterable[tuple[bytes, float, int]]) -> bytes:
+    """`WriteRequest` of series (encoded labels, value, timestamp in milliseconds), one sample each."""
+    return b"".join(
+        _field(1, labels + _field(2, b"\x09" + struct.pack("<d", value) + b"\x10" + _varint(timestamp)))
+        for labels, value, timestamp in series
+    )
+
+
+def _literal(data: bytes, start: int, end: int) -> bytes:
+    length = end - start - 1
+    if length < 60:  # noqa: PLR2004
+        return bytes([length << 2]) + data[start:end]
+    size = (length.bit_length() + 7) // 8
+    return bytes([(59 + size) << 2]) + length.to_bytes(size, "little") + data[start:end]
+
+
+def snappy_compress_py(data: bytes) -> bytes:
+    """Snappy block format: greedy matches of 4 bytes sequences, 2 bytes offset copies."""
+    out = bytearray(_varint(len(data)))
+    table: dict[bytes, int] = {}
+    size = len(data)
+    literal_start = 0
+    pos = 0
+    while pos + MIN_MATCH <= size:
+        key = data[pos : pos + MIN_MATCH]
+        candidate = table.get(key)
+        table[key] = pos
+        if candidate is None or pos - candidate > MAX_OFFSET:
+            pos += 1
+            continue
+        length = MIN_MATCH
+        # extend match, by chunks then by bytes (overlapping copies are allowed)
+        while (
+            pos + length + 32 <= size
+            and data[candidate + length : candidate + length + 32] == data[pos + length : pos + length + 32]
+        ):
+            length += 32
+        while pos + length < size and data[candidate + length] == data[pos + length]:
+            length += 1
+        if literal_start < pos:
+            out += _literal(data, literal_start, pos)
+        offset = (pos - candidate).to_bytes(2, "little")
+        pos += length
+        literal_start = pos
+        while length > 0:
+            chunk = min(length, 64)
+            out.append((chunk - 1) << 2 | 2)
+            out += offset
+            length -= chunk
+    if literal_start < size:
+        out += _literal(data, literal_start, size)
+    return bytes(out)
+
+
+try:
+    from snappy import compress as snappy_compress
+except ImportError:
+    snappy_compress = snappy_compress_py
+
+
+class RemoteWriter:
+    """Push samples of metric families to a remote-write endpoint.
+
+    Only series which value changed since last push are sent; unchanged ones
+    are sent again after `resend_interval` seconds, so that Prometheus does not
+    consider them stale, and series which disappeared are ended with a
+    staleness marker. Series are sent by batches of `batch_size`. Batches which
+    cannot be sent are buffered (up to `max_buffer` series, oldest dropped
+    first) and sent again on next push."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        url: str,
+        batch_size: int = 2000,
+        max_buffer: int = 100000,
+        resend_interval: float = 240,
+        timeout: float = 30,
+        headers: typing.Mapping[str, str] | None = None,
+        auth: tuple[str, str] | None = None,
+        retry: RetryPolicy | None = None,
+    ):
+        self.url = url
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.resend_interval = resend_interval
+        self.timeout = timeout
+        self._policy = CallPolicy(retry=retry if retry is not None else RetryPolicy(3, 1, 30))
+        self._session = requests.Session()
+        self._session.auth = auth
+        self._session.headers.update(
+            {
+                "Content-Encoding": "snappy",
+                "Content-Type": "application/x-protobuf",
+                "User-Agent": f"ovh_exporter/{__version__}",
+                "X-Prometheus-Remote-Write-Version": "0.1.0",
+            }
+        )
+        self._session.headers.update(headers or {})
+        # series key -> (encoded labels, last value, unix time it was queued)
+        self._series: dict[tuple, tuple[bytes, float, float]] = {}
+        # series waiting to be sent: (encoded labels, value, timestamp in ms)
+        self._buffer: collections.deque[tuple[bytes, float, int]] = collections.deque()
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        """Buffered series count."""
+        return len(self._buffer)
+
+    def changes(self, families: typing.Iterable[Metric], now: float | None = None) -> list[tuple[bytes, float, int]]:
+        """Series to send: changed values, unchanged ones to resend, and ended ones."""
+        if now is None:
+            now = time.time()
+        timestamp = int(now * 1000)
+        changed = []
+        previous = self._series
+        current: dict[tuple, tuple[bytes, float, float]] = {}
+        for family in families:
+            for sample in family.samples:
+                items = sorted(sample.labels.items())
+                key = (sample.name, *items)
+                value = float(sample.value)
+                known = previous.get(key)
+                labels = known[0] if known is not None else encode_labels([("__name__", sample.name), *items])
+                if (
+                    known is None
+                    or (value != known[1] and not (math.isnan(value) and math.isnan(known[1])))
+                    or now - known[2] >= self.resend_interval
+                ):
+                    changed.append((labels, value, timestamp))
+                    current[key] = (labels, value, now)
+                else:
+                    current[key] = known
+        for key, (labels, _value, _queued_at) in previous.items():
+            if key not in current:
+                changed.append((labels, STALE_NAN, timestamp))
+        self._series = current
+        return changed
+
+    def push(self, families: typing.Iterable[Metric], now: float | None = None) -> int:
+        """Queue changed series, then send buffered series; returns accepted series count."""
+        self._buffer.extend(self.changes(families, now))
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            for _ in range(overflow):
+                self._buffer.popleft()
+            self.dropped += overflow
+            log.warning("Remote-write buffer full, %s oldest series dropped", overflow)
+        dropped = self.dropped
+        sent = 0
+        while self._buffer:
+            batch = [self._buffer[index] for index in range(min(self.batch_size, len(self._buffer)))]
+            if not self._send(batch):
+                log.warning("%s series buffered until next push", len(self._buffer))
+                break
+            for _ in batch:
+                self._buffer.popleft()
+            sent += len(batch)
+        # rejected series were dropped
+        return sent - (self.dropped - dropped)
+
+    def _send(self, batch: list[tuple[bytes, float, int]]) -> bool:
+        """Send a batch; False if it must be sent again later (rejected batches are dropped)."""
+        body = snappy_compress(encode_write_request(batch))
+        attempt = 0
+        while True:
+            attempt += 1
+            status = None
+            retry_after = None
+            try:
+                response = self._session.post(self.url, data=body, timeout=self.timeout)
+            except requests.RequestException as e:
+                log.warning("Remote-write request failed: %s", e)
+            else:
+                status = response.status_code
+                retry_after = response.headers.get("Retry-After")
+                if response.ok:
+                    log.debug("%s series pushed (%s bytes)", len(batch), len(body))
+                    return True
+                if status not in RETRY_STATUSES:
+                    # invalid samples (out of order, ...) are not sent again
+                    log.error("Remote-write rejected %s series (%s): %s", len(batch), status, response.text[:200])
+                    self.dropped += len(batch)
+                    return True
+            if not self._policy.should_retry(attempt, status):
+                return False
+            time.sleep(self._policy.retry.delay(attempt, retry_after))
+
+    def close(self):
+        """Close HTTP connections."""
+        self._session.close()
@@ -0,0 +1,166 @@
+"""OVH API call rate limiting, retries and circuit breaking."""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from http import HTTPStatus
+
+# statuses worth a retry: rate limited, or transient server errors
+RETRY_STATUSES = frozenset(
+    {
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.INTERNAL_SERVER_ERROR,
+        HTTPStatus.BAD_GATEWAY,
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        HTTPStatus.GATEWAY_TIMEOUT,
+    }
+)
+
+
+class TokenBucket:
+    """Token bucket (thread-safe): `rate` tokens per second, up to `burst` tokens."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token; returns delay in seconds to wait before using it.
+
+        Tokens are reserved in advance (balance may be negative), so callers
+        only need to sleep the returned delay, with `time.sleep` or `asyncio.sleep`."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def try_take(self) -> bool:
+        """Take a token if one is available, without reservation."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RateLimiter:
+    """One token bucket by endpoint name; `rate` <= 0 disables limiting."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, endpoint: str) -> float:
+        """Take a token of endpoint bucket; returns delay in seconds to wait."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            if bucket is None:
+                bucket = self._buckets[endpoint] = TokenBucket(self.rate, self.burst)
+        return bucket.reserve()
+
+
+# pylint: disable=too-few-public-methods
+class RetryPolicy:
+    """Retry with exponential backoff and full jitter.
+
+    Delay before attempt `n + 1` is random in [0, min(max_backoff, backoff * 2^(n - 1))],
+    or `Retry-After` value if the server provided it."""
+
+    def __init__(self, max_attempts: int = 1, backoff: float = 0.5, max_backoff: float = 30):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt: int, retry_after: str | None = None) -> float:
+        """Delay in seconds after failed attempt `attempt` (starting at 1)."""
+        if retry_after is not None and retry_after.isdigit():
+            return min(self.max_backoff, float(retry_after))
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))  # noqa: S311
+
+
+class CallPolicy:
+    """Rate limiting and retry setting of an OVH account."""
+
+    def __init__(self, limiter: RateLimiter | None = None, retry: RetryPolicy | None = None):
+        self.limiter = limiter if limiter is not None else RateLimiter(0, 1)
+        self.retry = retry if retry is not None else RetryPolicy()
+
+    def should_retry(self, attempt: int, status: int | None) -> bool:
+        """True if a call can be retried after attempt `attempt`; `status` is None for network errors."""
+        return attempt < self.retry.max_attempts and (status is None or status in RETRY_STATUSES)
+
+
+# used for clients built without configuration: no rate limiting, no retry
+DEFAULT_POLICY = CallPolicy()
+
+
+class CircuitBreaker:
+    """Circuit breaker of a service (thread-safe).
+
+    Opens after `threshold` consecutive failures (0 disables the breaker). Once
+    `reset_timeout` seconds elapsed, a single trial call is allowed (half-open):
+    success closes the circuit, failure opens it again."""
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.last_error: str | None = None
+        self._opened_at: float | None = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are rejected (or a trial call is running)."""
+        return self._opened_at is not None
+
+    def allow(self, now: float | None = None) -> bool:
+        """True if a call can be made."""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or now < self._opened_at + self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        """Close circuit."""
+        with self._lock:
+            self.failures = 0
+            self.last_error = None
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self, error: BaseException | None = None, now: float | None = None):
+        """Count a failure; open circuit if threshold is reached."""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            self.failures += 1
+            self.last_error = repr(error) if error is not None else None
+            self._trial = False
+            if self.threshold > 0 and self.failures >= self.threshold:
+                self._opened_at = now
+
+    def to_dict(self):
+        """Serializable state."""
+        with self._lock:
+            return {"failures": self.failures, "open": self._opened_at is not None, "last_error": self.last_error}
@@ -0,0 +1,333 @@
+"""Background refresh of OVH API data."""
+
+from __future__ import annotations
+
+import functools
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import typing
+
+from ovh_exporter.instrumentation import API_STATS
+from ovh_exporter.logger import log
+from ovh_exporter.resilience import CircuitBreaker
+from ovh_exporter.snapshot import Snapshot, SnapshotStore
+
+if typing.TYPE_CHECKING:
+    import concurrent.futures
+
+    from ovh_exporter.config import Service
+    from ovh_exporter.discovery import ServiceDiscovery
+    from ovh_exporter.ovh_client import FetchEngine, OvhApiResponse
+    from ovh_exporter.reload import ConfigReloader
+
+
+# pylint: disable=too-few-public-methods
+class _Account:
+    """Services of an OVH account and the engine fetching them."""
+
+    def __init__(self, engine: FetchEngine, services: list[Service], discovery: ServiceDiscovery | None):
+        self.engine = engine
+        self.services = services
+        self.discovery = discovery
+
+
+class RefreshScheduler:
+    """Refresh service snapshots on a fixed interval, outside of prometheus scrapes.
+
+    Collector reads snapshots from `store`; scrapes never wait for OVH API.
+    All services are fetched concurrently by `engine`. Services of other OVH
+    accounts (see `add_account`) are fetched in parallel by their own engine.
+
+    Services are isolated: a failing service keeps its last snapshot, and is
+    not refreshed for `reset_timeout` seconds once it failed `failure_threshold`
+    consecutive times (circuit breaker). Services state is published with
+    statistics (see `SnapshotStore.put_stats`).
+
+    Services list is published to the store (see `SnapshotStore.put_services`).
+    With a `discovery`, it is updated before each refresh. Accounts are
+    replaced on configuration reload (see `set_accounts`).
+
+    With a `snapshot_file`, snapshots are saved after each refresh and when
+    scheduler is stopped (see `SnapshotStore.save`)."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        engine: FetchEngine,
+        services: list[Service],
+        interval: float,
+        store: SnapshotStore | None = None,
+        failure_threshold: int = 3,
+        reset_timeout: float = 300,
+        discovery: ServiceDiscovery | None = None,
+        snapshot_file: str | None = None,
+    ):
+        self._interval = interval
+        self._snapshot_file = snapshot_file
+        self.store = store if store is not None else SnapshotStore()
+        self._breaker_options = (failure_threshold, reset_timeout)
+        self._accounts: list[_Account] = []
+        self._services: list[Service] = []
+        # service id -> engine of its account
+        self._engines: dict[str, FetchEngine] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        # services added by configuration reload, refreshed without waiting for next refresh
+        self._added: list[Service] = []
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.add_account(engine, services, discovery)
+
+    def add_account(self, engine: FetchEngine, services: list[Service], discovery: ServiceDiscovery | None = None):
+        """Also refresh services of another OVH account, fetched by `engine`."""
+        with self._lock:
+            self._accounts.append(_Account(engine, services, discovery))
+            self._update_services()
+
+    def set_accounts(
+        self, accounts: list[tuple[FetchEngine, list[Service], ServiceDiscovery | None]]
+    ) -> tuple[list[Service], list[str]]:
+        """Replace accounts (engine, services, discovery); returns added services and removed service ids.
+
+        Kept services keep their snapshot and circuit breaker. Added services are
+        refreshed right away, snapshots of removed ones are dropped. Engines of
+        replaced accounts are not shut down."""
+        with self._lock:
+            previous = {service.id for service in self._services}
+            self._accounts = [_Account(*account) for account in accounts]
+            self._update_services(discover=True)
+            added = [service for service in self._services if service.id not in previous]
+            removed = sorted(previous.difference(service.id for service in self._services))
+            self._added.extend(added)
+        for service_id in removed:
+            self.store.remove(service_id)
+        if added:
+            self._wake()
+        return added, removed
+
+    def _wake(self):
+        """Wake refresh loop up (services added)."""
+        self._wakeup.set()
+
+    def start(self):
+        """Start refresh loop in a daemon thread. First refresh is immediate."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(name="ovh-refresh", target=self._run, daemon=True)
+        self._thread.start()
+        log.info("Refresh scheduler started (interval: %ss)", self._interval)
+
+    def stop(self, timeout: float | None = None):
+        """Stop refresh loop."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        for account in self._accounts:
+            account.engine.shutdown()
+        self.save()
+
+    def save(self):
+        """Save snapshots to `snapshot_file`, if any."""
+        if self._snapshot_file is None:
+            return
+        try:
+            self.store.save(self._snapshot_file)
+        except OSError:
+            log.exception("Snapshots cannot be saved to %s", self._snapshot_file)
+
+    def _update_services(self, discover: bool = False):  # noqa: FBT001,FBT002
+        """Merge services of all accounts (listed again if `discover`); breakers of kept services are kept."""
+        with self._lock:
+            services = []
+            engines: dict[str, FetchEngine] = {}
+            for account in self._accounts:
+                if discover and account.discovery is not None:
+                    account.services = account.discovery.services()
+                for service in account.services:
+                    if service.id in engines:
+                        log.warning(
+                            "Service %s belongs to several accounts, only refreshed with the first one", service.id
+                        )
+                        continue
+                    engines[service.id] = account.engine
+                    services.append(service)
+            self._breakers = {
+                service.id: self._breakers.get(service.id, None) or CircuitBreaker(*self._breaker_options)
+                for service in services
+            }
+            self._engines = engines
+            self._services = services
+            published = [{"id": service.id, "labels": dict(service.labels)} for service in services]
+            # compared with store content, which may have been loaded from a saved file
+            if published != self.store.get_services():
+                self.store.put_services(published)
+
+    def refresh(self, services: list[Service] | None = None):
+        """Refresh all services (or only `services`) snapshots, services being fetched concurrently."""
+        if services is None:
+            # also publishes services again if store services were loaded from a saved file
+            self._update_services(discover=True)
+            services = self._services
+        start = time.monotonic()
+        stored = []
+        with self._lock:
+            breakers, engines = self._breakers, self._engines
+        for service in services:
+            breaker = breakers.get(service.id, None)
+            if breaker is None:
+                # removed by a configuration reload
+                continue
+            if not breaker.allow():
+                log.debug("Circuit open for service %s, refresh skipped", service.id)
+                continue
+            future = self._submit(service, engines[service.id])
+            # store each snapshot as soon as service is fetched
+            event = threading.Event()
+            future.add_done_callback(functools.partial(self._on_fetched, service.id, start, event))
+            stored.append(event)
+        for event in stored:
+            event.wait()
+
+    def refresh_service(
+        self, service: Service, timeout: float | None = None, max_age: float | None = None
+    ) -> Snapshot | None:
+        """Fetch service data and store a new snapshot (None if fetch failed or circuit is open).
+
+        Latest snapshot is returned as is if younger than `max_age` seconds. If
+        fetch lasts more than `timeout` seconds, None is returned and snapshot
+        is stored once fetched."""
+        if max_age is not None:
+            snapshot = self.store.get(service.id)
+            if snapshot is not None and snapshot.age() < max_age:
+                return snapshot
+        with self._lock:
+            breaker, engine = self._breakers.get(service.id, None), self._engines.get(service.id, None)
+        if breaker is None or engine is None or not breaker.allow():
+            return None
+        start = time.monotonic()
+        future = self._submit(service, engine)
+        fetched = threading.Event()
+        future.add_done_callback(functools.partial(self._on_fetched, service.id, start, fetched))
+        if not fetched.wait(timeout) or future.exception() is not None:
+            return None
+        return self.store.get(service.id)
+
+    def _submit(self, service: Service, engine: FetchEngine) -> concurrent.futures.Future[OvhApiResponse]:
+        # only endpoints with expired data are fetched again
+        previous = self.store.get(service.id)
+        return engine.submit(service.id, previous.response if previous else None, service.ttl)
+
+    def _on_fetched(
+        self, service_id: str, start: float, event: threading.Event, future: concurrent.futures.Future[OvhApiResponse]
+    ):
+        try:
+            error = future.exception()
+            self._store_snapshot(service_id, start, None if error is not None else future.result(), error)
+        finally:
+            event.set()
+
+    def _store_snapshot(
+        self, service_id: str, start: float, response: OvhApiResponse | None, error: BaseException | None = None
+    ) -> Snapshot | None:
+        """Store fetch result (`response`, or `error`). Previous snapshot is kept if fetch failed."""
+        breaker = self._breakers.get(service_id, None)
+        if breaker is None:
+            log.debug("Service %s removed while fetched, result dropped", service_id)
+            return None
+        if error is not None or response is None:
+            breaker.record_failure(error)
+            log.error(
+                "Refresh failed for service %s (%s consecutive failures%s)",
+                service_id,
+                breaker.failures,
+                ", circuit open" if breaker.is_open else "",
+                exc_info=error,
+            )
+            self._publish_stats()
+            return None
+        breaker.record_success()
+        snapshot = Snapshot(service_id, response, time.time(), time.monotonic() - start)
+        # statistics first, so that they are up to date when the new snapshot is collected
+        self._publish_stats()
+        self.store.put(snapshot)
+        log.debug("Service %s refreshed in %.3fs", service_id, snapshot.duration)
+        return snapshot
+
+    def _publish_stats(self):
+        stats = API_STATS.to_dict()
+        stats["services"] = {service_id: breaker.to_dict() for service_id, breaker in self._breakers.items()}
+        stats["published_at"] = time.time()
+        self.store.put_stats(stats)
+
+    def run(self):
+        """Run refresh loop in current thread, until `stop` is called."""
+        self._stop.clear()
+        self._run()
+
+    def _run(self):
+        next_refresh = time.monotonic()
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            with self._lock:
+                added, self._added = self._added, []
+            if time.monotonic() >= next_refresh:
+                self.refresh()
+                self.save()
+                next_refresh = time.monotonic() + self._interval
+            elif added:
+                self.refresh(added)
+                self.save()
+            self._wakeup.wait(max(0.0, next_refresh - time.monotonic()))
+
+
+class SchedulerProcess:
+    """Run a scheduler in a dedicated child process.
+
+    Used as a pre-fork leader: only this process calls OVH API, and it shares
+    snapshots with server workers through a `FileSnapshotStore`. With a
+    `reloader`, configuration file is watched by this process, and reloaded
+    when it receives SIGHUP (see `signal`)."""
+
+    def __init__(self, scheduler: RefreshScheduler, reloader: ConfigReloader | None = None):
+        self._scheduler = scheduler
+        self._reloader = reloader
+        self._process: multiprocessing.process.BaseProcess | None = None
+
+    def start(self):
+        """Fork collector process."""
+        # fork: scheduler (client, services, store) is inherited as is
+        context = multiprocessing.get_context("fork")
+        self._process = context.Process(name="ovh-collector", target=self._run, daemon=True)
+        self._process.start()
+        log.info("Collector process started (pid: %s)", self._process.pid)
+
+    def _run(self):
+        # signal handlers of the parent (gunicorn master) are inherited by fork
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGQUIT):
+            signal.signal(signum, signal.SIG_DFL)
+        if self._reloader is not None:
+            reloader = self._reloader
+            signal.signal(signal.SIGHUP, lambda _signum, _frame: reloader.request())
+            reloader.start()
+        else:
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        self._scheduler.run()
+
+    def signal(self, signum: int):
+        """Send a signal to collector process (SIGHUP: reload configuration)."""
+        if self._process is not None and self._process.pid is not None and self._process.is_alive():
+            os.kill(self._process.pid, signum)
+
+    def stop(self, timeout: float = 10):
+        """Terminate collector process."""
+        if self._process is not None and self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout)
+        self._process = None
@@ -0,0 +1,304 @@
+"""Fetched data snapshots."""
+
+from __future__ import annotations
+
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import os.path
+import tempfile
+import threading
+import time
+
+from ovh_exporter.logger import log
+from ovh_exporter.ovh_client import OvhApiResponse
+
+# snapshot file format version
+FORMAT_VERSION = 1
+# saved snapshots file format version (see `SnapshotStore.save`)
+SAVE_VERSION = 1
+# statistics and services file names (snapshot files are named by service id)
+STATS_FILE = "_stats"
+SERVICES_FILE = "_services"
+
+
+def payload_digest(payload) -> str:
+    """Content hash of an endpoint payload."""
+    content = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+# pylint: disable=too-few-public-methods
+class Snapshot:
+    """Latest OVH API data fetched for a service."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        service_id: str,
+        response: OvhApiResponse,
+        timestamp: float,
+        duration: float,
+        digests: dict[str, str] | None = None,
+    ):
+        self.service_id = service_id
+        self.response = response
+        # wall-clock time when refresh ended
+        self.timestamp = timestamp
+        # refresh duration in seconds
+        self.duration = duration
+        # response attribute -> payload content hash, computed on demand
+        self.digests: dict[str, str] = digests if digests is not None else {}
+
+    def digest(self, attribute: str) -> str:
+        """Content hash of a response payload (see `payload_digest`)."""
+        digest = self.digests.get(attribute)
+        if digest is None:
+            digest = self.digests[attribute] = payload_digest(getattr(self.response, attribute))
+        return digest
+
+    def age(self, now: float | None = None) -> float:
+        """Snapshot age in seconds."""
+        if now is None:
+            now = time.time()
+        return max(0.0, now - self.timestamp)
+
+    def to_dict(self):
+        """Serializable representation; includes payload digests, so that readers do not compute them."""
+        response = vars(self.response)
+        return {
+            "version": FORMAT_VERSION,
+            "service_id": self.service_id,
+            "timestamp": self.timestamp,
+            "duration": self.duration,
+            "response": response,
+            "digests": {attribute: self.digest(attribute) for attribute in response if attribute != "fetched_at"},
+        }
+
+    @staticmethod
+    def from_dict(snapshot_dict) -> Snapshot:
+        """Load from `to_dict` representation."""
+        if snapshot_dict.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {snapshot_dict.get('version')}")  # noqa: TRY003,EM102
+        return Snapshot(
+            snapshot_dict["service_id"],
+            OvhApiResponse(**snapshot_dict["response"]),
+            snapshot_dict["timestamp"],
+            snapshot_dict["duration"],
+            snapshot_dict.get("digests", None),
+        )
+
+
+class SnapshotStore:
+    """In-memory, thread-safe snapshot store (one snapshot by service)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshots: dict[str, Snapshot] = {}
+        self._stats: dict | None = None
+        self._services: list[dict] | None = None
+
+    def get(self, service_id: str) -> Snapshot | None:
+        """Latest snapshot for service, None if service is not fetched yet."""
+        with self._lock:
+            return self._snapshots.get(service_id, None)
+
+    def put(self, snapshot: Snapshot):
+        """Replace service snapshot."""
+        with self._lock:
+            self._snapshots[snapshot.service_id] = snapshot
+
+    def remove(self, service_id: str):
+        """Drop service snapshot (service removed from configuration)."""
+        with self._lock:
+            self._snapshots.pop(service_id, None)
+
+    def get_stats(self) -> dict | None:
+        """Latest fetch statistics (see `ApiStats.to_dict`)."""
+        with self._lock:
+            return self._stats
+
+    def put_stats(self, stats: dict):
+        """Replace fetch statistics."""
+        with self._lock:
+            self._stats = stats
+
+    def snapshots(self) -> list[Snapshot]:
+        """All stored snapshots."""
+        with self._lock:
+            return list(self._snapshots.values())
+
+    def get_services(self) -> list[dict] | None:
+        """Services refreshed by scheduler (id and labels), None if not published."""
+        with self._lock:
+            return self._services
+
+    def put_services(self, services: list[dict]):
+        """Replace services list."""
+        with self._lock:
+            self._services = services
+
+    def save(self, path: str):
+        """Write all snapshots and services list to a gzip-compressed JSON file (atomically replaced)."""
+        snapshots = [snapshot.to_dict() for snapshot in self.snapshots()]
+        services = self.get_services()
+        content = {"version": SAVE_VERSION, "saved_at": time.time(), "services": services, "snapshots": snapshots}
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshots-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fstream, gzip.GzipFile(fileobj=fstream, mode="wb", compresslevel=6) as gz:
+                gz.write(json.dumps(content, separators=(",", ":")).encode())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        log.info("%s snapshots saved to %s", len(snapshots), path)
+
+    def load(self, path: str) -> int:
+        """Load snapshots written by `save`; returns loaded snapshots count.
+
+        A missing, unreadable or incompatible file is ignored (nothing is loaded)."""
+        try:
+            with gzip.open(path, "rb") as fstream:
+                content = json.loads(fstream.read())
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError):
+            log.exception("Saved snapshots %s cannot be read", path)
+            return 0
+        if not isinstance(content, dict) or content.get("version") != SAVE_VERSION:
+            log.error("Saved snapshots %s have an unsupported format, ignored", path)
+            return 0
+        try:
+            snapshots = [Snapshot.from_dict(snapshot_dict) for snapshot_dict in content["snapshots"]]
+        except (ValueError, KeyError, TypeError):
+            log.exception("Saved snapshots %s cannot be loaded", path)
+            return 0
+        for snapshot in snapshots:
+            self.put(snapshot)
+        if content.get("services") is not None:
+            self.put_services(content["services"])
+        log.info("%s snapshots loaded from %s", len(snapshots), path)
+        return len(snapshots)
+
+
+class FileSnapshotStore(SnapshotStore):
+    """Snapshot store shared between processes through a directory.
+
+    Each snapshot is a JSON file, atomically replaced by the writer process. Readers
+    only reload a file when its stat signature changed."""
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # file name -> stat signature of loaded file
+        self._signatures: dict[str, tuple[int, int, int]] = {}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    def _changed(self, name: str) -> tuple[int, int, int] | None:
+        """New stat signature if file changed since last load, else None."""
+        try:
+            stat = os.stat(self._path(name))
+        except FileNotFoundError:
+            return None
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            return None if self._signatures.get(name) == signature else signature
+
+    def _load(self, name: str):
+        with open(self._path(name), encoding="utf-8") as fstream:
+            return json.load(fstream)
+
+    def _write(self, name: str, content):
+        """Write a file (write to a temporary file, then rename)."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".snapshot-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fstream:
+                json.dump(content, fstream, separators=(",", ":"))
+            os.replace(tmp_path, self._path(name))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def snapshots(self) -> list[Snapshot]:
+        """All snapshots written by any process."""
+        names = [
+            name[: -len(".json")]
+            for name in os.listdir(self.directory)
+            if name.endswith(".json") and not name.startswith("_")
+        ]
+        snapshots = [self.get(name) for name in sorted(names)]
+        return [snapshot for snapshot in snapshots if snapshot is not None]
+
+    def get(self, service_id: str) -> Snapshot | None:
+        """Latest snapshot written by any process."""
+        signature = self._changed(service_id)
+        if signature is None:
+            return super().get(service_id)
+        try:
+            snapshot = Snapshot.from_dict(self._load(service_id))
+        except (OSError, ValueError):
+            log.exception("Snapshot file for service %s cannot be loaded", service_id)
+            return super().get(service_id)
+        with self._lock:
+            self._snapshots[service_id] = snapshot
+            self._signatures[service_id] = signature
+        return snapshot
+
+    def put(self, snapshot: Snapshot):
+        """Write snapshot file."""
+        self._write(snapshot.service_id, snapshot.to_dict())
+        super().put(snapshot)
+
+    def remove(self, service_id: str):
+        """Remove snapshot file."""
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self._path(service_id))
+        with self._lock:
+            self._signatures.pop(service_id, None)
+        super().remove(service_id)
+
+    def get_stats(self) -> dict | None:
+        """Latest statistics written by any process."""
+        signature = self._changed(STATS_FILE)
+        if signature is None:
+            return super().get_stats()
+        try:
+            stats: dict = self._load(STATS_FILE)
+        except (OSError, ValueError):
+            log.exception("Statistics file cannot be loaded")
+            return super().get_stats()
+        with self._lock:
+            self._stats = stats
+            self._signatures[STATS_FILE] = signature
+        return stats
+
+    def put_stats(self, stats: dict):
+        """Write statistics file."""
+        self._write(STATS_FILE, stats)
+        super().put_stats(stats)
+
+    def get_services(self) -> list[dict] | None:
+        """Latest services list written by any process."""
+        signature = self._changed(SERVICES_FILE)
+        if signature is None:
+            return super().get_services()
+        try:
+            services: list[dict] = self._load(SERVICES_FILE)
+        except (OSError, ValueError):
+            log.exception("Services file cannot be loaded")
+            return super().get_services()
+        with self._lock:
+            self._services = services
+            self._signatures[SERVICES_FILE] = signature
+        return services
+
+    def put_services(self, services: list[dict]):
+        """Write services file."""
+        self._write(SERVICES_FILE, services)
+        super().put_services(services)
@@ -0,0 +1,194 @@
+"""Synthetic OVH API payloads, shaped as real API responses (fake API, benchmarks)."""
+
+from __future__ import annotations
+
+import random
+import typing
+
+REGIONS = ("GRA11", "SBG5", "BHS5", "DE1", "UK1", "WAW1")
+STORAGE_REGIONS = ("GRA", "SBG", "BHS", "DE", "UK", "WAW")
+FLAVORS = ("d2-2", "d2-4", "b2-7", "b2-15", "c2-30", "r2-60")
+VOLUME_TYPES = ("classic", "high-speed", "high-speed-gen2")
+CONTAINER_TYPES = ("private", "public", "static")
+LAST_UPDATE = "2024-10-03T10:00:00Z"
+PERIOD = {"from": "2024-10-01T00:00:00Z", "to": "2024-10-31T23:59:59Z"}
+
+
+def service_id(index: int) -> str:
+    """Deterministic service id (32 hex digits) of synthetic service `index`."""
+    return f"{index:032x}"
+
+
+def _quantity(unit: str, value: float):
+    return {"unit": unit, "value": value}
+
+
+def _bandwidth(rng: random.Random):
+    value = round(rng.uniform(0, 500), 2)
+    return {"quantity": _quantity("GiB", value), "totalPrice": round(value * 0.01, 2)}
+
+
+# pylint: disable=too-many-locals
+def synthetic_payloads(
+    project_id: str, instances: int = 10, volumes: int = 10, storages: int = 10, seed: int | None = None
+) -> dict[str, typing.Any]:
+    """Payloads of a synthetic service, by endpoint name (see `ovh_client.ENDPOINTS`).
+
+    Instances are billed hourly, except one in ten billed monthly; each volume
+    and bucket has matching usage details. Same arguments give same payloads."""
+    rng = random.Random(f"{project_id}-{seed}")  # noqa: S311
+    instance_list = []
+    hourly: dict[tuple[str, str], list] = {}
+    monthly: dict[tuple[str, str], list] = {}
+    for i in range(instances):
+        flavor = rng.choice(FLAVORS)
+        region = rng.choice(REGIONS)
+        billing = "monthly" if i % 10 == 9 else "consumption"  # noqa: PLR2004
+        instance_id = f"{project_id[:8]}-i-{i:06d}"
+        instance_list.append(
+            {
+                "id": instance_id,
+                "name": f"instance-{i}",
+                "planCode": f"{flavor}.{billing}",
+                "region": region,
+                "status": "ACTIVE",
+            }
+        )
+        if billing == "monthly":
+            monthly.setdefault((flavor, region), []).append(
+                {"instanceId": instance_id, "activation": PERIOD["from"], "totalPrice": round(rng.uniform(5, 200), 2)}
+            )
+        else:
+            hours = rng.randint(1, 72)
+            hourly.setdefault((flavor, region), []).append(
+                {"instanceId": instance_id, "quantity": _quantity("Hour", hours), "totalPrice": round(hours * 0.03, 2)}
+            )
+    volume_list = []
+    volume_usage: dict[tuple[str, str], list] = {}
+    for i in range(volumes):
+        volume_type = rng.choice(VOLUME_TYPES)
+        region = rng.choice(REGIONS)
+        size = rng.choice((10, 20, 50, 100, 500))
+        volume_id = f"{project_id[:8]}-v-{i:06d}"
+        volume_list.append(
+            {
+                "id": volume_id,
+                "name": f"volume-{i}",
+                "region": region,
+                "type": volume_type,
+                "size": size,
+                "status": "in-use",
+                "planCode": f"volume.{volume_type}.consumption",
+            }
+        )
+        gib_hours = size * rng.randint(1, 72)
+        volume_usage.setdefault((volume_type, region), []).append(
+            {"volumeId": volume_id, "quantity": _quantity("GiBh", gib_hours), "totalPrice": round(gib_hours * 5e-5, 4)}
+        )
+    storage_list = []
+    storage_usage = []
+    for i in range(storages):
+        region = rng.choice(STORAGE_REGIONS)
+        name = f"bucket-{i}"
+        stored_bytes = rng.randint(0, 10**12)
+        storage_list.append(
+            {
+                "id": f"{project_id[:8]}-s-{i:06d}",
+                "name": name,
+                "region": region,
+                "containerType": rng.choice(CONTAINER_TYPES),
+                "storedBytes": stored_bytes,
+                "storedObjects": rng.randint(0, 10**6),
+                "archive": False,
+            }
+        )
+        stored_gib_hours = round(stored_bytes / 2**30 * 24, 2)
+        stored_price = round(stored_gib_hours * 1e-5, 4)
+        storage_usage.append(
+            {
+                "type": "storage-standard",
+                "region": region,
+                "bucketName": name,
+                "totalPrice": stored_price + 0.01,
+                "stored": {"quantity": _quantity("GiBh", stored_gib_hours), "totalPrice": stored_price},
+                "incomingBandwidth": _bandwidth(rng),
+                "outgoingBandwidth": _bandwidth(rng),
+                "incomingInternalBandwidth": _bandwidth(rng),
+                "outgoingInternalBandwidth": _bandwidth(rng),
+            }
+        )
+    return {
+        "project": {"project_id": project_id, "description": f"project {project_id[:8]}", "status": "ok"},
+        "instance": instance_list,
+        "volume": volume_list,
+        "storage": storage_list,
+        "quota": [_quota(rng, region) for region in REGIONS],
+        "usage": {
+            "lastUpdate": LAST_UPDATE,
+            "period": dict(PERIOD),
+            "hourlyUsage": {
+                "instance": [_usage_group("reference", key, details) for key, details in hourly.items()],
+                "volume": [_usage_group("type", key, details) for key, details in volume_usage.items()],
+                "storage": storage_usage,
+                "instanceOption": [],
+            },
+            "monthlyUsage": {
+                "instance": [
+                    {"reference": flavor, "region": region, "totalPrice": 0, "details": details}
+                    for (flavor, region), details in monthly.items()
+                ],
+                "instanceOption": [],
+            },
+            "resourcesUsage": [],
+        },
+    }
+
+
+def _usage_group(kind: str, key: tuple[str, str], details: list):
+    total = sum(detail["totalPrice"] for detail in details)
+    quantity = sum(detail["quantity"]["value"] for detail in details)
+    unit = details[0]["quantity"]["unit"]
+    return {
+        kind: key[0],
+        "region": key[1],
+        "quantity": _quantity(unit, quantity),
+        "totalPrice": round(total, 4),
+        "details": details,
+    }
+
+
+def _quota(rng: random.Random, region: str):
+    return {
+        "region": region,
+        "instance": {
+            "usedInstances": rng.randint(0, 20),
+            "maxInstances": 20,
+            "usedCores": rng.randint(0, 40),
+            "maxCores": 40,
+            "usedRAM": rng.randint(0, 81920),
+            "maxRam": 81920,
+        },
+        "keypair": {"maxCount": 100},
+        "volume": {
+            "usedGigabytes": rng.randint(0, 10000),
+            "maxGigabytes": 10000,
+            "volumeCount": rng.randint(0, 100),
+            "maxVolumeCount": 100,
+            "usedBackupGigabytes": rng.randint(0, 10000),
+            "maxBackupGigabytes": 10000,
+            "volumeBackupCount": rng.randint(0, 100),
+            "maxVolumeBackupCount": 100,
+        },
+        "network": {
+            "usedNetworks": rng.randint(0, 10),
+            "maxNetworks": 10,
+            "usedSubnets": rng.randint(0, 10),
+            "maxSubnets": 10,
+            "usedFloatingIPs": rng.randint(0, 10),
+            "maxFloatingIPs": 10,
+            "usedGateways": rng.randint(0, 10),
+            "maxGateways": 10,
+        },
+        "loadBalancer": {"usedLoadBalancers": rng.randint(0, 5), "maxLoadBalancers": 5},
+        "keymanager": {"usedSecrets": rng.randint(0, 50), "maxSecrets": 50},
+    }
@@ -13,12 +13,14 @@ class StandaloneApplication(gunicorn.app.base.BaseApplication):
     # pylint: disable=abstract-method
     """Gunicorn wrapper."""
 
-    def __init__(self, app, bind_addr="127.0.0.1", bind_port=9100, cert_file=None, key_file=None):
+    # pylint: disable=too-many-arguments
+    def __init__(self, app, bind_addr="127.0.0.1", bind_port=9100, cert_file=None, key_file=None, hooks=None):
         self.cert_file = cert_file
         self.key_file = key_file
         self.bind_addr = bind_addr
         self.bind_port = bind_port
         self.application = app
+        self.hooks = hooks or {}
         super().__init__()
 
     def load_config(self):
@@ -30,6 +32,8 @@ class StandaloneApplication(gunicorn.app.base.BaseApplication):
         config["workers"] = 3
         config["worker_class"] = "gthread"
         config["timeout"] = 180
+        # gunicorn server hooks (when_ready, post_worker_init, on_exit, ...)
+        config.update(self.hooks)
         for key, value in config.items():
             self.cfg.set(key.lower(), value)
 
@@ -80,6 +84,9 @@ class BasicAuthMiddleware:
             return False
 
 
-def run_server(app, bind_addr="127.0.0.1", bind_port=9100, cert_file=None, key_file=None):
-    """Start a WSGI server"""
-    StandaloneApplication(app, bind_addr, bind_port, cert_file, key_file).run()
+# pylint: disable=too-many-arguments
+def run_server(app, bind_addr="127.0.0.1", bind_port=9100, cert_file=None, key_file=None, hooks=None):
+    """Start a WSGI server
+
+    `hooks` maps gunicorn server hook names to callables."""
+    StandaloneApplication(app, bind_addr, bind_port, cert_file, key_file, hooks).run()
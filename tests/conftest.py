@@ -0,0 +1,122 @@
+"""Shared test fixtures."""
+
+import copy
+import json
+
+import pytest
+
+SERVICE_ID = "0123456789abcdef0123456789abcdef"
+
+PAYLOADS = {
+    "": {"project_id": SERVICE_ID, "description": "test project", "status": "ok"},
+    "/instance": [
+        {
+            "id": "i-1",
+            "name": "instance-1",
+            "planCode": "d2-2.consumption",
+            "region": "GRA11",
+        }
+    ],
+    "/volume": [
+        {"id": "v-1", "name": "volume-1", "region": "GRA11", "type": "classic", "size": 10},
+    ],
+    "/storage": [
+        {
+            "id": "s-1",
+            "name": "bucket-1",
+            "region": "GRA",
+            "containerType": "private",
+            "storedBytes": 1024,
+            "storedObjects": 3,
+        }
+    ],
+    "/quota": [
+        {
+            "region": "GRA11",
+            "instance": {
+                "usedInstances": 1,
+                "maxInstances": 20,
+                "usedCores": 1,
+                "maxCores": 40,
+                "usedRAM": 2048,
+                "maxRam": 81920,
+            },
+        }
+    ],
+    "/usage/current": {
+        "lastUpdate": "2024-10-03T10:00:00Z",
+        "period": {"from": "2024-10-01T00:00:00Z", "to": "2024-10-31T23:59:59Z"},
+        "hourlyUsage": {
+            "instance": [
+                {
+                    "reference": "d2-2",
+                    "region": "GRA11",
+                    "details": [{"instanceId": "i-1", "quantity": {"unit": "Hour", "value": 50}, "totalPrice": 0.5}],
+                }
+            ],
+            "volume": [
+                {
+                    "type": "classic",
+                    "region": "GRA11",
+                    "details": [{"volumeId": "v-1", "quantity": {"unit": "GiBh", "value": 500}, "totalPrice": 0.02}],
+                }
+            ],
+            "storage": [
+                {
+                    "type": "storage-standard",
+                    "region": "GRA",
+                    "bucketName": "bucket-1",
+                    "totalPrice": 0.01,
+                    "stored": {"quantity": {"unit": "GiBh", "value": 24}, "totalPrice": 0.01},
+                }
+            ],
+        },
+        "monthlyUsage": {"instance": []},
+    },
+}
+
+
+class FakeResponse:
+    """requests.Response replacement."""
+
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode()
+        self.headers = {}
+
+    def json(self):
+        """Decoded body."""
+        return json.loads(self.content)
+
+
+class FakeClient:
+    """ovh.Client replacement serving PAYLOADS for any project."""
+
+    def __init__(self, payloads=None):
+        self.payloads = payloads if payloads is not None else copy.deepcopy(PAYLOADS)
+        # listed project ids (/cloud/project)
+        self.projects = [SERVICE_ID]
+        self.calls = []
+
+    def raw_call(self, _method, path, **_kwargs):
+        """Return payload matching path suffix, or a 404 response."""
+        self.calls.append(path)
+        target = path.split("?")[0]
+        if target == "/cloud/project":
+            return FakeResponse(200, self.projects)
+        service_id = target.split("/")[3]
+        suffix = target[len(f"/cloud/project/{service_id}") :]
+        if suffix not in self.payloads:
+            return FakeResponse(404, {"message": "not found"})
+        return FakeResponse(200, self.payloads[suffix])
+
+
+def payloads(response):
+    """Response payloads by attribute (fetch times excluded)."""
+    return {k: v for k, v in vars(response).items() if k != "fetched_at"}
+
+
+@pytest.fixture
+def fake_client():
+    """A fake OVH client."""
+    return FakeClient()
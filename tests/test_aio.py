@@ -0,0 +1,100 @@
+"""Asyncio server tests."""
+
+import asyncio
+import base64
+
+import pytest
+
+from ovh_exporter.config import Service
+from ovh_exporter.ovh_client import FetchEngine
+from ovh_exporter.snapshot import SnapshotStore
+
+from .conftest import SERVICE_ID, FakeClient
+from .test_async_client import _client, _start_stub
+
+aiohttp = pytest.importorskip("aiohttp")
+aio = pytest.importorskip("ovh_exporter.aio")
+
+
+def _echo_app(environ, start_response):
+    body = f"{environ['PATH_INFO']}?{environ['QUERY_STRING']} {environ.get('HTTP_ACCEPT')}".encode()
+    start_response("202 Accepted", [("Content-Type", "text/plain"), ("X-Test", "1")])
+    return [body]
+
+
+def _basic(login, password):
+    return {"Authorization": "Basic " + base64.b64encode(f"{login}:{password}".encode()).decode()}
+
+
+def test_wsgi_app_served():
+    """WSGI app is served by aiohttp, behind basic authentication."""
+
+    async def run():
+        runner = aiohttp.web.AppRunner(aio.build_app(_echo_app, ("user", "secret")))
+        await runner.setup()
+        await aiohttp.web.TCPSite(runner, "127.0.0.1", 0).start()
+        url = f"http://127.0.0.1:{runner.addresses[0][1]}/metrics?a=1"
+        results = []
+        try:
+            async with aiohttp.ClientSession() as session:
+                for headers in ({}, _basic("user", "wrong"), {"Authorization": "Basic !!"}, _basic("user", "secret")):
+                    async with session.get(url, headers={"Accept": "text/plain", **headers}) as response:
+                        results.append((response.status, response.headers.copy(), await response.text()))
+        finally:
+            await runner.cleanup()
+        return results
+
+    *denied, (status, headers, body) = asyncio.run(run())
+    assert [result[0] for result in denied] == [401, 401, 401]
+    assert denied[0][1]["WWW-Authenticate"].startswith("Basic realm=ovh_exporter")
+    assert status == 202
+    assert headers["X-Test"] == "1"
+    assert body == "/metrics?a=1 text/plain"
+
+
+class _Store(SnapshotStore):
+    """Store queuing ids of stored snapshots."""
+
+    def __init__(self):
+        super().__init__()
+        self.stored = asyncio.Queue()
+
+    def put(self, snapshot):
+        super().put(snapshot)
+        self.stored.put_nowait(snapshot.service_id)
+
+
+def test_async_scheduler():
+    """Services are refreshed by event loop; added services are fetched without waiting for next refresh."""
+    other_id = "f" * 32
+
+    async def run():
+        requests = []
+        runner, url = await _start_stub(requests)
+        loop = asyncio.get_running_loop()
+        engine = aio.AsyncFetchEngine(FakeClient(), _client(url), loop)
+        store = _Store()
+        scheduler = aio.AsyncRefreshScheduler(engine, [Service(SERVICE_ID, {})], 60, store)
+        refresh = asyncio.create_task(scheduler.run_async())
+        try:
+            assert await asyncio.wait_for(store.stored.get(), 5) == SERVICE_ID
+            # configuration reload, from another thread
+            services = [Service(SERVICE_ID, {}), Service(other_id, {})]
+            await loop.run_in_executor(None, scheduler.set_accounts, [(engine, services, None)])
+            assert await asyncio.wait_for(store.stored.get(), 5) == other_id
+        finally:
+            refresh.cancel()
+            await engine.async_client.close()
+            await runner.cleanup()
+        return requests
+
+    requests = asyncio.run(run())
+    assert {request.match_info["service_id"] for request in requests} == {SERVICE_ID, other_id}
+    assert len(requests) == 12
+
+
+def test_async_scheduler_thread_engine(fake_client):
+    """Blocking engines are awaited without blocking event loop."""
+    scheduler = aio.AsyncRefreshScheduler(FetchEngine(fake_client, 2), [Service(SERVICE_ID, {})], 60)
+    asyncio.run(scheduler.refresh_async())
+    assert scheduler.store.get(SERVICE_ID) is not None
@@ -0,0 +1,116 @@
+"""Asyncio OVH API client tests, against a local stub server."""
+
+import asyncio
+import time
+
+import ovh.exceptions
+import pytest
+
+from ovh_exporter.ovh_client import AsyncOvhClient, fetch, signature
+
+from .conftest import PAYLOADS, SERVICE_ID, FakeClient, payloads
+
+web = pytest.importorskip("aiohttp.web")
+
+APPLICATION_KEY = "ak"
+APPLICATION_SECRET = "as"
+CONSUMER_KEY = "ck"
+
+
+async def _start_stub(requests):
+    """Start a stub OVH API; returns (runner, base url)."""
+
+    async def auth_time(_request):
+        return web.json_response(int(time.time()))
+
+    async def project(request):
+        requests.append(request)
+        expected = signature(
+            APPLICATION_SECRET,
+            CONSUMER_KEY,
+            "GET",
+            str(request.url),
+            "",
+            request.headers["X-Ovh-Timestamp"],
+        )
+        if request.headers.get("X-Ovh-Signature") != expected:
+            return web.json_response({"errorCode": "INVALID_SIGNATURE", "message": "bad"}, status=400)
+        suffix = request.path[len(f"/1.0/cloud/project/{request.match_info['service_id']}") :]
+        if suffix not in PAYLOADS:
+            return web.json_response({"message": "not found"}, status=404)
+        return web.json_response(PAYLOADS[suffix])
+
+    app = web.Application()
+    app.router.add_get("/1.0/auth/time", auth_time)
+    app.router.add_get("/1.0/cloud/project/{service_id}{tail:.*}", project)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/1.0"
+
+
+def _client(url):
+    return AsyncOvhClient("ovh-eu", APPLICATION_KEY, APPLICATION_SECRET, CONSUMER_KEY, endpoint_url=url)
+
+
+def test_async_fetch():
+    """Async fetch returns the same response as sync fetch, with signed requests."""
+
+    async def run():
+        requests = []
+        runner, url = await _start_stub(requests)
+        try:
+            async with _client(url) as client:
+                response = await client.fetch(SERVICE_ID)
+                ids = [f"{i:032x}" for i in range(200)]
+                responses = await client.fetch_all(ids)
+        finally:
+            await runner.cleanup()
+        return requests, response, responses
+
+    requests, response, responses = asyncio.run(run())
+    assert payloads(response) == payloads(fetch(FakeClient(), SERVICE_ID))
+    assert len(responses) == 200
+    assert all(r.usage == PAYLOADS["/usage/current"] for r in responses.values())
+    assert len(requests) == 6 * 201
+    assert any(r.query_string == "includeType=true" for r in requests)
+
+
+def test_async_errors():
+    """API errors are mapped to ovh exceptions."""
+
+    async def run():
+        runner, url = await _start_stub([])
+        try:
+            async with _client(url) as client:
+                with pytest.raises(ovh.exceptions.ResourceNotFoundError):
+                    await client.get(f"/cloud/project/{SERVICE_ID}/unknown")
+                results = await client.fetch_all([SERVICE_ID])
+                assert not isinstance(results[SERVICE_ID], BaseException)
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_async_fetch_reuses_fresh_endpoints():
+    """Only endpoints with expired data are fetched again."""
+
+    async def run():
+        requests = []
+        runner, url = await _start_stub(requests)
+        try:
+            async with _client(url) as client:
+                previous = await client.fetch(SERVICE_ID)
+                response = await client.fetch(SERVICE_ID, previous, {"project": 3600, "quota": 3600})
+        finally:
+            await runner.cleanup()
+        return requests, previous, response
+
+    requests, previous, response = asyncio.run(run())
+    assert len(requests) == 6 + 4
+    assert response.projects is previous.projects
+    assert response.fetched_at["quota"] == previous.fetched_at["quota"]
+    assert response.fetched_at["usage"] >= previous.fetched_at["usage"]
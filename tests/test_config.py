@@ -0,0 +1,73 @@
+"""Configuration tests."""
+
+import subprocess
+import sys
+
+import jsonschema
+import pytest
+
+from ovh_exporter.config import Config, validator
+
+from .conftest import SERVICE_ID
+
+OVH = {"endpoint": "ovh-eu", "application_key": "ak", "application_secret": "as", "consumer_key": "ck"}
+
+
+def test_service_ttl():
+    """Service ttl overrides collector ttl."""
+    config = Config.load(
+        {
+            "ovh": OVH,
+            "collector": {"ttl": {"quota": 3600, "usage": 600}},
+            "services": [{"id": SERVICE_ID, "ttl": {"usage": 60}}],
+        }
+    )
+    assert config.services[0].ttl == {"quota": 3600, "usage": 60}
+
+
+def test_invalid_ttl():
+    """Unknown endpoints are rejected."""
+    with pytest.raises(jsonschema.ValidationError):
+        Config.load({"ovh": OVH, "collector": {"ttl": {"unknown": 1}}, "services": []})
+
+
+def test_rate_limit_retry():
+    """Rate limit is disabled and calls are retried by default."""
+    config = Config.load({"ovh": OVH, "services": []})
+    assert config.ovh.rate_limit.rate == 0
+    assert config.ovh.retry.max_attempts == 3
+    config = Config.load({"ovh": {**OVH, "rate_limit": {"rate": 5}, "retry": {"max_attempts": 1}}, "services": []})
+    assert (config.ovh.rate_limit.rate, config.ovh.rate_limit.burst) == (5, 10)
+    assert config.ovh.retry.max_attempts == 1
+
+
+def test_accounts():
+    """Accounts have their own services and workers; `ovh` section is the first account."""
+    config = Config.load(
+        {
+            "ovh": OVH,
+            "collector": {"workers": 4},
+            "services": [{"id": SERVICE_ID}],
+            "accounts": [{"name": "ca", "ovh": {**OVH, "endpoint": "ovh-ca"}, "workers": 2, "services": []}],
+        }
+    )
+    assert [(a.name, a.ovh.endpoint, a.workers, len(a.services)) for a in config.accounts] == [
+        ("default", "ovh-eu", 4, 1),
+        ("ca", "ovh-ca", 2, 0),
+    ]
+    assert config.account("ca").ovh.endpoint == "ovh-ca"
+    assert config.services[0].id == SERVICE_ID
+    with pytest.raises(jsonschema.ValidationError):
+        Config.load({"services": []})
+
+
+def test_validator_cached():
+    """Schemas are compiled once."""
+    assert validator() is validator()
+
+
+def test_cli_lazy_imports():
+    """CLI startup does not import OVH client, prometheus_client nor gunicorn."""
+    code = "import sys, ovh_exporter.cli; print(*{'ovh', 'prometheus_client', 'gunicorn', 'jsonschema'} & set(sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == ""
@@ -0,0 +1,131 @@
+"""Service discovery and sharding tests."""
+
+import collections
+import threading
+
+import pytest
+
+from ovh_exporter.collector import OvhCollector
+from ovh_exporter.config import Config, Discovery, Service, Sharding
+from ovh_exporter.discovery import ServiceDiscovery, shard_owner
+from ovh_exporter.ovh_client import FetchEngine
+from ovh_exporter.scheduler import RefreshScheduler
+
+from .conftest import FakeClient, FakeResponse
+
+OVH = {"endpoint": "ovh-eu", "application_key": "ak", "application_secret": "as", "consumer_key": "ck"}
+PROJECT_IDS = [f"{i:032x}" for i in range(1, 5)]
+
+
+class ProjectsClient(FakeClient):
+    """Fake client listing PROJECT_IDS; odd projects are described as prod, even ones as dev."""
+
+    def __init__(self):
+        super().__init__()
+        self.projects = list(PROJECT_IDS)
+
+    def raw_call(self, method, path, **kwargs):
+        """Project details depend on project id."""
+        project_id = path[len("/cloud/project/") :]
+        if not path.startswith("/cloud/project/") or "/" in project_id:
+            return super().raw_call(method, path, **kwargs)
+        self.calls.append(path)
+        description = "prod" if int(project_id, 16) % 2 else "dev"
+        return FakeResponse(200, {"project_id": project_id, "description": description})
+
+
+def _discovery(client, static=(), exclude=(), labels=None, sharding=None, interval=3600, workers=8):
+    config = Discovery(True, interval, [], list(exclude), labels or {})
+    return ServiceDiscovery(client, list(static), config, sharding or Sharding(0, 1), workers=workers)
+
+
+def test_shard_owner():
+    """Services are spread between replicas, and only move to an added replica."""
+    service_ids = [f"{i:032x}" for i in range(1000)]
+    owners = {service_id: shard_owner(service_id, 4) for service_id in service_ids}
+    assert all(150 < count < 350 for count in collections.Counter(owners.values()).values())
+    moved = [service_id for service_id in service_ids if shard_owner(service_id, 5) != owners[service_id]]
+    assert {shard_owner(service_id, 5) for service_id in moved} == {4}
+    assert 100 < len(moved) < 300
+
+
+def test_discovery_filters():
+    """Discovered projects are filtered and labelled; configured services take precedence."""
+    client = ProjectsClient()
+    static = [Service(PROJECT_IDS[0], {"project": "static"})]
+    discovery = _discovery(client, static, exclude=["dev"], labels={"project": "{description}-{unknown}"})
+    services = discovery.services(now=0)
+    assert [(s.id, s.labels) for s in services] == [
+        (PROJECT_IDS[0], {"project": "static"}),
+        (PROJECT_IDS[2], {"project": "prod-"}),
+    ]
+    calls = len(client.calls)
+    # project list is cached until interval elapsed
+    assert discovery.services(now=10) is services
+    assert len(client.calls) == calls
+    # project details are only fetched for new projects
+    client.projects.append(f"{5:032x}")
+    assert len(discovery.services(now=3600)) == 3
+    assert client.calls[calls:] == ["/cloud/project", f"/cloud/project/{5:032x}"]
+
+
+def test_discovery_concurrent_details():
+    """Details of new projects are fetched concurrently."""
+
+    class BarrierClient(ProjectsClient):
+        barrier = threading.Barrier(len(PROJECT_IDS), timeout=5)
+
+        def raw_call(self, method, path, **kwargs):
+            if path != "/cloud/project":
+                self.barrier.wait()
+            return super().raw_call(method, path, **kwargs)
+
+    services = _discovery(BarrierClient(), workers=len(PROJECT_IDS)).services(now=0)
+    assert [service.id for service in services] == PROJECT_IDS
+
+
+def test_discovery_labels_mismatch():
+    """Discovered projects and configured services have the same label names."""
+    with pytest.raises(RuntimeError):
+        _discovery(ProjectsClient(), [Service(PROJECT_IDS[0], {"env": "prod"})])
+
+
+def test_sharding():
+    """Each project is owned by a single replica."""
+    client = ProjectsClient()
+    replicas = [_discovery(client, sharding=Sharding(replica, 2)).services(now=0) for replica in range(2)]
+    assert sorted(service.id for services in replicas for service in services) == PROJECT_IDS
+
+
+def test_sharding_config():
+    """Replica index can be read from a pod name."""
+    config = Config.load({"ovh": OVH, "collector": {"sharding": {"replica": "ovh-exporter-2", "replicas": 3}}})
+    assert (config.collector.sharding.replica, config.collector.sharding.replicas) == (2, 3)
+    with pytest.raises(ValueError, match="out of range"):
+        Config.load({"ovh": OVH, "collector": {"sharding": {"replica": 3, "replicas": 3}}})
+
+
+def _services(collector):
+    return {
+        tuple(s.labels.values())
+        for m in collector.collect()
+        for s in m.samples
+        if s.name == "ovh_exporter_snapshot_timestamp_seconds"
+    }
+
+
+def test_discovered_services_collected():
+    """Collector follows services published by scheduler."""
+    client = ProjectsClient()
+    discovery = _discovery(client, labels={"project": "{description}"}, interval=0)
+    scheduler = RefreshScheduler(FetchEngine(client, 2), [], 60, discovery=discovery)
+    collector = OvhCollector(scheduler.store, None, discovery.labelnames)
+    version = collector.version()
+    assert not _services(collector)
+    scheduler.refresh()
+    assert collector.version() != version
+    assert ("prod", PROJECT_IDS[0]) in _services(collector)
+    # deleted project is no longer collected
+    client.projects.remove(PROJECT_IDS[0])
+    scheduler.refresh()
+    assert _services(collector) == {("dev", PROJECT_IDS[1]), ("prod", PROJECT_IDS[2]), ("dev", PROJECT_IDS[3])}
@@ -0,0 +1,104 @@
+"""Pre-rendered exposition tests."""
+
+import gzip
+
+from prometheus_client import CollectorRegistry, Gauge
+
+from ovh_exporter.collector import OvhCollector
+from ovh_exporter.config import Service
+from ovh_exporter.exposition import CachedMetricsApp, ExpositionCache, ProbeApp
+from ovh_exporter.ovh_client import FetchEngine
+from ovh_exporter.scheduler import RefreshScheduler
+
+from .conftest import SERVICE_ID
+
+
+class _Response:
+    def __init__(self, app, **environ):
+        self.status = None
+        self.headers = {}
+
+        def start_response(status, headers):
+            self.status = status
+            self.headers = dict(headers)
+
+        self.body = b"".join(app({"PATH_INFO": "/metrics", **environ}, start_response))
+
+
+def _app():
+    data = CollectorRegistry()
+    gauge = Gauge("data", "data", registry=data)
+    dynamic = CollectorRegistry()
+    Gauge("dynamic", "dynamic", registry=dynamic).set(1)
+    version = [1]
+    renders = []
+    cache = ExpositionCache(data, lambda: (renders.append(1), version[0])[1])
+    return CachedMetricsApp(cache, dynamic), gauge, version
+
+
+def test_cached_rendering():
+    """Data is rendered once by version; dynamic metrics are appended."""
+    app, gauge, version = _app()
+    gauge.set(1)
+    first = _Response(app)
+    assert first.status == "200 OK"
+    assert b"data 1.0" in first.body
+    assert b"dynamic 1.0" in first.body
+    gauge.set(2)
+    # same version: cached bytes are served
+    assert b"data 1.0" in _Response(app).body
+    version[0] = 2
+    assert b"data 2.0" in _Response(app).body
+
+
+def test_gzip_and_openmetrics():
+    """Compressed and openmetrics variants are valid."""
+    app, _, _ = _app()
+    plain = _Response(app)
+    compressed = _Response(app, HTTP_ACCEPT_ENCODING="gzip, deflate")
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.body) == plain.body
+    om = _Response(app, HTTP_ACCEPT="application/openmetrics-text; version=1.0.0,text/plain;q=0.5")
+    assert om.headers["Content-Type"].startswith("application/openmetrics-text")
+    assert om.body.endswith(b"# EOF\n")
+    assert om.body.count(b"# EOF") == 1
+
+
+def test_not_modified():
+    """If-None-Match with current ETag gives a 304."""
+    app, gauge, version = _app()
+    etag = _Response(app).headers["ETag"]
+    not_modified = _Response(app, HTTP_IF_NONE_MATCH=etag)
+    assert not_modified.status == "304 Not Modified"
+    assert not not_modified.body
+    # refreshed, same content
+    version[0] = 2
+    assert _Response(app, HTTP_IF_NONE_MATCH=etag).status == "304 Not Modified"
+    gauge.set(3)
+    version[0] = 3
+    assert _Response(app, HTTP_IF_NONE_MATCH=etag).status == "200 OK"
+
+
+def test_probe(fake_client):
+    """Probe refreshes and exposes a single service."""
+    other_id = "f" * 32
+    services = [Service(SERVICE_ID, {}), Service(other_id, {})]
+    scheduler = RefreshScheduler(FetchEngine(fake_client, 2), services, 60)
+    collector = OvhCollector(scheduler.store, services)
+    probe = ProbeApp(collector, scheduler.refresh_service)
+    app = CachedMetricsApp(ExpositionCache(collector, collector.version), None, probe)
+    response = _Response(app, PATH_INFO="/probe", QUERY_STRING=f"target={SERVICE_ID}")
+    assert response.status == "200 OK"
+    assert b"ovh_storage_size_bytes{" in response.body
+    assert f'ovh_exporter_snapshot_timestamp_seconds{{service_id="{SERVICE_ID}"}}'.encode() in response.body
+    assert b"ovh_exporter_snapshot_age_seconds" in response.body
+    assert other_id.encode() not in response.body
+    assert scheduler.store.get(other_id) is None
+    # snapshot younger than max_age is served as is
+    calls = len(fake_client.calls)
+    _Response(app, PATH_INFO="/probe", QUERY_STRING=f"target={SERVICE_ID}")
+    assert len(fake_client.calls) == calls
+    _Response(app, PATH_INFO="/probe", QUERY_STRING=f"target={SERVICE_ID}&max_age=0")
+    assert len(fake_client.calls) > calls
+    assert _Response(app, PATH_INFO="/probe", QUERY_STRING="target=unknown").status == "404 Not Found"
+    assert _Response(app, PATH_INFO="/probe").status == "400 Bad Request"
@@ -0,0 +1,120 @@
+"""Recording and fake OVH API tests."""
+
+import threading
+
+import ovh
+import ovh.exceptions
+import pytest
+
+from ovh_exporter.fake_api import FakeOvhApi, RecordingSource, SyntheticSource, serve
+from ovh_exporter.ovh_client import FetchEngine
+from ovh_exporter.recording import Sanitizer, record
+from ovh_exporter.synthetic import service_id
+
+from .conftest import SERVICE_ID, payloads
+
+
+@pytest.fixture
+def fake_api():
+    """Start a fake API server; yields a factory (app, base url)."""
+    servers = []
+
+    def start(app):
+        server = serve(app)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/1.0"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _client(url):
+    client = ovh.Client("ovh-eu", "ak", "as", "ck")
+    client._endpoint = url  # noqa: SLF001
+    return client
+
+
+def test_record_sanitized(fake_client):
+    """Recorded ids are replaced by consistent pseudonyms."""
+    recording = record(fake_client, [SERVICE_ID], Sanitizer(b"key"))
+    assert list(recording["services"]) == [Sanitizer(b"key").pseudonym(SERVICE_ID)]
+    [service] = recording["services"].values()
+    instance_id = service["instance"][0]["id"]
+    assert instance_id != "i-1"
+    assert service["usage"]["hourlyUsage"]["instance"][0]["details"][0]["instanceId"] == instance_id
+    assert service["storage"][0]["name"] != "bucket-1"
+    assert service["instance"][0]["planCode"] == "d2-2.consumption"
+    assert SERVICE_ID not in str(recording)
+
+
+def test_record_allowlist(fake_client):
+    """Only recorded fields are kept: undocumented identifying fields are dropped."""
+    fake_client.payloads[""] = {
+        "project_id": SERVICE_ID,
+        "projectName": "acme-production",
+        "description": "acme production",
+        "planCode": "project.2018",
+        "unleash": False,
+        "expiration": None,
+        "creationDate": "2020-01-01T00:00:00Z",
+        "orderId": 123456,
+        "access": "full",
+        "status": "ok",
+        "manualQuota": False,
+        "iam": {
+            "id": "8d1d4f6a-2c1b-4b8e-9b6a-1f2e3d4c5b6a",
+            "urn": f"urn:v1:eu:resource:publicCloudProject:{SERVICE_ID}",
+            "displayName": "acme-production",
+        },
+    }
+    fake_client.payloads["/usage/current"]["monthlyUsage"]["instanceOption"] = []
+    fake_client.payloads["/instance"][0]["ipAddresses"] = [{"ip": "203.0.113.10", "gatewayIp": "203.0.113.1"}]
+    recording = record(fake_client, [SERVICE_ID], Sanitizer(b"key"))
+    [service] = recording["services"].values()
+    assert set(service["project"]) == {
+        "project_id",
+        "description",
+        "planCode",
+        "unleash",
+        "expiration",
+        "creationDate",
+        "access",
+        "status",
+        "manualQuota",
+    }
+    assert service["project"]["status"] == "ok"
+    assert "ipAddresses" not in service["instance"][0]
+    # usage is recorded whole, not projected as collection does
+    assert "instanceOption" in service["usage"]["monthlyUsage"]
+    for value in (SERVICE_ID, "acme", "123456", "203.0.113"):
+        assert value not in str(recording)
+
+
+def test_replay(fake_client, fake_api):
+    """Recorded responses are replayed through OVH client."""
+    recording = record(fake_client, [SERVICE_ID])
+    [recorded_id] = recording["services"]
+    url = fake_api(FakeOvhApi(RecordingSource(recording)))
+    response = FetchEngine(_client(url), 4).fetch(recorded_id)
+    expected = recording["services"][recorded_id]
+    assert payloads(response)["instances"] == expected["instance"]
+    assert payloads(response)["usage"] == expected["usage"]
+
+
+def test_synthetic_errors(fake_api):
+    """Synthetic services are served; errors and rate limit are simulated."""
+    app = FakeOvhApi(SyntheticSource(3, 20, 5, 5, seed=1))
+    client = _client(fake_api(app))
+    assert client.get("/cloud/project") == [service_id(i) for i in range(3)]
+    assert len(FetchEngine(client, 4).fetch(service_id(2)).instances) == 20
+    app.error_rate = 1.0
+    with pytest.raises(ovh.exceptions.APIError):
+        FetchEngine(client, 4).fetch(service_id(2))
+    limited = FakeOvhApi(SyntheticSource(1, 1, 1, 1), rate_limit=0.001, burst=2)
+    client = _client(fake_api(limited))
+    with pytest.raises(ovh.exceptions.APIError):
+        FetchEngine(client, 1).fetch(service_id(0))
+    assert limited.responses[429] >= 1
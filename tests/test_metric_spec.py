@@ -0,0 +1,75 @@
+"""Metrics specification tests."""
+
+from ovh_exporter.metric_spec import FAMILIES, TABLES, compile_tables
+
+
+def _extract(name, payload):
+    table = next(table for table in compile_tables(["env"]) if table.name == name)
+    samples = {family: [] for family in table.families}
+    table.extract(payload, ("prod", "p1"), samples)
+    return samples
+
+
+def test_tables_families_declared():
+    """All table families are declared, with matching labels."""
+    names = {spec.name for spec in FAMILIES}
+    assert len(names) == len(FAMILIES)
+    assert {family for table in TABLES for family in table.values} <= names
+    assert compile_tables([])
+
+
+def test_quota_missing_section():
+    """A missing quota section only skips its own samples."""
+    samples = _extract(
+        "quotas",
+        [{"region": "GRA11", "keymanager": {"usedSecrets": 1, "maxSecrets": 10}}, {"region": "SBG5"}],
+    )
+    assert samples["ovh_quota_instance_count"] == []
+    (sample,) = samples["ovh_quota_keymanager_secret_max_count"]
+    assert sample.labels == {"env": "prod", "service_id": "p1", "region": "GRA11"}
+    assert sample.value == 10
+
+
+def test_nested_rows():
+    """Detail rows get labels of their usage group."""
+    samples = _extract(
+        "instance_monthly_usage",
+        {"monthlyUsage": {"instance": [{"reference": "b2-7", "region": "GRA11", "details": [{"instanceId": "i1"}]}]}},
+    )
+    (hours,) = samples["ovh_usage_instance_hours"]
+    assert hours.labels["flavor"] == "b2-7"
+    assert hours.labels["type"] == "monthly"
+    assert hours.value == 720
+    assert samples["ovh_usage_instance_price"] == []
+
+
+def test_storage_usage():
+    """Free storages are skipped; missing bandwidth is 0; pcs storages are aggregated."""
+    stored = {"quantity": {"value": 3}, "totalPrice": 0.5}
+    samples = _extract(
+        "storage_usage",
+        {
+            "hourlyUsage": {
+                "storage": [
+                    {"type": "pcs", "region": "GRA", "bucketName": "b1", "totalPrice": 0.5, "stored": stored},
+                    {"type": "pcs", "region": "SBG", "bucketName": "b2", "totalPrice": 0, "stored": stored},
+                ]
+            }
+        },
+    )
+    (price,) = samples["ovh_usage_storage_price"]
+    assert price.labels["storage_name"] == "__all__"
+    assert price.value == 0.5
+    assert samples["ovh_usage_storage_bandwidth_external_incoming_gb"][0].value == 0
+
+
+def test_labels_cache():
+    """Labels of unchanged resources are reused across extractions; removed resources are dropped."""
+    table = next(table for table in compile_tables([]) if table.name == "volumes")
+    volumes = [{"id": f"v{i}", "name": "data", "region": "GRA11", "type": "classic", "size": 10} for i in range(2)]
+    first = {"ovh_volume_size_gb": []}
+    cache = table.extract(volumes, ("p1",), first)
+    second = {"ovh_volume_size_gb": []}
+    cache = table.extract(volumes[:1], ("p1",), second, cache)
+    assert second["ovh_volume_size_gb"][0].labels is first["ovh_volume_size_gb"][0].labels
+    assert len(cache) == 1
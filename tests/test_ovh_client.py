@@ -0,0 +1,128 @@
+"""OVH API client tests."""
+
+import json
+import threading
+import time
+
+import ovh.exceptions
+import pytest
+
+from ovh_exporter import json_backend
+from ovh_exporter.json_projection import loads_projected, project
+from ovh_exporter.ovh_client import FetchEngine, fetch
+
+from .conftest import SERVICE_ID, FakeClient, FakeResponse, payloads
+
+
+class SlowClient(FakeClient):
+    """Fake client tracking concurrent calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def raw_call(self, method, path, **kwargs):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        return super().raw_call(method, path, **kwargs)
+
+
+def test_engine_same_response(fake_client):
+    """Concurrent fetch returns the same data as sequential fetch."""
+    expected = fetch(fake_client, SERVICE_ID)
+    response = FetchEngine(fake_client, 4).fetch(SERVICE_ID)
+    assert payloads(response) == payloads(expected)
+
+
+def test_engine_bounded_concurrency():
+    """Services and endpoints are fetched concurrently, within workers limit."""
+    client = SlowClient()
+    engine = FetchEngine(client, 5)
+    futures = engine.fetch_all([SERVICE_ID, SERVICE_ID.replace("0", "1")])
+    for future in futures.values():
+        assert future.result().usage["lastUpdate"]
+    assert len(client.calls) == 12
+    assert 1 < client.max_running <= 5
+
+
+def test_engine_error(fake_client):
+    """Endpoint error is raised by service future."""
+    del fake_client.payloads["/volume"]
+    with pytest.raises(ovh.exceptions.ResourceNotFoundError):
+        FetchEngine(fake_client, 2).fetch(SERVICE_ID)
+
+
+def test_engine_error_cancels_siblings(fake_client):
+    """Endpoint calls of a failed service which are not started yet are not made."""
+    del fake_client.payloads[""]
+    engine = FetchEngine(fake_client, 1)
+    with pytest.raises(ovh.exceptions.ResourceNotFoundError):
+        engine.fetch(SERVICE_ID)
+    engine.shutdown()
+    assert fake_client.calls == [f"/cloud/project/{SERVICE_ID}"]
+
+
+def test_engine_ttl(fake_client):
+    """Only endpoints with expired data are fetched again."""
+    engine = FetchEngine(fake_client, 2)
+    previous = engine.fetch(SERVICE_ID)
+    fake_client.calls.clear()
+    ttl = {"project": 3600, "volume": 3600, "storage": 3600, "quota": 3600, "usage": 0}
+    response = engine.fetch(SERVICE_ID, previous, ttl)
+    assert sorted(c.rsplit("/", 1)[-1] for c in fake_client.calls) == ["current", "instance"]
+    assert response.volumes is previous.volumes
+    assert response.fetched_at["volume"] == previous.fetched_at["volume"]
+    assert response.fetched_at["usage"] > previous.fetched_at["usage"]
+
+
+def test_loads_projected():
+    """Only projected fields are decoded; arrays items are projected."""
+    text = '{"a": [{"b": 1, "c": [1, 2]}, {"b": 2}], "d": {"e": [3]}, "f": "g" }'
+    assert loads_projected(text, {"a": {"b": True}, "f": True}) == {"a": [{"b": 1}, {"b": 2}], "f": "g"}
+    assert loads_projected(" [1, {}] ", True) == [1, {}]
+    # decoded payloads are projected alike
+    assert project(json.loads(text), {"a": {"b": True}, "f": True}) == {"a": [{"b": 1}, {"b": 2}], "f": "g"}
+    for invalid in ('{"a": 1', '{"a" 1}', '{"a": 1} x', "[1 2]"):
+        with pytest.raises(ValueError, match=r"Expecting|Extra"):
+            loads_projected(invalid, {"a": True})
+
+
+def test_usage_projected(fake_client):
+    """Usage fields not used by metrics are dropped."""
+    fake_client.payloads["/usage/current"]["resourcesUsage"] = [{"resources": [{"id": "r-1"}]}]
+    fake_client.payloads["/usage/current"]["hourlyUsage"]["instanceOption"] = []
+    usage = fetch(fake_client, SERVICE_ID).usage
+    assert "resourcesUsage" not in usage
+    assert set(usage["hourlyUsage"]) == {"instance", "volume", "storage"}
+    assert usage["lastUpdate"]
+
+
+def test_json_backends(fake_client):
+    """Installed backends decode (and project) API payloads alike; invalid payloads raise InvalidResponse."""
+    fake_client.payloads["/usage/current"]["resourcesUsage"] = [{"resources": [{"id": "r-1"}]}]
+    json_backend.set_backend("json")
+    expected = fetch(fake_client, SERVICE_ID)
+    assert "resourcesUsage" not in expected.usage
+    invalid = FakeResponse(200, None)
+    invalid.content = b"{"
+    try:
+        for name in json_backend.BACKENDS:
+            try:
+                assert json_backend.set_backend(name) == name
+            except RuntimeError:
+                continue
+            assert payloads(fetch(fake_client, SERVICE_ID)) == payloads(expected)
+            fake_client.raw_call = lambda *_args, **_kwargs: invalid
+            with pytest.raises(ovh.exceptions.InvalidResponse):
+                fetch(fake_client, SERVICE_ID)
+            del fake_client.raw_call
+        with pytest.raises(ValueError, match="Unknown"):
+            json_backend.set_backend("yaml")
+    finally:
+        json_backend.set_backend()
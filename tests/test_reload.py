@@ -0,0 +1,116 @@
+"""Configuration reload tests."""
+
+import threading
+import time
+
+from ovh_exporter import reload
+from ovh_exporter.config import load_file
+from ovh_exporter.reload import ConfigReloader, build_sources, sources_accounts
+from ovh_exporter.scheduler import RefreshScheduler
+
+from .conftest import SERVICE_ID, FakeClient
+
+CONFIG = """
+ovh:
+  endpoint: ovh-eu
+  application_key: ak
+  application_secret: as
+  consumer_key: ck
+services:
+"""
+
+
+def _write(path, services, label="env"):
+    path.write_text(
+        CONFIG + "".join(f'- id: "{service_id}"\n  labels:\n    {label}: test\n' for service_id in services)
+    )
+
+
+def _wait(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_reload(tmp_path, monkeypatch):
+    """Only added services are fetched, removed ones are dropped, unchanged ones keep their snapshot."""
+    clients = []
+    monkeypatch.setattr(reload, "build_client", lambda _ovh: clients.append(FakeClient()) or clients[-1])
+    added_id, removed_id = "a" * 32, "b" * 32
+    path = tmp_path / "config.yaml"
+    _write(path, [SERVICE_ID, removed_id])
+    config = load_file(str(path))
+    sources = build_sources(config)
+    engine, services, _discovery = sources_accounts(sources)[0]
+    scheduler = RefreshScheduler(engine, services, 60)
+    reloader = ConfigReloader(str(path), config, scheduler, sources)
+    scheduler.start()
+    try:
+        _wait(lambda: scheduler.store.get(removed_id) is not None and scheduler.store.get(SERVICE_ID) is not None)
+        kept = scheduler.store.get(SERVICE_ID)
+        calls = len(clients[0].calls)
+        assert not reloader.changed()
+        _write(path, [SERVICE_ID, added_id])
+        assert reloader.changed()
+        assert reloader.reload()
+        _wait(lambda: scheduler.store.get(added_id) is not None)
+        # same credentials: client is kept, and only used for the added service
+        assert len(clients) == 1
+        assert {call.split("/")[3] for call in clients[0].calls[calls:]} == {added_id}
+        assert scheduler.store.get(SERVICE_ID) is kept
+        assert scheduler.store.get(removed_id) is None
+        assert [service["id"] for service in scheduler.store.get_services()] == [SERVICE_ID, added_id]
+    finally:
+        scheduler.stop(5)
+
+
+def test_reload_rejected(tmp_path, monkeypatch):
+    """Invalid configuration and label names changes keep current configuration."""
+    monkeypatch.setattr(reload, "build_client", lambda _ovh: FakeClient())
+    path = tmp_path / "config.yaml"
+    _write(path, [SERVICE_ID])
+    config = load_file(str(path))
+    sources = build_sources(config)
+    scheduler = RefreshScheduler(*sources_accounts(sources)[0][:2], 60)
+    reloader = ConfigReloader(str(path), config, scheduler, sources)
+    path.write_text("services: []\n")
+    assert not reloader.reload()
+    _write(path, ["a" * 32], label="region")
+    assert not reloader.reload()
+    assert reloader.config is config
+    assert [service["id"] for service in scheduler.store.get_services()] == [SERVICE_ID]
+
+
+def test_reload_credentials_in_flight(tmp_path, monkeypatch):
+    """Fetches in flight complete with replaced credentials, without counting a failure."""
+    started, release = threading.Event(), threading.Event()
+
+    class BlockingClient(FakeClient):
+        def raw_call(self, method, path, **kwargs):
+            started.set()
+            release.wait(5)
+            return super().raw_call(method, path, **kwargs)
+
+    clients = [BlockingClient(), FakeClient()]
+    monkeypatch.setattr(reload, "build_client", lambda _ovh: clients.pop(0))
+    path = tmp_path / "config.yaml"
+    _write(path, [SERVICE_ID])
+    # endpoint calls are queued behind the first one
+    path.write_text("collector:\n  workers: 1\n" + path.read_text())
+    config = load_file(str(path))
+    sources = build_sources(config)
+    scheduler = RefreshScheduler(*sources_accounts(sources)[0][:2], 60)
+    reloader = ConfigReloader(str(path), config, scheduler, sources)
+    refresh = threading.Thread(target=scheduler.refresh)
+    refresh.start()
+    try:
+        assert started.wait(5)
+        path.write_text(path.read_text().replace("consumer_key: ck", "consumer_key: ck2"))
+        assert reloader.reload()
+        assert not clients
+    finally:
+        release.set()
+        refresh.join(5)
+    assert scheduler.store.get(SERVICE_ID) is not None
+    assert scheduler.store.get_stats()["services"][SERVICE_ID]["failures"] == 0
@@ -0,0 +1,202 @@
+"""Remote-write push tests, against a local receiver."""
+
+import http.server
+import math
+import random
+import struct
+import threading
+
+import pytest
+from click.testing import CliRunner
+from prometheus_client.core import GaugeMetricFamily
+
+from ovh_exporter import reload
+from ovh_exporter.cli import main
+from ovh_exporter.remote_write import STALE_NAN, RemoteWriter, snappy_compress_py
+from ovh_exporter.resilience import RetryPolicy
+
+from .conftest import SERVICE_ID, FakeClient
+
+
+def _varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, pos
+
+
+def decompress(data):
+    """Snappy block decompression (literals and 2 bytes offset copies)."""
+    size, pos = _varint(data, 0)
+    out = bytearray()
+    while pos < len(data):
+        tag = data[pos]
+        pos += 1
+        if tag & 3 == 0:
+            length = tag >> 2
+            if length >= 60:
+                width = length - 59
+                length = int.from_bytes(data[pos : pos + width], "little")
+                pos += width
+            out += data[pos : pos + length + 1]
+            pos += length + 1
+        else:
+            assert tag & 3 == 2
+            offset = int.from_bytes(data[pos : pos + 2], "little")
+            pos += 2
+            for _ in range((tag >> 2) + 1):
+                out.append(out[-offset])
+    assert len(out) == size
+    return bytes(out)
+
+
+def _fields(data):
+    """Protobuf fields: (number, payload) of length-delimited fields, (number, bytes) of fixed64 and varints."""
+    pos = 0
+    while pos < len(data):
+        key, pos = _varint(data, pos)
+        number, kind = key >> 3, key & 7
+        if kind == 2:
+            length, pos = _varint(data, pos)
+            yield number, data[pos : pos + length]
+            pos += length
+        elif kind == 1:
+            yield number, data[pos : pos + 8]
+            pos += 8
+        else:
+            value, pos = _varint(data, pos)
+            yield number, value
+
+
+def decode(body):
+    """Series of a snappy compressed WriteRequest: (labels, value, timestamp)."""
+    series = []
+    for _, timeseries in _fields(decompress(body)):
+        labels = []
+        for number, payload in _fields(timeseries):
+            fields = dict(_fields(payload))
+            if number == 1:
+                labels.append((fields[1].decode(), fields[2].decode()))
+            else:
+                value = struct.unpack("<d", fields[1])[0]
+                timestamp = fields[2]
+        assert labels == sorted(labels)
+        series.append((dict(labels), value, timestamp))
+    return series
+
+
+@pytest.fixture
+def receiver():
+    """Remote-write receiver; `statuses` are answered first, then 204."""
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            assert self.headers["Content-Encoding"] == "snappy"
+            assert self.headers["X-Prometheus-Remote-Write-Version"] == "0.1.0"
+            status = server.statuses.pop(0) if server.statuses else 204
+            if status == 204:
+                server.requests.append(decode(body))
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.statuses = []
+    server.requests = []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/api/v1/write"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _families(values):
+    family = GaugeMetricFamily("ovh_test", "test", labels=["id"])
+    for name, value in values.items():
+        family.add_metric([name], value)
+    return [family]
+
+
+def test_snappy_compress():
+    """Compressed data is decompressed by reference format, long literals and copies included."""
+    rng = random.Random(1)
+    for data in (b"", b"a", b"abcd" * 1000, bytes(rng.getrandbits(8) for _ in range(70000)), b"x" * 70 + b"y" * 300):
+        assert decompress(snappy_compress_py(data)) == data
+    # copies are at most 64 bytes long
+    assert len(snappy_compress_py(b"ovh_instance_total" * 1000)) < 1000
+
+
+def test_push_changed_series(receiver):
+    """Series are sent by batches, then only changed, resent or ended ones."""
+    writer = RemoteWriter(receiver.url, batch_size=2, resend_interval=60)
+    assert writer.push(_families({"a": 1, "b": 2, "c": math.nan}), 1000) == 3
+    assert [len(batch) for batch in receiver.requests] == [2, 1]
+    sent = {labels["id"]: (value, timestamp) for batch in receiver.requests for labels, value, timestamp in batch}
+    assert sent["a"] == (1, 1000000)
+    assert math.isnan(sent["c"][0])
+    assert receiver.requests[0][0][0] == {"__name__": "ovh_test", "id": "a"}
+    receiver.requests.clear()
+    # b changed, c removed (staleness marker), a unchanged
+    assert writer.push(_families({"a": 1, "b": 3}), 1010) == 2
+    (batch,) = receiver.requests
+    assert batch[0] == ({"__name__": "ovh_test", "id": "b"}, 3, 1010000)
+    assert batch[1][0]["id"] == "c"
+    assert struct.pack("<d", batch[1][1]) == struct.pack("<d", STALE_NAN)
+    receiver.requests.clear()
+    # unchanged series are resent before Prometheus marks them stale
+    assert writer.push(_families({"a": 1, "b": 3}), 1065) == 1
+    assert [labels["id"] for labels, _, _ in receiver.requests[0]] == ["a"]
+    writer.close()
+
+
+def test_push_failures(receiver):
+    """Series are buffered while endpoint fails, rejected ones are dropped."""
+    writer = RemoteWriter(receiver.url, retry=RetryPolicy(2, 0, 0))
+    receiver.statuses[:] = [503, 503]
+    assert writer.push(_families({"a": 1}), 1000) == 0
+    assert writer.pending == 1
+    # retried on next push, with new changes
+    assert writer.push(_families({"a": 2, "b": 1}), 1010) == 3
+    assert writer.pending == 0
+    assert [value for _, value, _ in receiver.requests[0]] == [1, 2, 1]
+    receiver.statuses[:] = [400]
+    assert writer.push(_families({"a": 3, "b": 1}), 1020) == 0
+    assert writer.pending == 0
+    assert writer.dropped == 1
+    writer.close()
+
+
+def test_push_command(receiver, tmp_path, monkeypatch):
+    """`push --once` refreshes services and pushes their metrics."""
+    monkeypatch.setattr(reload, "build_client", lambda _ovh: FakeClient())
+    path = tmp_path / "config.yaml"
+    path.write_text(
+        f"""
+ovh:
+  endpoint: ovh-eu
+  application_key: ak
+  application_secret: as
+  consumer_key: ck
+services:
+- id: "{SERVICE_ID}"
+  labels:
+    env: test
+push:
+  url: {receiver.url}
+"""
+    )
+    result = CliRunner().invoke(main, ["--config", str(path), "push", "--once"])
+    assert result.exit_code == 0, result.output
+    series = [labels for batch in receiver.requests for labels, _, _ in batch]
+    quotas = [labels for labels in series if labels["__name__"].startswith("ovh_quota_")]
+    assert quotas
+    assert all(labels["env"] == "test" and labels["service_id"] == SERVICE_ID for labels in quotas)
@@ -0,0 +1,89 @@
+"""Rate limiting and retry tests."""
+
+import time
+
+import ovh.exceptions
+import pytest
+
+from ovh_exporter.instrumentation import API_STATS
+from ovh_exporter.ovh_client import FetchEngine
+from ovh_exporter.resilience import CallPolicy, RateLimiter, RetryPolicy, TokenBucket
+
+from .conftest import SERVICE_ID, FakeClient, FakeResponse
+
+
+class FlakyClient(FakeClient):
+    """Fake client answering `failures` error statuses before each success."""
+
+    def __init__(self, status, failures, policy):
+        super().__init__()
+        self.status = status
+        self.failures = failures
+        self.attempts = {}
+        self.call_policy = policy
+
+    def raw_call(self, method, path, **kwargs):
+        self.attempts[path] = self.attempts.get(path, 0) + 1
+        if self.attempts[path] <= self.failures:
+            self.calls.append(path)
+            return FakeResponse(self.status, {"message": "unavailable"})
+        return super().raw_call(method, path, **kwargs)
+
+
+def _retries(endpoint, reason):
+    return {(e, r): c for e, r, c in API_STATS.to_dict()["retries"]}.get((endpoint, reason), 0)
+
+
+def test_token_bucket():
+    """Burst is served immediately, then calls are spaced by rate."""
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+    assert RateLimiter(0, 1).reserve("usage") == 0
+
+
+def test_retry_delay():
+    """Backoff is jittered, capped, and honors Retry-After."""
+    retry = RetryPolicy(5, backoff=1, max_backoff=3)
+    assert all(0 <= retry.delay(1) <= 1 for _ in range(20))
+    assert all(0 <= retry.delay(5) <= 3 for _ in range(20))
+    assert retry.delay(1, "2") == 2
+
+
+def test_retry_server_errors():
+    """5xx responses are retried until success."""
+    client = FlakyClient(503, 2, CallPolicy(retry=RetryPolicy(3, backoff=0.001)))
+    before = _retries("usage", "503")
+    response = FetchEngine(client, 2).fetch(SERVICE_ID)
+    assert response.usage["lastUpdate"]
+    assert len(client.calls) == 6 + 6 * 2
+    assert _retries("usage", "503") == before + 2
+
+
+def test_retry_exhausted():
+    """Last error is raised once attempts are exhausted; client errors are not retried."""
+    client = FlakyClient(503, 3, CallPolicy(retry=RetryPolicy(3, backoff=0.001)))
+    with pytest.raises(ovh.exceptions.APIError):
+        FetchEngine(client, 2).fetch(SERVICE_ID)
+    client = FlakyClient(400, 1, CallPolicy(retry=RetryPolicy(3, backoff=0.001)))
+    with pytest.raises(ovh.exceptions.BadParametersError):
+        FetchEngine(client, 2).fetch(SERVICE_ID)
+
+
+def _throttled(endpoint):
+    return API_STATS.to_dict()["throttled"].get(endpoint, [0, 0])[0]
+
+
+def test_rate_limit():
+    """Calls of an endpoint are throttled once burst is consumed."""
+    client = FlakyClient(200, 0, CallPolicy(limiter=RateLimiter(rate=5, burst=1)))
+    engine = FetchEngine(client, 6)
+    before = _throttled("usage")
+    start = time.monotonic()
+    engine.fetch(SERVICE_ID)
+    engine.fetch(SERVICE_ID)
+    # endpoints are limited independently: one 200ms delay
+    assert 0.15 <= time.monotonic() - start < 0.4
+    assert _throttled("usage") == before + 1
@@ -0,0 +1,161 @@
+"""Background refresh tests."""
+
+from ovh_exporter import collector as collector_module
+from ovh_exporter.collector import OvhCollector, SnapshotAgeCollector
+from ovh_exporter.config import Service
+from ovh_exporter.ovh_client import FetchEngine
+from ovh_exporter.scheduler import RefreshScheduler
+
+from .conftest import SERVICE_ID, FakeClient
+
+
+def _samples(collector):
+    return {(s.name, tuple(s.labels.values())): s.value for m in collector.collect() for s in m.samples}
+
+
+def test_collect_uses_snapshot(fake_client):
+    """Collect reads snapshot and does not call OVH API."""
+    services = [Service(SERVICE_ID, {"env": "test"})]
+    scheduler = RefreshScheduler(FetchEngine(fake_client, 4), services, 60)
+    collector = OvhCollector(scheduler.store, services)
+    # nothing fetched yet: no service samples
+    assert not _samples(collector)
+    scheduler.refresh()
+    calls = len(fake_client.calls)
+    assert calls == 6
+    samples = _samples(collector)
+    assert samples[("ovh_storage_size_bytes", ("test", SERVICE_ID, "GRA", "s-1", "bucket-1", "private"))] == 1024
+    assert ("ovh_exporter_snapshot_timestamp_seconds", ("test", SERVICE_ID)) in samples
+    assert ("ovh_exporter_refresh_duration_seconds", ("test", SERVICE_ID)) in samples
+    assert len(fake_client.calls) == calls
+    age = _samples(SnapshotAgeCollector(collector))
+    assert age[("ovh_exporter_snapshot_age_seconds", ("test", SERVICE_ID))] >= 0
+
+
+def test_describe(fake_client, monkeypatch):
+    """Families are described from specification, without building `Metrics`."""
+    services = [Service(SERVICE_ID, {"env": "test"})]
+    scheduler = RefreshScheduler(FetchEngine(fake_client, 4), services, 60)
+    scheduler.refresh()
+    collector = OvhCollector(scheduler.store, services)
+    collected = {(m.name, m.type) for m in collector.collect()}
+
+    def fail(_labelnames):
+        raise AssertionError
+
+    monkeypatch.setattr(collector_module, "Metrics", fail)
+    described = list(collector.describe())
+    assert {(m.name, m.type) for m in described} == collected
+    assert all(not m.samples for m in described)
+    # one description by label names
+    assert all(a is b for a, b in zip(OvhCollector(scheduler.store, services).describe(), described))
+
+
+def test_failed_refresh_keeps_snapshot(fake_client):
+    """A failing refresh keeps previous snapshot."""
+    services = [Service(SERVICE_ID, {})]
+    scheduler = RefreshScheduler(FetchEngine(fake_client, 4), services, 60)
+    previous = scheduler.refresh_service(services[0])
+    del fake_client.payloads["/quota"]
+    assert scheduler.refresh_service(services[0]) is None
+    assert scheduler.store.get(SERVICE_ID) is previous
+
+
+def test_usage_reused(fake_client):
+    """Usage samples are reused while lastUpdate does not change."""
+    services = [Service(SERVICE_ID, {})]
+    scheduler = RefreshScheduler(FetchEngine(fake_client, 2), services, 60)
+    collector = OvhCollector(scheduler.store, services)
+    scheduler.refresh()
+    first = _samples(collector)
+    assert first[("ovh_exporter_usage_cache_hits_total", (SERVICE_ID,))] == 0
+    second = _samples(collector)
+    assert second[("ovh_exporter_usage_cache_hits_total", (SERVICE_ID,))] == 1
+    usage = {k: v for k, v in first.items() if k[0].startswith("ovh_usage_")}
+    assert usage
+    assert usage == {k: v for k, v in second.items() if k[0].startswith("ovh_usage_")}
+    # new lastUpdate: usage is processed again
+    fake_client.payloads["/usage/current"]["lastUpdate"] = "2024-10-03T11:00:00Z"
+    fake_client.payloads["/usage/current"]["hourlyUsage"]["instance"][0]["details"][0]["totalPrice"] = 0.6
+    scheduler.refresh()
+    third = _samples(collector)
+    assert third[("ovh_exporter_usage_cache_hits_total", (SERVICE_ID,))] == 1
+    assert third[("ovh_usage_instance_price", (SERVICE_ID, "GRA11", "i-1", "hourly", "d2-2"))] == 0.6
+
+
+def test_fragments_reused(fake_client):
+    """Only payloads which content changed are processed again."""
+    services = [Service(SERVICE_ID, {})]
+    scheduler = RefreshScheduler(FetchEngine(fake_client, 2), services, 60)
+    collector = OvhCollector(scheduler.store, services)
+    scheduler.refresh()
+    first = _samples(collector)
+    scheduler.refresh()
+    fake_client.payloads["/storage"][0]["storedBytes"] = 42
+    second = _samples(collector)
+    assert second[("ovh_exporter_collect_method_duration_seconds_count", ("quotas",))] == 1
+    assert second[("ovh_exporter_collect_method_duration_seconds_count", ("storages",))] == 1
+    scheduler.refresh()
+    third = _samples(collector)
+    assert third[("ovh_exporter_collect_method_duration_seconds_count", ("quotas",))] == 1
+    assert third[("ovh_exporter_collect_method_duration_seconds_count", ("storages",))] == 2
+    changed = {k: v for k, v in third.items() if first.get(k) != v and not k[0].startswith("ovh_exporter_")}
+    assert changed == {("ovh_storage_size_bytes", (SERVICE_ID, "GRA", "s-1", "bucket-1", "private")): 42}
+
+
+def test_self_instrumentation(fake_client):
+    """API calls and collect durations are exposed."""
+    services = [Service(SERVICE_ID, {})]
+    scheduler = RefreshScheduler(FetchEngine(fake_client, 4), services, 60)
+    collector = OvhCollector(scheduler.store, services)
+    scheduler.refresh()
+    samples = _samples(collector)
+    assert samples[("ovh_exporter_api_responses_total", ("storage", "200"))] >= 1
+    assert ("ovh_exporter_api_request_duration_seconds_count", ("storage",)) in samples
+    assert ("ovh_exporter_service_collect_duration_seconds", (SERVICE_ID,)) in samples
+    assert samples[("ovh_exporter_collect_method_duration_seconds_count", ("storages",))] == 1
+    assert samples[("ovh_exporter_family_series", ("ovh_storage_size_bytes",))] == 1
+
+
+def test_failing_service_isolated(fake_client):
+    """A failing service is served stale, then suspended; other services are still collected."""
+    other_id = SERVICE_ID.replace("0", "1")
+    services = [Service(SERVICE_ID, {}), Service(other_id, {})]
+    scheduler = RefreshScheduler(FetchEngine(fake_client, 4), services, 60, failure_threshold=2, reset_timeout=3600)
+    collector = OvhCollector(scheduler.store, services)
+    scheduler.refresh()
+    previous = scheduler.store.get(SERVICE_ID)
+    storages = previous.response.storages
+    previous.response.storages = None
+    # snapshot cannot be collected: service metrics are skipped
+    samples = _samples(collector)
+    assert ("ovh_exporter_snapshot_timestamp_seconds", (SERVICE_ID,)) not in samples
+    assert ("ovh_exporter_snapshot_timestamp_seconds", (other_id,)) in samples
+    assert samples[("ovh_exporter_service_collect_errors_total", (SERVICE_ID,))] == 1
+    previous.response.storages = storages
+    del fake_client.payloads["/usage/current"]
+    scheduler.refresh()
+    scheduler.refresh()
+    assert scheduler.store.get(SERVICE_ID) is previous
+    samples = _samples(collector)
+    assert samples[("ovh_exporter_service_stale", (SERVICE_ID,))] == 1
+    assert samples[("ovh_exporter_service_refresh_failures", (SERVICE_ID,))] == 2
+    assert samples[("ovh_exporter_service_circuit_open", (SERVICE_ID,))] == 1
+    # circuit open: service is not called anymore
+    fake_client.calls.clear()
+    scheduler.refresh()
+    assert fake_client.calls == []
+
+
+def test_accounts_refreshed(fake_client):
+    """Services of each account are fetched with the account client."""
+    other_id = "f" * 32
+    other_client = FakeClient()
+    scheduler = RefreshScheduler(FetchEngine(fake_client, 2), [Service(SERVICE_ID, {})], 60)
+    scheduler.add_account(FetchEngine(other_client, 2), [Service(other_id, {})])
+    collector = OvhCollector(scheduler.store, [Service(SERVICE_ID, {}), Service(other_id, {})])
+    scheduler.refresh()
+    assert {path.split("/")[3] for path in fake_client.calls} == {SERVICE_ID}
+    assert {path.split("/")[3] for path in other_client.calls} == {other_id}
+    samples = _samples(collector)
+    assert ("ovh_exporter_snapshot_timestamp_seconds", (other_id,)) in samples
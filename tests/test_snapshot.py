@@ -0,0 +1,81 @@
+"""Snapshot store tests."""
+
+import gzip
+import time
+from types import SimpleNamespace
+
+from ovh_exporter.cli import _gunicorn_hooks
+from ovh_exporter.config import Service
+from ovh_exporter.ovh_client import FetchEngine, fetch
+from ovh_exporter.scheduler import RefreshScheduler, SchedulerProcess
+from ovh_exporter.snapshot import FileSnapshotStore, Snapshot, SnapshotStore
+
+from .conftest import SERVICE_ID
+
+
+def test_file_store_shared(tmp_path, fake_client):
+    """A snapshot written by a store is read by another one, and reloaded only on change."""
+    writer = FileSnapshotStore(str(tmp_path))
+    reader = FileSnapshotStore(str(tmp_path))
+    assert reader.get(SERVICE_ID) is None
+    response = fetch(fake_client, SERVICE_ID)
+    writer.put(Snapshot(SERVICE_ID, response, 10.0, 1.5))
+    snapshot = reader.get(SERVICE_ID)
+    assert vars(snapshot.response) == vars(response)
+    assert (snapshot.timestamp, snapshot.duration) == (10.0, 1.5)
+    # payload digests are shared with readers
+    assert snapshot.digests["storages"] == Snapshot(SERVICE_ID, response, 0, 0).digest("storages")
+    assert reader.get(SERVICE_ID) is snapshot
+    writer.put(Snapshot(SERVICE_ID, response, 20.0, 1.5))
+    assert reader.get(SERVICE_ID).timestamp == 20.0
+
+
+def test_scheduler_process(tmp_path, fake_client):
+    """Collector process fetches and shares snapshots with other processes."""
+    services = [Service(SERVICE_ID, {})]
+    scheduler = RefreshScheduler(FetchEngine(fake_client, 2), services, 60, FileSnapshotStore(str(tmp_path)))
+    process = SchedulerProcess(scheduler)
+    process.start()
+    try:
+        reader = FileSnapshotStore(str(tmp_path))
+        deadline = time.monotonic() + 10
+        while reader.get(SERVICE_ID) is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert reader.get(SERVICE_ID) is not None
+        # fetch happened in child process only
+        assert not fake_client.calls
+    finally:
+        process.stop()
+
+
+def test_shared_hooks_temporary_dir(tmp_path, fake_client):
+    """Shared mode hooks run collector process; its temporary directory is removed on exit."""
+    shared_dir = tmp_path / "shared"
+    services = [Service(SERVICE_ID, {})]
+    scheduler = RefreshScheduler(FetchEngine(fake_client, 2), services, 60, FileSnapshotStore(str(shared_dir)))
+    hooks = _gunicorn_hooks(SimpleNamespace(mode="shared"), scheduler, None, str(shared_dir))
+    hooks["when_ready"](None)
+    hooks["on_exit"](None)
+    assert not shared_dir.exists()
+
+
+def test_warm_restart(tmp_path, fake_client):
+    """Snapshots saved on stop are loaded by a new store; only expired endpoints are fetched again."""
+    path = str(tmp_path / "snapshots.json.gz")
+    services = [Service(SERVICE_ID, {}, {"project": 3600, "instance": 3600})]
+    scheduler = RefreshScheduler(FetchEngine(fake_client, 2), services, 60, snapshot_file=path)
+    scheduler.refresh()
+    scheduler.stop()
+    store = SnapshotStore()
+    assert store.load(path) == 1
+    snapshot = store.get(SERVICE_ID)
+    assert vars(snapshot.response) == vars(scheduler.store.get(SERVICE_ID).response)
+    calls = len(fake_client.calls)
+    restarted = RefreshScheduler(FetchEngine(fake_client, 2), services, 60, store)
+    restarted.refresh()
+    assert len(fake_client.calls) == calls + 4
+    # unreadable or unknown format files are ignored
+    with gzip.open(path, "wb") as fstream:
+        fstream.write(b'{"version": 0}')
+    assert SnapshotStore().load(path) == 0
+    assert SnapshotStore().load(str(tmp_path / "missing")) == 0